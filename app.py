@@ -1,48 +1,79 @@
+import time
+
 import streamlit as st
 from modules.authentication import login_ui, logout_ui
-from modules.add_tournament import add_tournament_ui
-from modules.record_match import record_match_ui
+from modules.startup import load_page, prewarm, report_startup_timing
+from modules.instrumentation import rerun_scope, debug_panel_ui
 
 # Set the browser tab name
 st.set_page_config(page_title="BWU Clipboard", layout="wide")
 
 # Streamlit application
 def main():
-    st.title("BWU Clipboard")
-    
-    # Setup session state
-    if "logged_in" not in st.session_state:
-        st.session_state.logged_in = False
-    
-    if "current_page" not in st.session_state:
-        st.session_state.current_page = "Record Match"
-    
-    if not st.session_state.logged_in:
-        login_ui()
-    else:
-        # Sidebar navigation
-        with st.sidebar:
-            st.title("Navigation")
+    run_started = time.perf_counter()
+    # Counted as one rerun, and logged even when the page ends it early with st.rerun()
+    with rerun_scope():
+        try:
+            st.title("BWU Clipboard")
             
-            # Navigation options
-            if st.button("Add Tournament", key="nav_add_tournament"):
-                st.session_state.current_page = "Add Tournament"
+            # Setup session state
+            if "logged_in" not in st.session_state:
+                st.session_state.logged_in = False
             
-            if st.button("Record Match", key="nav_record_match"):
+            if "current_page" not in st.session_state:
                 st.session_state.current_page = "Record Match"
             
-            # Add a visual separator
-            st.markdown("---")
+            if st.query_params.get("view") == "scoreboard":
+                # The read-only scoreboard needs no login
+                load_page("Scoreboard")()
+                if st.button("Coach login"):
+                    del st.query_params["view"]
+                    st.rerun()
             
-            # Logout button in the sidebar
-            logout_ui()
-        
-        # Content based on navigation selection
-        if st.session_state.current_page == "Add Tournament":
-            add_tournament_ui()
-        
-        elif st.session_state.current_page == "Record Match":
-            record_match_ui()
+            elif not st.session_state.logged_in:
+                login_ui()
+                
+                # Spectators follow the live scores without logging in
+                st.markdown("---")
+                if st.button("Follow live scores"):
+                    st.query_params["view"] = "scoreboard"
+                    st.rerun()
+            else:
+                # Load the pages and their data in the background while the coach looks around
+                prewarm()
+                
+                # Sidebar navigation
+                with st.sidebar:
+                    st.title("Navigation")
+                    
+                    # Navigation options
+                    if st.button("Add Tournament", key="nav_add_tournament"):
+                        st.session_state.current_page = "Add Tournament"
+                    
+                    if st.button("Record Match", key="nav_record_match"):
+                        st.session_state.current_page = "Record Match"
+                    
+                    if st.button("Stats", key="nav_stats"):
+                        st.session_state.current_page = "Stats"
+                    
+                    if st.button("Scoreboard", key="nav_scoreboard"):
+                        st.session_state.current_page = "Scoreboard"
+                    
+                    # Add a visual separator
+                    st.markdown("---")
+                    
+                    # Logout button in the sidebar
+                    logout_ui()
+                
+                # Content based on navigation selection; each page is imported on first use
+                load_page(st.session_state.current_page)()
+                
+                # Optional admin panel, drawn last so it shows every call of this rerun
+                if st.secrets.get("DEBUG_PANEL", False):
+                    with st.sidebar:
+                        debug_panel_ui()
+        finally:
+            report_startup_timing(run_started)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,358 @@
+"""
+Benchmark the Record Match and Add Tournament pages against a fake Google Sheets.
+
+Usage:
+    python -m benchmarks.bench_app [--roster-sizes 20,100,500] [--sessions 1,10,50]
+        [--points 3] [--latency 0.1] [--error-rate 0] [--skip-memory] [--json FILE]
+
+Every scenario builds a club of the given size in a FakeSpreadsheet and drives that many
+simulated sessions through app.py with Streamlit's AppTest. Each session opens Record
+Match, records a few points and then adds a tournament. AppTest keeps global state while
+a script runs, so the sessions take turns rerun by rerun rather than running in parallel;
+they still share the process-wide cache, scheduler, journal and match registry. The report
+shows the latency of every kind of rerun, the Sheets requests sent per recorded point and
+per added tournament, and the peak memory allocated while the scenario ran.
+
+AppTest always reruns the whole script, so the latencies are those of full reruns; in the
+browser, fragment reruns are cheaper. Memory is measured with tracemalloc, which slows
+everything down, so compare latencies from runs with --skip-memory.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(REPO_ROOT, "app.py")
+
+TAB_NAMES = {
+    'tournaments': 'tournaments',
+    'roster': 'roster',
+    'tournament_rosters': 'tournament_rosters',
+    'matches': 'matches',
+}
+
+# Players picked from each line for a point
+PLAYERS_PER_LINE = {"O": 4, "D": 3}
+
+# Players added to each benchmark tournament
+TOURNAMENT_SIZE = 12
+
+# Longest wait for the match journal to push every point to the fake sheet, in seconds
+FLUSH_TIMEOUT_SECONDS = 120
+
+
+def _toml_value(value):
+    """
+    Format a value for secrets.toml.
+
+    Args:
+        value: A string, number or bool.
+
+    Returns:
+        str: The TOML value.
+    """
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return str(value)
+    return json.dumps(value)
+
+
+def write_secrets(directory, args):
+    """
+    Write a .streamlit/secrets.toml that points the app at fake credentials and local files.
+
+    Args:
+        directory (str): The directory the benchmark runs in.
+        args (argparse.Namespace): The command line arguments.
+    """
+    secrets = {
+        "APP_USERNAME": "bench",
+        "APP_PASSWORD": "bench",
+        "SHEET_NAME": "bench",
+        "TOURNAMENT_TAB_NAME": TAB_NAMES['tournaments'],
+        "ROSTER_TAB_NAME": TAB_NAMES['roster'],
+        "TOURNAMENT_ROSTER_TAB_NAME": TAB_NAMES['tournament_rosters'],
+        "MATCHES_TAB_NAME": TAB_NAMES['matches'],
+        "STORAGE_BACKEND": "sheets",
+        "JOURNAL_PATH": os.path.join(directory, "match_journal.sqlite3"),
+        "SHEETS_READS_PER_MINUTE": args.reads_per_minute,
+        "SHEETS_WRITES_PER_MINUTE": args.writes_per_minute,
+        # Background prewarming would blur the request counts of the first page
+        "PREWARM": False,
+    }
+    service_account = {
+        "type": "service_account",
+        "client_email": "bench@example.iam.gserviceaccount.com",
+        "private_key_id": "bench",
+    }
+    os.makedirs(os.path.join(directory, ".streamlit"), exist_ok=True)
+    with open(os.path.join(directory, ".streamlit", "secrets.toml"), "w") as f:
+        for key, value in secrets.items():
+            f.write(f"{key} = {_toml_value(value)}\n")
+        f.write("\n[gcp_service_account]\n")
+        for key, value in service_account.items():
+            f.write(f"{key} = {_toml_value(value)}\n")
+
+
+def _percentile(values, fraction):
+    """
+    Get a percentile of a list of numbers by the nearest-rank method.
+
+    Args:
+        values (list): The numbers.
+        fraction (float): The percentile, between 0 and 1.
+
+    Returns:
+        float: The percentile, or None if values is empty.
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class Session:
+    """
+    One simulated coach driving the app through AppTest.
+    """
+
+    def __init__(self, app_test_class, name):
+        self.name = name
+        self.at = app_test_class.from_file(APP_PATH, default_timeout=60)
+        self.at.session_state["logged_in"] = True
+        self.at.session_state["current_page"] = "Record Match"
+        self.timings = {}
+        self.errors = []
+
+    def run(self, kind):
+        """
+        Rerun the script, timing the rerun and collecting any errors shown.
+
+        Args:
+            kind (str): The kind of rerun, for the report.
+        """
+        started = time.perf_counter()
+        self.at.run()
+        self.timings.setdefault(kind, []).append(time.perf_counter() - started)
+        self.errors.extend(str(exception.value) for exception in self.at.exception)
+        self.errors.extend(str(error.value) for error in self.at.error)
+
+    def record_points(self, points):
+        """
+        Open Record Match and record points for a match against an opponent of its own.
+
+        Args:
+            points (int): Number of points to record.
+
+        Yields:
+            None: After every rerun, so other sessions can take their turn.
+        """
+        self.run('record_load')
+        yield
+        opponent = next(widget for widget in self.at.text_input if widget.label == "Opponent Name")
+        opponent.set_value(f"Opponent {self.name}")
+        self.run('record_opponent')
+        yield
+
+        for point in range(points):
+            for line, count in PLAYERS_PER_LINE.items():
+                multiselect = self.at.multiselect(key=f"line_{line}_players")
+                options = list(multiselect.options)
+                names = [options[(point + i) % len(options)].split(" (")[0] for i in range(count)]
+                multiselect.set_value(names)
+                self.run('record_select')
+                yield
+            save = next(button for button in self.at.button if button.label == "SAVE POINT")
+            save.click()
+            self.run('record_save')
+            yield
+
+    def add_tournament(self):
+        """
+        Open Add Tournament and add a tournament with part of the club roster.
+
+        Yields:
+            None: After every rerun, so other sessions can take their turn.
+        """
+        self.at.session_state["current_page"] = "Add Tournament"
+        self.run('tournament_load')
+        yield
+        self.at.text_input[0].set_value(f"Bench {self.name}")
+        players = sum(1 for widget in self.at.checkbox if widget.key.startswith("select_"))
+        for index in range(min(TOURNAMENT_SIZE, players)):
+            self.at.checkbox(key=f"select_{index}").check()
+        self.at.button(key="FormSubmitter:add_tournament_form-Add Tournament").click()
+        self.run('tournament_submit')
+        yield
+
+
+def _take_turns(steps):
+    """
+    Advance every session one rerun at a time, round-robin, until all are done.
+
+    Args:
+        steps (list): One generator per session, see Session.record_points.
+    """
+    while steps:
+        for step in list(steps):
+            if next(step, StopIteration) is StopIteration:
+                steps.remove(step)
+
+
+def _wait_for_flush(match_journal):
+    """
+    Wait until the match journal has pushed every point to the sheet.
+
+    Args:
+        match_journal (MatchJournal): The process-wide match journal.
+
+    Returns:
+        bool: True if every point was pushed before the timeout.
+    """
+    deadline = time.monotonic() + FLUSH_TIMEOUT_SECONDS
+    while match_journal.pending_count():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.05)
+    return True
+
+
+def run_scenario(roster_size, sessions, args):
+    """
+    Run one scenario: every session records points, then every session adds a tournament.
+
+    Args:
+        roster_size (int): Number of players in the club.
+        sessions (int): Number of simultaneous sessions.
+        args (argparse.Namespace): The command line arguments.
+
+    Returns:
+        dict: The measurements of the scenario.
+    """
+    from streamlit.testing.v1 import AppTest
+    from benchmarks.fake_sheets import FakeSpreadsheet, install, make_club_tabs
+    from modules.match_journal import match_journal
+
+    spreadsheet = FakeSpreadsheet(
+        make_club_tabs(roster_size, tab_names=TAB_NAMES),
+        latency=args.latency, error_rate=args.error_rate, seed=args.seed
+    )
+    install(spreadsheet)
+    clients = [Session(AppTest, f"{roster_size}-{sessions}-{index}") for index in range(sessions)]
+
+    if not args.skip_memory:
+        tracemalloc.reset_peak()
+    started = time.perf_counter()
+    _take_turns([client.record_points(args.points) for client in clients])
+    flushed = _wait_for_flush(match_journal)
+    record_calls = spreadsheet.total_calls
+    injected_failures = spreadsheet.failures
+    match_rows = len(spreadsheet.rows(TAB_NAMES['matches'])) - 1
+
+    spreadsheet.reset_counts()
+    _take_turns([client.add_tournament() for client in clients])
+    tournament_calls = spreadsheet.total_calls
+    injected_failures += spreadsheet.failures
+    elapsed = time.perf_counter() - started
+
+    timings = {}
+    for client in clients:
+        for kind, values in client.timings.items():
+            timings.setdefault(kind, []).extend(values)
+    points = sessions * args.points
+    return {
+        'roster_size': roster_size,
+        'sessions': sessions,
+        'points': points,
+        'seconds': elapsed,
+        'latency_ms': {
+            kind: {
+                'p50': _percentile(values, 0.5) * 1000,
+                'p95': _percentile(values, 0.95) * 1000,
+                'max': max(values) * 1000,
+            }
+            for kind, values in timings.items()
+        },
+        'sheets_calls_per_point': record_calls / points if points else None,
+        'sheets_calls_per_tournament': tournament_calls / sessions,
+        'injected_failures': injected_failures,
+        'rows_written': match_rows,
+        'rows_expected': points * sum(PLAYERS_PER_LINE.values()),
+        'all_points_synced': flushed,
+        'peak_memory_mb': None if args.skip_memory else tracemalloc.get_traced_memory()[1] / 2 ** 20,
+        'errors': sorted({error for client in clients for error in client.errors}),
+    }
+
+
+def print_report(results):
+    """
+    Print the measurements of every scenario as a table.
+
+    Args:
+        results (list): List of scenario measurements from run_scenario.
+    """
+    kinds = ['record_load', 'record_select', 'record_save', 'tournament_load', 'tournament_submit']
+    header = ["roster", "sessions"] + [f"{kind} p50/p95 ms" for kind in kinds] + [
+        "calls/point", "calls/tournament", "peak MB", "errors"
+    ]
+    print(" | ".join(header))
+    for result in results:
+        cells = [str(result['roster_size']), str(result['sessions'])]
+        for kind in kinds:
+            latency = result['latency_ms'].get(kind)
+            cells.append(f"{latency['p50']:.0f}/{latency['p95']:.0f}" if latency else "-")
+        cells.append(f"{result['sheets_calls_per_point']:.2f}")
+        cells.append(f"{result['sheets_calls_per_tournament']:.2f}")
+        cells.append("-" if result['peak_memory_mb'] is None else f"{result['peak_memory_mb']:.1f}")
+        cells.append(str(len(result['errors'])))
+        print(" | ".join(cells))
+        if result['rows_written'] != result['rows_expected'] or not result['all_points_synced']:
+            print(f"  ! wrote {result['rows_written']} of {result['rows_expected']} match rows")
+        for error in result['errors']:
+            print(f"  ! {error}")
+
+
+def _int_list(value):
+    return [int(item) for item in value.split(",") if item]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the app against a fake Google Sheets.")
+    parser.add_argument("--roster-sizes", type=_int_list, default=[20, 100, 500], help="club sizes to test")
+    parser.add_argument("--sessions", type=_int_list, default=[1, 10, 50], help="simultaneous sessions to test")
+    parser.add_argument("--points", type=int, default=3, help="points recorded by each session")
+    parser.add_argument("--latency", type=float, default=0.1, help="average seconds added to every Sheets request")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="chance that a Sheets request fails")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the injected latency and failures")
+    parser.add_argument("--reads-per-minute", type=int, default=60, help="Sheets read quota")
+    parser.add_argument("--writes-per-minute", type=int, default=60, help="Sheets write quota")
+    parser.add_argument("--skip-memory", action="store_true", help="do not trace memory")
+    parser.add_argument("--json", help="also write the measurements to this file")
+    args = parser.parse_args()
+    if args.json:
+        args.json = os.path.abspath(args.json)
+
+    with tempfile.TemporaryDirectory() as directory:
+        # Streamlit looks for .streamlit/secrets.toml in the working directory, so move
+        # there before Streamlit is imported
+        write_secrets(directory, args)
+        os.chdir(directory)
+        sys.path.insert(0, REPO_ROOT)
+        if not args.skip_memory:
+            tracemalloc.start()
+
+        results = []
+        for roster_size in args.roster_sizes:
+            for sessions in args.sessions:
+                results.append(run_scenario(roster_size, sessions, args))
+                print(f"roster {roster_size}, {sessions} session(s): {results[-1]['seconds']:.1f}s", file=sys.stderr)
+
+    print_report(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
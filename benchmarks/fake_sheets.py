@@ -0,0 +1,417 @@
+"""
+An in-memory stand-in for the parts of the gspread API the app uses.
+
+Every request is counted per method and worksheet, can be slowed down by an injected
+latency and can fail with an injected rate-limit or server error. A write can also fail
+after it was applied, as when the response is lost on the way back. Requests go through
+the process-wide request scheduler, like the real HTTP client, so quota waits and retries
+show up in the measurements.
+"""
+import json
+import random
+import threading
+import time
+from collections import Counter, deque
+
+import requests
+from gspread.exceptions import APIError, WorksheetNotFound
+from gspread.utils import a1_range_to_grid_range
+
+import modules.google_sheets_connection as google_sheets_connection
+from modules.match_format import MATCH_COLUMNS
+from modules.request_scheduler import scheduler
+from modules.sheet_cache import sheet_cache
+from modules import storage
+
+# Status codes returned by injected failures
+INJECTED_ERROR_CODES = (429, 503)
+
+# Blank rows below the data, as in a sheet created with the default 1000 rows
+EMPTY_GRID_ROWS = 1000
+
+LINES = ("O", "D")
+POSITIONS = ("Handler", "Cutter", "Hybrid")
+
+
+def _error_response(code):
+    """
+    Build a response like the one Google returns for a failed request.
+
+    Args:
+        code (int): The HTTP status code.
+
+    Returns:
+        requests.Response: The response.
+    """
+    response = requests.Response()
+    response.status_code = code
+    response._content = json.dumps(
+        {"error": {"code": code, "message": "Injected failure", "status": "UNAVAILABLE"}}
+    ).encode()
+    return response
+
+
+def _split_range(range_name):
+    """
+    Split an A1 range like "'matches'!A1:K" into the worksheet name and the cell range.
+
+    Args:
+        range_name (str): The range, optionally prefixed with a worksheet name.
+
+    Returns:
+        tuple: (worksheet name or None, cell range or None).
+    """
+    if "!" in range_name:
+        worksheet_name, cells = range_name.rsplit("!", 1)
+    elif range_name.startswith("'"):
+        worksheet_name, cells = range_name, None
+    else:
+        return None, range_name
+    return worksheet_name.strip("'").replace("''", "'"), cells
+
+
+class FakeWorksheet:
+    """
+    One tab of a FakeSpreadsheet, stored as a list of rows.
+    """
+
+    def __init__(self, spreadsheet, worksheet_id, title, rows):
+        self.spreadsheet = spreadsheet
+        self.id = worksheet_id
+        self.title = title
+        self.rows = [list(row) for row in rows]
+
+    @property
+    def row_count(self):
+        """
+        int: Number of rows in the grid, including the blank rows below the data.
+        """
+        return len(self.rows) + EMPTY_GRID_ROWS
+
+    def _read(self, method, fn, *args):
+        return self.spreadsheet.request('read', method, self.title, fn, coalesce_key=(id(self), method, repr(args)))
+
+    def _write(self, method, fn, idempotent=False):
+        return self.spreadsheet.request('write', method, self.title, fn, idempotent=idempotent)
+
+    def _values(self, cells):
+        """
+        Get the values in a cell range, trimmed like the Sheets API trims them.
+
+        Args:
+            cells (str): An A1 range, or None for the whole worksheet.
+
+        Returns:
+            list: List of lists of values.
+        """
+        grid = a1_range_to_grid_range(cells) if cells else {}
+        first_row = grid.get("startRowIndex", 0)
+        last_row = grid.get("endRowIndex", len(self.rows))
+        first_column = grid.get("startColumnIndex", 0)
+        last_column = grid.get("endColumnIndex")
+        values = []
+        for row in self.rows[first_row:last_row]:
+            row = row[first_column:last_column]
+            while row and row[-1] == '':
+                row = row[:-1]
+            values.append(row)
+        while values and not values[-1]:
+            values.pop()
+        return values
+
+    def get_all_records(self, **kwargs):
+        def read():
+            header = self.rows[0] if self.rows else []
+            return [dict(zip(header, row)) for row in self.rows[1:]]
+        return self._read('get_all_records', read)
+
+    def get_values(self, range_name=None, **kwargs):
+        return self._read('get_values', lambda: self._values(range_name), range_name)
+
+    def get_all_values(self, **kwargs):
+        return self._read('get_all_values', lambda: self._values(None))
+
+    def batch_get(self, ranges, **kwargs):
+        return self._read('batch_get', lambda: [self._values(cells) for cells in ranges], tuple(ranges))
+
+    def col_values(self, col, **kwargs):
+        return self._read('col_values', lambda: [row[col - 1] if col <= len(row) else '' for row in self.rows], col)
+
+    def row_values(self, row, **kwargs):
+        return self._read('row_values', lambda: list(self.rows[row - 1]) if row <= len(self.rows) else [], row)
+
+    def append_row(self, values, **kwargs):
+        return self.append_rows([values], **kwargs)
+
+    def append_rows(self, values, **kwargs):
+        def write():
+            with self.spreadsheet.lock:
+                first_row = len(self.rows) + 1
+                self.rows.extend(list(row) for row in values)
+                last_row = len(self.rows)
+            width = max((len(row) for row in values), default=1)
+            last_column = chr(ord('A') + width - 1)
+            return {"updates": {"updatedRange": f"'{self.title}'!A{first_row}:{last_column}{last_row}",
+                                "updatedRows": len(values)}}
+        return self._write('append_rows', write)
+
+    def clear(self):
+        def write():
+            with self.spreadsheet.lock:
+                self.rows = []
+        return self._write('clear', write, idempotent=True)
+
+    def update(self, values=None, range_name=None, **kwargs):
+        def write():
+            with self.spreadsheet.lock:
+                self.rows = [list(row) for row in values]
+        return self._write('update', write, idempotent=True)
+
+
+class FakeSpreadsheet:
+    """
+    An in-memory Google Sheets document with injected latency and errors.
+
+    Args:
+        tabs (dict): Worksheet name to list of rows, header first.
+        latency (float): Average seconds added to every request.
+        error_rate (float): Chance between 0 and 1 that a request fails with a 429 or 503
+            before it is applied.
+        lost_response_rate (float): Chance between 0 and 1 that a write is applied and then
+            fails with a 503, as if the response was lost.
+        seed (int): Seed for the latency jitter and the injected failures.
+    """
+
+    def __init__(self, tabs, latency=0.0, error_rate=0.0, lost_response_rate=0.0, seed=None):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.lost_response_rate = lost_response_rate
+        self.calls = Counter()
+        self.failures = 0
+        self.lock = threading.RLock()
+        self._random = random.Random(seed)
+        # 'read' or 'write' -> queue of (status code, applied) failures for the next requests
+        self._scripted_failures = {'read': deque(), 'write': deque()}
+        self._tabs = {
+            title: FakeWorksheet(self, worksheet_id, title, rows)
+            for worksheet_id, (title, rows) in enumerate(tabs.items())
+        }
+
+    def request(self, kind, method, worksheet_name, fn, coalesce_key=None, idempotent=None):
+        """
+        Send one request through the request scheduler, counting it and injecting latency and errors.
+
+        Args:
+            kind (str): 'read' or 'write'.
+            method (str): The name of the API method, for the call counts.
+            worksheet_name (str): The worksheet the request touches, or None.
+            fn (callable): Function with no arguments that performs the request.
+            coalesce_key (hashable): Key for sharing identical reads, see RequestScheduler.call.
+            idempotent (bool): Whether the request can be retried safely, see RequestScheduler.call.
+
+        Returns:
+            The result of fn.
+        """
+        def send():
+            with self.lock:
+                self.calls[(method, worksheet_name)] += 1
+                delay = self._random.uniform(0.5, 1.5) * self.latency
+                failure = None
+                if self._scripted_failures[kind]:
+                    failure = self._scripted_failures[kind].popleft()
+                elif self._random.random() < self.error_rate:
+                    failure = (self._random.choice(INJECTED_ERROR_CODES), False)
+                elif kind == 'write' and self._random.random() < self.lost_response_rate:
+                    failure = (503, True)
+                if failure:
+                    self.failures += 1
+            if delay:
+                time.sleep(delay)
+            if failure:
+                code, applied = failure
+                if applied:
+                    fn()
+                raise APIError(_error_response(code))
+            return fn()
+        return scheduler.call(
+            kind, send, coalesce_key=coalesce_key if kind == 'read' else None, idempotent=idempotent
+        )
+
+    def fail_next(self, kind='write', count=1, code=503, applied=False):
+        """
+        Make the next requests of a kind fail, whatever the error rates.
+
+        Args:
+            kind (str): 'read' or 'write'.
+            count (int): Number of requests that fail.
+            code (int): The HTTP status code they fail with.
+            applied (bool): Apply each write before failing, as if its response was lost.
+        """
+        with self.lock:
+            self._scripted_failures[kind].extend([(code, applied)] * count)
+
+    @property
+    def total_calls(self):
+        """
+        int: Number of requests sent so far, including failed ones.
+        """
+        with self.lock:
+            return sum(self.calls.values())
+
+    def reset_counts(self):
+        """
+        Forget the request counts.
+        """
+        with self.lock:
+            self.calls.clear()
+            self.failures = 0
+
+    def rows(self, worksheet_name):
+        """
+        Get the rows of a worksheet without sending a request.
+
+        Args:
+            worksheet_name (str): The worksheet name.
+
+        Returns:
+            list: List of rows, header first.
+        """
+        with self.lock:
+            return [list(row) for row in self._tabs[worksheet_name].rows]
+
+    def worksheet(self, title):
+        def read():
+            if title not in self._tabs:
+                raise WorksheetNotFound(title)
+            return self._tabs[title]
+        return self.request('read', 'worksheet', title, read)
+
+    def worksheets(self, **kwargs):
+        return self.request('read', 'worksheets', None, lambda: list(self._tabs.values()))
+
+    def add_worksheet(self, title, rows=1, cols=1, **kwargs):
+        def write():
+            with self.lock:
+                worksheet = self._tabs[title] = FakeWorksheet(self, len(self._tabs), title, [])
+            return worksheet
+        return self.request('write', 'add_worksheet', title, write)
+
+    def fetch_sheet_metadata(self, params=None):
+        def read():
+            return {"sheets": [
+                {"properties": {"sheetId": worksheet.id, "title": worksheet.title,
+                                "gridProperties": {"rowCount": worksheet.row_count}}}
+                for worksheet in self._tabs.values()
+            ]}
+        return self.request('read', 'fetch_sheet_metadata', None, read)
+
+    def values_batch_get(self, ranges, params=None):
+        def read():
+            value_ranges = []
+            for range_name in ranges:
+                worksheet_name, cells = _split_range(range_name)
+                values = self._tabs[worksheet_name]._values(cells)
+                if (params or {}).get('majorDimension') == 'COLUMNS':
+                    width = max((len(row) for row in values), default=0)
+                    values = [[row[i] if i < len(row) else '' for row in values] for i in range(width)]
+                    for column in values:
+                        while column and column[-1] == '':
+                            column.pop()
+                value_ranges.append({"range": range_name, "values": values})
+            return {"valueRanges": value_ranges}
+        return self.request('read', 'values_batch_get', None, read, coalesce_key=(id(self), tuple(ranges)))
+
+    def batch_update(self, body):
+        def write():
+            by_id = {worksheet.id: worksheet for worksheet in self._tabs.values()}
+            with self.lock:
+                for request in body["requests"]:
+                    if "deleteDimension" in request:
+                        grid = request["deleteDimension"]["range"]
+                        del by_id[grid["sheetId"]].rows[grid["startIndex"]:grid["endIndex"]]
+                        continue
+                    append = request["appendCells"]
+                    by_id[append["sheetId"]].rows.extend(
+                        [next(iter(cell["userEnteredValue"].values())) for cell in row["values"]]
+                        for row in append["rows"]
+                    )
+            return {"replies": [{} for _ in body["requests"]]}
+        return self.request('write', 'batch_update', None, write)
+
+    def values_batch_update(self, body=None):
+        def write():
+            with self.lock:
+                for value_range in body["data"]:
+                    worksheet_name, cells = _split_range(value_range["range"])
+                    rows = self._tabs[worksheet_name].rows
+                    grid = a1_range_to_grid_range(cells)
+                    first_row = grid.get("startRowIndex", 0)
+                    first_column = grid.get("startColumnIndex", 0)
+                    for offset, values in enumerate(value_range["values"]):
+                        while len(rows) <= first_row + offset:
+                            rows.append([])
+                        row = rows[first_row + offset]
+                        row.extend([''] * (first_column + len(values) - len(row)))
+                        row[first_column:first_column + len(values)] = list(values)
+            return {"totalUpdatedRows": sum(len(value_range["values"]) for value_range in body["data"])}
+        return self.request('write', 'values_batch_update', None, write, idempotent=True)
+
+
+class FakeClient:
+    """
+    Stands in for gspread.Client, handing out one FakeSpreadsheet whatever name is opened.
+    """
+
+    http_client = None
+
+    def __init__(self, spreadsheet):
+        self.spreadsheet = spreadsheet
+
+    def open(self, title, **kwargs):
+        return self.spreadsheet.request('read', 'open', None, lambda: self.spreadsheet)
+
+
+def make_club_tabs(roster_size, tournament_name="Spring", tab_names=None):
+    """
+    Build the tabs of a club with one tournament that the whole roster is playing.
+
+    Args:
+        roster_size (int): Number of players in the club.
+        tournament_name (str): The name of the tournament.
+        tab_names (dict): Worksheet names keyed by 'tournaments', 'roster', 'tournament_rosters'
+            and 'matches', defaulting to those keys.
+
+    Returns:
+        dict: Worksheet name to list of rows, header first.
+    """
+    tab_names = tab_names or {}
+    players = [
+        [f"Player {index + 1}", LINES[index % 2], POSITIONS[index % 3]]
+        for index in range(roster_size)
+    ]
+    return {
+        tab_names.get('tournaments', 'tournaments'): [["tournament_name"], [tournament_name]],
+        tab_names.get('roster', 'roster'): [["player_name"]] + [[name] for name, _, _ in players],
+        tab_names.get('tournament_rosters', 'tournament_rosters'): (
+            [["tournament_name", "player_name", "line", "position"]]
+            + [[tournament_name] + player for player in players]
+        ),
+        tab_names.get('matches', 'matches'): [list(MATCH_COLUMNS)],
+    }
+
+
+def install(spreadsheet):
+    """
+    Point the app at a FakeSpreadsheet instead of Google Sheets.
+
+    Drops every cached connection, backend and cached sheet value, so nothing read
+    from an earlier spreadsheet survives.
+
+    Args:
+        spreadsheet (FakeSpreadsheet): The spreadsheet to serve.
+    """
+    google_sheets_connection._authorize = lambda credentials_dict: FakeClient(spreadsheet)
+    google_sheets_connection.reset_connections()
+    with storage._backend_lock:
+        storage._backends.clear()
+    sheet_cache.clear()
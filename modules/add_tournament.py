@@ -1,103 +1,123 @@
 import streamlit as st
 import pandas as pd
-from modules.google_sheets_connection import connect_to_google_sheets
-from oauth2client.service_account import ServiceAccountCredentials
+from modules.storage import get_backend
+from modules.roster_index import Player, build_roster_index
+from modules.sheet_cache import sheet_cache
+from modules.idempotency import submissions
+from modules.instrumentation import track_backend_call, tracked_fragment
+from modules.roster_import import read_import_csv, plan_import, run_import
 import gspread
+import hashlib
+import uuid
 
-# Input fields for JSON keyfile, Google Sheets name, and worksheet name
-credentials = st.secrets["gcp_service_account"]
-sheet_name = st.secrets["SHEET_NAME"]
+# Worksheet names, also used to key the shared cache
 tournament_tab_name = st.secrets["TOURNAMENT_TAB_NAME"]
 roster_tab_name = st.secrets["ROSTER_TAB_NAME"]
 tournament_roster_tab_name = st.secrets["TOURNAMENT_ROSTER_TAB_NAME"]
 
 
-def get_roster():
+def load_add_tournament_data():
+    """
+    Load the club roster and the tournament names in one request and fill the shared cache.
+    """
+    def load():
+        with track_backend_call('load_tables', roster_tab_name) as call:
+            tables = get_backend().load_tables(tournaments=True, roster=True)
+            call.rows = len(tables.tournaments) + len(tables.roster)
+        sheet_cache.set((tournament_tab_name,), tables.tournaments)
+        sheet_cache.set((roster_tab_name,), build_roster_index(tables.roster))
+        return True
+    
+    sheet_cache.get_or_load(('page', 'add_tournament'), load)
+
+
+def get_roster_index():
     """
-    Get the club roster from the roster tab in Google Sheets.
+    Get an index of the club roster from the storage backend.
+    
+    The index is built once per roster load and served from the shared cache.
     
     Returns:
-        pandas.DataFrame: DataFrame containing the club roster.
+        RosterIndex: Index of the club roster.
     """
+    def load():
+        with track_backend_call('get_roster', roster_tab_name) as call:
+            records = get_backend().get_roster()
+            call.rows = len(records)
+        return build_roster_index(records)
+    
     try:
-        sheet = connect_to_google_sheets(credentials, sheet_name, roster_tab_name)
-        data = sheet.get_all_records()
-        return pd.DataFrame(data)
+        return sheet_cache.get_or_load((roster_tab_name,), load)
     except Exception as e:
         raise e
 
 
-def add_tournament(tournament_name, selected_players):
+def get_roster():
     """
-    Add a new tournament and its roster using the most efficient approach.
+    Get the club roster from the storage backend.
+    
+    Returns:
+        pandas.DataFrame: DataFrame containing the club roster.
+    """
+    return pd.DataFrame(get_roster_index().records())
+
+
+def add_tournament(tournament_name, selected_players, idempotency_key=None):
+    """
+    Add a new tournament and its roster to the storage backend.
+    
+    The tournament and its roster are written together in a single request. Repeating a
+    submission with the same idempotency key returns the first result without writing again.
     
     Args:
         tournament_name (str): The name of the tournament to add.
         selected_players (list): List of dictionaries containing player info and assignments.
+        idempotency_key (str): Identifies this submission, so retries and double submits are no-ops.
         
     Returns:
         bool: True if the tournament was successfully added, False otherwise.
     """
     try:
-        # Connect to Google Sheets once
-        scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-        creds = ServiceAccountCredentials.from_json_keyfile_dict(credentials, scope)
-        client = gspread.authorize(creds)
-        spreadsheet = client.open(sheet_name)
-        
-        # Get tournament worksheet
-        tournament_sheet = spreadsheet.worksheet(tournament_tab_name)
-        
-        # Check if tournament exists
-        all_tournaments = tournament_sheet.get_all_records()
-        for row in all_tournaments:
-            if 'tournament_name' in row and row['tournament_name'] == tournament_name:
-                return False
-                
-        # Add tournament
-        tournament_sheet.append_row([tournament_name], value_input_option='RAW')
-        
-        # Get tournament roster worksheet
-        roster_sheet = spreadsheet.worksheet(tournament_roster_tab_name)
-        
         # Filter only selected players and prepare data for batch insert
         selected_players_data = [
             [tournament_name, p['player_name'], p['line'], p['position']]
             for p in selected_players if p['selected']
         ]
         
-        # Use batch append for maximum efficiency
-        if selected_players_data:
-            roster_sheet.append_rows(
-                selected_players_data, 
-                value_input_option='RAW',  # Use RAW for faster processing
-                insert_data_option='INSERT_ROWS',
-                table_range='A1'  # Ensure data is added to the right range
-            )
+        def write():
+            with track_backend_call('add_tournament', tournament_tab_name, rows=1 + len(selected_players_data)):
+                return get_backend().add_tournament(tournament_name, selected_players_data)
+        
+        key = ('add_tournament', idempotency_key) if idempotency_key else None
+        if not submissions.run(key, write):
+            return False
+        
+        # Write through to the shared cache so no session sees a stale tournament list or roster
+        sheet_cache.patch((tournament_tab_name,), lambda names: names + [tournament_name])
+        sheet_cache.set(
+            (tournament_roster_tab_name, tournament_name),
+            build_roster_index([
+                Player(player_name, line, position) for _, player_name, line, position in selected_players_data
+            ])
+        )
         
         return True
     except Exception as e:
         raise e
 
 
-def add_tournament_ui():
+@st.fragment
+@tracked_fragment
+def _tournament_form(roster):
     """
-    Display UI for adding a new tournament with player selection.
+    Display the tournament form and add the tournament when it is submitted.
     
-    This function creates a form in the Streamlit app that allows the user to enter a
-    tournament name and select players from the roster with their line and position assignments.
-    When the form is submitted, it adds the tournament and player information to the Google
-    Sheets document and displays a success or error message.
-    """
-    st.subheader("Add New Tournament")
-    
-    try:
-        # Get the roster first
-        roster_df = get_roster()
-    except Exception as e:
-        st.error(f"Error loading roster: {e}")
-        return
+    Submitting only reruns this form, so the roster is not reloaded and the rest of
+    the page is not re-rendered.
     
+    Args:
+        roster (RosterIndex): The club roster.
+    """
     # Create a form for tournament details
     with st.form(key='add_tournament_form'):
         tournament_name = st.text_input("Tournament Name")
@@ -108,8 +128,8 @@ def add_tournament_ui():
         player_selections = []
         
         # Display each player with selection options
-        for index, row in roster_df.iterrows():
-            player_name = row.get('player_name', f"Player {index + 1}")
+        for index, player in enumerate(roster.players):
+            player_name = player.name or f"Player {index + 1}"
             
             # Create a container for each player
             col1, col2, col3, col4 = st.columns([1, 1, 1, 1])
@@ -152,8 +172,16 @@ def add_tournament_ui():
             st.warning("No players selected for the tournament")
             return
             
+        # The same tournament submitted twice from this session is only written once
+        if "add_tournament_nonce" not in st.session_state:
+            st.session_state.add_tournament_nonce = uuid.uuid4().hex
+        idempotency_key = f"{st.session_state.add_tournament_nonce}:{tournament_name}"
+        
         try:
-            success = add_tournament(tournament_name, player_selections)
+            success = add_tournament(tournament_name, player_selections, idempotency_key)
+            # A later submission of the same name gets a new key, so it is checked again
+            # and reported as already existing instead of replaying this result
+            st.session_state.add_tournament_nonce = uuid.uuid4().hex
             if success:
                 st.success(f"Successfully added tournament '{tournament_name}' with {selected_count} players")
             else:
@@ -162,3 +190,134 @@ def add_tournament_ui():
             st.error(f"API Error: {e.response.text}")
         except Exception as e:
             st.error(f"Error: {e}")
+
+
+def _plan_roster_import(records, roster):
+    """
+    Plan an import against the tournament rosters as they are in the sheet now.
+    
+    Args:
+        records (list): The rows of the CSV file, from read_import_csv.
+        roster (RosterIndex): The club roster.
+    
+    Returns:
+        ImportPlan: The plan from plan_import.
+    """
+    with track_backend_call('load_tables', tournament_roster_tab_name) as call:
+        tables = get_backend().load_tables(tournaments=True, tournament_rosters=True)
+        call.rows = len(tables.tournaments) + sum(len(rows) for rows in tables.tournament_rosters.values())
+    return plan_import(records, roster, tables)
+
+
+@st.fragment
+@tracked_fragment
+def _import_panel(roster):
+    """
+    Display the CSV roster import and run it when confirmed.
+    
+    The plan shown is built once per uploaded file and kept in the session. The rosters
+    are read again when Import is pressed, so rows added since the file was uploaded,
+    including by an import that stopped part way, are not written twice.
+    
+    Args:
+        roster (RosterIndex): The club roster.
+    """
+    st.subheader("Import Rosters from CSV")
+    st.caption(
+        "One row per player with tournament_name, player_name, line and position columns. "
+        "A blank line or position is taken from the club roster."
+    )
+    uploaded = st.file_uploader("CSV file", type="csv", key="roster_import_file")
+    if uploaded is None:
+        st.session_state.pop("roster_import_plan", None)
+        return
+    
+    data = uploaded.getvalue()
+    digest = hashlib.sha1(data).hexdigest()
+    cached = st.session_state.get("roster_import_plan")
+    if cached is not None and cached[0] == digest:
+        _, records, plan = cached
+    else:
+        try:
+            records = read_import_csv(data)
+            plan = _plan_roster_import(records, roster)
+        except ValueError as e:
+            st.error(str(e))
+            return
+        except Exception as e:
+            st.error(f"Error loading tournament rosters: {e}")
+            return
+        st.session_state.roster_import_plan = (digest, records, plan)
+    
+    if plan.errors:
+        st.error(f"Fix {len(plan.errors)} rows and upload the file again:")
+        st.markdown("\n".join(f"- {error}" for error in plan.errors[:20]))
+        if len(plan.errors) > 20:
+            st.caption(f"...and {len(plan.errors) - 20} more")
+        return
+    
+    if not plan.rows:
+        st.info(f"Every player in the file is already on their tournament roster ({plan.skipped} rows)")
+        return
+    
+    tournament_count = len({row[0] for row in plan.rows})
+    st.write(
+        f"{len(plan.rows)} players to add to {tournament_count} tournaments "
+        f"({len(plan.new_tournaments)} new). {plan.skipped} rows are already on a roster."
+    )
+    
+    if st.button("Import", type="primary"):
+        progress_bar = st.progress(0.0)
+        
+        # A double-clicked Import waits for the first one instead of writing the rows twice
+        if "add_tournament_nonce" not in st.session_state:
+            st.session_state.add_tournament_nonce = uuid.uuid4().hex
+        key = ('import_rosters', st.session_state.add_tournament_nonce, digest)
+        
+        def import_rows():
+            fresh_plan = _plan_roster_import(records, roster)
+            
+            def show_progress(written):
+                progress_bar.progress(
+                    written / len(fresh_plan.rows), text=f"Imported {written} of {len(fresh_plan.rows)} players"
+                )
+            
+            return fresh_plan, run_import(fresh_plan, show_progress)
+        
+        try:
+            fresh_plan, written = submissions.run(key, import_rows)
+        except gspread.exceptions.APIError as e:
+            st.error(f"Import stopped: {e.response.text}. Press Import again to add the remaining players.")
+            return
+        except Exception as e:
+            st.error(f"Import stopped: {e}. Press Import again to add the remaining players.")
+            return
+        # Every row of the file is on a roster now, so the next run has nothing left to plan
+        done = fresh_plan._replace(new_tournaments=[], rows=[], skipped=fresh_plan.skipped + written)
+        st.session_state.roster_import_plan = (digest, records, done)
+        st.success(f"Imported {written} players")
+
+
+def add_tournament_ui():
+    """
+    Display UI for adding a new tournament with player selection.
+    
+    This function creates a form in the Streamlit app that allows the user to enter a
+    tournament name and select players from the roster with their line and position assignments.
+    When the form is submitted, it adds the tournament and player information to the Google
+    Sheets document and displays a success or error message.
+    """
+    st.subheader("Add New Tournament")
+    
+    try:
+        # Get the roster first
+        load_add_tournament_data()
+        roster = get_roster_index()
+    except Exception as e:
+        st.error(f"Error loading roster: {e}")
+        return
+    
+    _tournament_form(roster)
+    
+    st.markdown("---")
+    _import_panel(roster)
@@ -0,0 +1,136 @@
+import sys
+import threading
+
+from gspread.utils import absolute_range_name, rowcol_to_a1
+
+
+class ColumnReader:
+    """
+    Reads chosen columns of worksheets by header name, all in one request.
+
+    Only the requested columns are fetched, each as a single list of values, so columns
+    added by hand and the rest of a wide tab are never downloaded or parsed. Where each
+    column is found is resolved from the header row once per worksheet and kept for the
+    life of the process. Every read also fetches the header cell of each column it reads,
+    so a column that has been moved is noticed and its worksheet is resolved again.
+    """
+
+    def __init__(self, get_spreadsheet, layouts=None):
+        """
+        Args:
+            get_spreadsheet (callable): Function with no arguments returning the gspread.Spreadsheet.
+            layouts (dict): Worksheet name -> column names in sheet order, for tabs the app
+                writes itself. Their header row is only read if a column is not where expected.
+        """
+        self._get_spreadsheet = get_spreadsheet
+        self._lock = threading.Lock()
+        # Worksheet name -> column name -> 0-based column index
+        self._positions = {
+            worksheet_name: {column: i for i, column in enumerate(columns)}
+            for worksheet_name, columns in (layouts or {}).items()
+        }
+
+    def _resolve(self, spreadsheet, worksheet_names):
+        """
+        Read the header rows of worksheets in one request and record where each column is.
+
+        Args:
+            spreadsheet (gspread.Spreadsheet): The spreadsheet.
+            worksheet_names (list): The worksheet names.
+        """
+        response = spreadsheet.values_batch_get(
+            [absolute_range_name(worksheet_name, "1:1") for worksheet_name in worksheet_names],
+            params={'valueRenderOption': 'UNFORMATTED_VALUE'}
+        )
+        for worksheet_name, value_range in zip(worksheet_names, response.get('valueRanges', [])):
+            header = (value_range.get('values') or [[]])[0]
+            positions = {}
+            for i, column in enumerate(header):
+                # If two columns share a name, the first one is read
+                positions.setdefault(str(column).strip(), i)
+            with self._lock:
+                self._positions[worksheet_name] = positions
+
+    def _fetch(self, spreadsheet, requests):
+        """
+        Fetch the requested columns, with their header cells, in one request.
+
+        Args:
+            spreadsheet (gspread.Spreadsheet): The spreadsheet.
+            requests (list): (worksheet name, column names) tuples.
+
+        Returns:
+            tuple: (list of column name -> values dictionaries, one per request, with the
+            header cell first; set of worksheets where a header cell did not match).
+        """
+        with self._lock:
+            positions = [dict(self._positions.get(worksheet_name, {})) for worksheet_name, _ in requests]
+
+        ranges = []
+        located = []
+        for (worksheet_name, columns), found in zip(requests, positions):
+            located.append([column for column in columns if column in found])
+            for column in located[-1]:
+                letter = rowcol_to_a1(1, found[column] + 1)[:-1]
+                ranges.append(absolute_range_name(worksheet_name, f"{letter}:{letter}"))
+        if not ranges:
+            return [{} for _ in requests], set()
+
+        response = spreadsheet.values_batch_get(
+            ranges, params={'valueRenderOption': 'UNFORMATTED_VALUE', 'majorDimension': 'COLUMNS'}
+        )
+        value_ranges = iter(response.get('valueRanges', []))
+        columns_by_request = []
+        moved = set()
+        for (worksheet_name, _), columns in zip(requests, located):
+            values_by_column = {}
+            for column in columns:
+                values = (next(value_ranges).get('values') or [[]])[0]
+                if not values or str(values[0]).strip() != column:
+                    moved.add(worksheet_name)
+                values_by_column[column] = values
+            columns_by_request.append(values_by_column)
+        return columns_by_request, moved
+
+    def read(self, requests):
+        """
+        Read columns from one or more worksheets.
+
+        Args:
+            requests (list): (worksheet name, column names) tuples.
+
+        Returns:
+            list: For each request, a list of row tuples with one value per column name, in
+            sheet order. Columns the worksheet does not have read as ''. Rows blank in every
+            requested column are left out. Repeated text values are interned, so the many
+            rows sharing a line, position or tournament name share one string.
+        """
+        spreadsheet = self._get_spreadsheet()
+        with self._lock:
+            unknown = [worksheet_name for worksheet_name, _ in requests if worksheet_name not in self._positions]
+        if unknown:
+            self._resolve(spreadsheet, list(dict.fromkeys(unknown)))
+
+        columns_by_request, moved = self._fetch(spreadsheet, requests)
+        if moved:
+            self._resolve(spreadsheet, sorted(moved))
+            columns_by_request, _ = self._fetch(spreadsheet, requests)
+
+        tables = []
+        for (_, columns), values_by_column in zip(requests, columns_by_request):
+            # The header cell is dropped; the API leaves out trailing blank cells of each column
+            column_values = [values_by_column.get(column, [''])[1:] for column in columns]
+            height = max((len(values) for values in column_values), default=0)
+            rows = []
+            for i in range(height):
+                row = tuple(
+                    _decode(values[i]) if i < len(values) else '' for values in column_values
+                )
+                if any(value != '' for value in row):
+                    rows.append(row)
+            tables.append(rows)
+        return tables
+
+
+def _decode(value):
+    return sys.intern(value) if isinstance(value, str) else value
@@ -0,0 +1,273 @@
+"""
+Export the match history and tournament rosters to Parquet for offline analysis.
+
+Usage:
+    python -m modules.export_matches [--out DIR] [--full]
+
+Match rows are streamed from the storage backend in chunks and written to one partition
+per tournament, laid out as a Hive-partitioned dataset:
+
+    DIR/matches/tournament_name=<name>/part-<run>.parquet
+    DIR/rosters/tournament_name=<name>/roster.parquet
+    DIR/manifest.json
+
+The manifest lists the points already exported, so each run writes only new points, in
+a new part file per tournament. Load the export with pandas.read_parquet("DIR/matches").
+
+pyarrow is imported here rather than by the pages, so it is only loaded when an export runs.
+"""
+import argparse
+import io
+import json
+import os
+import shutil
+import time
+import uuid
+import zipfile
+from collections import namedtuple
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import streamlit as st
+
+from modules.match_format import MATCH_COLUMNS, make_point_id, row_match_id
+from modules.storage import get_backend
+
+DEFAULT_EXPORT_DIR = "exports"
+MANIFEST_NAME = "manifest.json"
+
+# Repeated text is stored once per file and loads as pandas categoricals
+_text = pa.dictionary(pa.int32(), pa.string())
+
+# The tournament name is the partition key, so it is stored in the directory names
+MATCH_SCHEMA = pa.schema([
+    ('match_id', _text),
+    ('date', _text),
+    ('opponent', _text),
+    ('point_number', pa.int32()),
+    ('player_name', _text),
+    ('line', _text),
+    ('position', _text),
+    ('scored', pa.bool_()),
+    ('score_for', pa.int32()),
+    ('score_against', pa.int32()),
+])
+ROSTER_SCHEMA = pa.schema([('player_name', _text), ('line', _text), ('position', _text)])
+
+ExportResult = namedtuple('ExportResult', ['points', 'rows', 'files'])
+
+export_dir = st.secrets.get("EXPORT_DIR", DEFAULT_EXPORT_DIR)
+
+
+def _partition(root, tournament_name):
+    """
+    Get the directory of a tournament's partition.
+
+    Args:
+        root (str): The dataset directory.
+        tournament_name (str): The name of the tournament.
+
+    Returns:
+        str: The partition directory, with the name escaped the way pyarrow reads it back.
+    """
+    return os.path.join(root, f"tournament_name={quote(str(tournament_name), safe='')}")
+
+
+def _write_atomically(path, write):
+    """
+    Write a file under a temporary name and move it into place, so readers never see part of it.
+
+    Args:
+        path (str): The final path.
+        write (callable): Function taking the temporary path and writing the file there.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # pyarrow skips files starting with a dot when it reads a dataset
+    temporary_path = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.tmp")
+    write(temporary_path)
+    os.replace(temporary_path, path)
+
+
+def load_manifest(out_dir):
+    """
+    Read the export manifest.
+
+    Args:
+        out_dir (str): The export directory.
+
+    Returns:
+        dict: 'points' (tournament name -> exported point ids) and 'files' (list of part
+        files relative to out_dir), empty if nothing has been exported yet.
+    """
+    path = os.path.join(out_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {'points': {}, 'files': []}
+    with open(path) as f:
+        return json.load(f)
+
+
+def match_table(rows):
+    """
+    Build an Arrow table from wide match rows of one tournament.
+
+    Args:
+        rows (list): List of lists in MATCH_COLUMNS order.
+
+    Returns:
+        pyarrow.Table: The rows in MATCH_SCHEMA.
+    """
+    df = pd.DataFrame(rows, columns=MATCH_COLUMNS)
+    df['match_id'] = [row_match_id(row) for row in rows]
+    for column in ['date', 'opponent', 'player_name', 'line', 'position']:
+        df[column] = df[column].astype(str)
+    for column in ['point_number', 'score_for', 'score_against']:
+        df[column] = pd.to_numeric(df[column], errors='coerce').fillna(0).astype(np.int32)
+    df['scored'] = df['point_scored'].astype(str).str.lower().eq('yes')
+    return pa.Table.from_pandas(df[MATCH_SCHEMA.names], schema=MATCH_SCHEMA, preserve_index=False)
+
+
+def _export_rosters(out_dir, backend):
+    """
+    Write the roster of every tournament, replacing the previous export.
+
+    Rosters are small and can be edited by hand, so they are rewritten on every run.
+
+    Args:
+        out_dir (str): The export directory.
+        backend (StorageBackend): The backend to read from.
+
+    Returns:
+        list: The files written, relative to out_dir.
+    """
+    files = []
+    for tournament_name, players in backend.load_tables(tournament_rosters=True).tournament_rosters.items():
+        table = pa.Table.from_pydict(
+            {
+                'player_name': [player.name for player in players],
+                'line': [str(player.line) for player in players],
+                'position': [str(player.position) for player in players],
+            },
+            schema=ROSTER_SCHEMA,
+        )
+        path = os.path.join(_partition(os.path.join(out_dir, "rosters"), tournament_name), "roster.parquet")
+        _write_atomically(path, lambda temporary_path: pq.write_table(table, temporary_path, compression='zstd'))
+        files.append(os.path.relpath(path, out_dir))
+    return files
+
+
+def export_matches(out_dir=export_dir, full=False, progress=None):
+    """
+    Export the points recorded since the last run, and every tournament roster, to Parquet.
+
+    Match rows are read a chunk at a time and each chunk is appended to its tournament's
+    part file as a row group, so memory use does not grow with the season. The manifest is
+    only updated once every part file is complete, so an interrupted run exports the same
+    points again next time.
+
+    Args:
+        out_dir (str): The export directory.
+        full (bool): Delete the previous export and export every point again.
+        progress (callable): Called with the number of match rows read so far after each chunk.
+
+    Returns:
+        ExportResult: Number of new points and rows, and the files written relative to out_dir.
+    """
+    backend = get_backend()
+    if full:
+        shutil.rmtree(os.path.join(out_dir, "matches"), ignore_errors=True)
+        manifest = {'points': {}, 'files': []}
+    else:
+        manifest = load_manifest(out_dir)
+    exported = {name: set(point_ids) for name, point_ids in manifest['points'].items()}
+
+    # Unique even for runs started in the same second, which would otherwise replace each other
+    run = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    writers = {}
+    new_points = {}
+    rows_read = rows_written = 0
+    try:
+        for chunk in backend.iter_match_rows():
+            rows_read += len(chunk)
+            by_tournament = {}
+            for row in chunk:
+                tournament_name = str(row[0])
+                point_id = make_point_id(row_match_id(row), row[3])
+                # Compare with the points exported by earlier runs only: the rows of a point can
+                # span two chunks
+                if point_id in exported.get(tournament_name, ()):
+                    continue
+                new_points.setdefault(tournament_name, set()).add(point_id)
+                by_tournament.setdefault(tournament_name, []).append(row)
+
+            for tournament_name, rows in by_tournament.items():
+                if tournament_name not in writers:
+                    partition = _partition(os.path.join(out_dir, "matches"), tournament_name)
+                    path = os.path.join(partition, f"part-{run}.parquet")
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    temporary_path = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.tmp")
+                    writers[tournament_name] = (
+                        path, temporary_path, pq.ParquetWriter(temporary_path, MATCH_SCHEMA, compression='zstd')
+                    )
+                writers[tournament_name][2].write_table(match_table(rows))
+                rows_written += len(rows)
+            if progress:
+                progress(rows_read)
+    finally:
+        for _, _, writer in writers.values():
+            writer.close()
+
+    files = []
+    for path, temporary_path, _ in writers.values():
+        os.replace(temporary_path, path)
+        files.append(os.path.relpath(path, out_dir))
+    files += _export_rosters(out_dir, backend)
+
+    for tournament_name, point_ids in new_points.items():
+        exported.setdefault(tournament_name, set()).update(point_ids)
+    manifest = {
+        'points': {name: sorted(point_ids) for name, point_ids in exported.items()},
+        'files': sorted(set(manifest['files']) | set(files)),
+    }
+    manifest_path = os.path.join(out_dir, MANIFEST_NAME)
+
+    def write_manifest(temporary_path):
+        with open(temporary_path, "w") as f:
+            json.dump(manifest, f)
+    _write_atomically(manifest_path, write_manifest)
+
+    return ExportResult(sum(len(point_ids) for point_ids in new_points.values()), rows_written, files)
+
+
+def export_archive(out_dir=export_dir):
+    """
+    Zip the export directory, e.g. for a download.
+
+    Args:
+        out_dir (str): The export directory.
+
+    Returns:
+        bytes: The zip archive.
+    """
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for directory, _, file_names in os.walk(out_dir):
+            for file_name in file_names:
+                if not file_name.startswith("."):
+                    path = os.path.join(directory, file_name)
+                    archive.write(path, os.path.relpath(path, out_dir))
+    return buffer.getvalue()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the match history and rosters to Parquet.")
+    parser.add_argument("--out", default=export_dir, help=f"export directory (default: {export_dir})")
+    parser.add_argument("--full", action="store_true", help="export every point again instead of only new ones")
+    args = parser.parse_args()
+
+    result = export_matches(args.out, full=args.full, progress=lambda rows: print(f"Read {rows} match rows"))
+    print(f"Exported {result.points} new points ({result.rows} rows) to {args.out}")
+    for path in result.files:
+        print(f"  {path}")
@@ -1,10 +1,153 @@
+import threading
+from datetime import datetime, timedelta
+
 import gspread
 from oauth2client.service_account import ServiceAccountCredentials
+from modules.request_scheduler import ScheduledHTTPClient
+
+SCOPE = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
+
+# Refresh the access token this long before Google says it expires
+TOKEN_REFRESH_MARGIN = timedelta(minutes=5)
+
+# Process-wide registry of authorized clients, opened spreadsheets and worksheets.
+# Streamlit runs every session in the same process, so this is shared by all of them.
+_registry_lock = threading.Lock()
+_clients = {}
+_spreadsheets = {}
+_worksheets = {}
+
+
+def _client_key(credentials_dict):
+    """
+    Build a hashable key identifying a service account.
+
+    Args:
+        credentials_dict (dict): The dictionary containing Google service account credentials.
+
+    Returns:
+        tuple: The service account email and private key id.
+    """
+    return (credentials_dict.get("client_email"), credentials_dict.get("private_key_id"))
+
+
+def _authorize(credentials_dict):
+    """
+    Authenticate a new gspread client for the given service account.
+
+    Every request the client sends goes through the process-wide request scheduler.
+
+    Args:
+        credentials_dict (dict): The dictionary containing Google service account credentials.
+
+    Returns:
+        gspread.Client: An authorized gspread client.
+    """
+    creds = ServiceAccountCredentials.from_json_keyfile_dict(dict(credentials_dict), SCOPE)
+    return gspread.authorize(creds, http_client=ScheduledHTTPClient)
+
+
+def _refresh_if_expiring(client):
+    """
+    Refresh the client's access token if it is missing or about to expire.
+
+    Args:
+        client (gspread.Client): The gspread client to check.
+    """
+    auth = getattr(client.http_client, "auth", None)
+    if auth is None:
+        return
+    expiry = getattr(auth, "expiry", None)
+    # google-auth stores the expiry as a naive UTC datetime
+    if not getattr(auth, "token", None) or expiry is None or expiry - TOKEN_REFRESH_MARGIN <= datetime.utcnow():
+        client.http_client.login()
+
+
+def get_client(credentials_dict):
+    """
+    Get the shared, authorized gspread client for a service account.
+
+    The client is created once per process and its token is refreshed shortly
+    before it expires, so callers never pay for a new OAuth round-trip.
+
+    Args:
+        credentials_dict (dict): The dictionary containing Google service account credentials.
+
+    Returns:
+        gspread.Client: An authorized gspread client.
+    """
+    key = _client_key(credentials_dict)
+    with _registry_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _authorize(credentials_dict)
+            _clients[key] = client
+        _refresh_if_expiring(client)
+        return client
+
+
+def get_spreadsheet(credentials_dict, sheet_name):
+    """
+    Get the shared spreadsheet handle, opening it on first use.
+
+    Args:
+        credentials_dict (dict): The dictionary containing Google service account credentials.
+        sheet_name (str): The name of the Google Sheets document.
+
+    Returns:
+        gspread.Spreadsheet: The Google Sheets document.
+    """
+    client = get_client(credentials_dict)
+    key = (_client_key(credentials_dict), sheet_name)
+    with _registry_lock:
+        spreadsheet = _spreadsheets.get(key)
+        if spreadsheet is None:
+            spreadsheet = client.open(sheet_name)
+            _spreadsheets[key] = spreadsheet
+        return spreadsheet
+
+
+def get_worksheet(credentials_dict, sheet_name, worksheet_name):
+    """
+    Get a worksheet handle, looking it up by name only the first time.
+
+    Args:
+        credentials_dict (dict): The dictionary containing Google service account credentials.
+        sheet_name (str): The name of the Google Sheets document.
+        worksheet_name (str): The name of the worksheet within the Google Sheets document.
+
+    Returns:
+        gspread.Worksheet: The Google Sheets worksheet object.
+    """
+    spreadsheet = get_spreadsheet(credentials_dict, sheet_name)
+    key = (_client_key(credentials_dict), sheet_name, worksheet_name)
+    with _registry_lock:
+        worksheet = _worksheets.get(key)
+        if worksheet is None:
+            worksheet = spreadsheet.worksheet(worksheet_name)
+            _worksheets[key] = worksheet
+        return worksheet
+
+
+def reset_connections():
+    """
+    Drop every cached client, spreadsheet and worksheet handle.
+
+    Use this after a worksheet is renamed or deleted, or to force a fresh login.
+    """
+    with _registry_lock:
+        _clients.clear()
+        _spreadsheets.clear()
+        _worksheets.clear()
+
 
 # Function to authenticate and connect to Google Sheets
 def connect_to_google_sheets(credentials_dict, sheet_name, worksheet_name):
     """
-    Authenticate and connect to a Google Sheets document.
+    Connect to a worksheet in a Google Sheets document.
+
+    Authentication, the spreadsheet and the worksheet handle are shared across
+    the whole process, so repeated calls do not go back to Google.
 
     Args:
         credentials_dict (dict): The dictionary containing Google service account credentials.
@@ -12,10 +155,6 @@ def connect_to_google_sheets(credentials_dict, sheet_name, worksheet_name):
         worksheet_name (str): The name of the worksheet within the Google Sheets document.
 
     Returns:
-        gspread.models.Worksheet: The Google Sheets worksheet object.
+        gspread.Worksheet: The Google Sheets worksheet object.
     """
-    scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-    creds = ServiceAccountCredentials.from_json_keyfile_dict(credentials_dict, scope)
-    client = gspread.authorize(creds)
-    sheet = client.open(sheet_name).worksheet(worksheet_name)
-    return sheet
\ No newline at end of file
+    return get_worksheet(credentials_dict, sheet_name, worksheet_name)
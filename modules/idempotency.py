@@ -0,0 +1,75 @@
+import threading
+from collections import OrderedDict
+
+DEFAULT_MAX_ENTRIES = 4096
+
+
+class IdempotencyRegistry:
+    """
+    Remembers the results of completed submissions so that repeating one is a no-op.
+
+    A submission that is still running blocks repeats with the same key until it finishes,
+    so a double-clicked button cannot run the same write twice. Failed submissions are
+    not remembered and can be retried.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._results = OrderedDict()
+        # Key -> [lock, number of calls using it], only for keys with a call running or waiting
+        self._key_locks = {}
+        self._lock = threading.Lock()
+
+    def run(self, key, fn):
+        """
+        Run fn once per key, returning the stored result for repeats.
+
+        Args:
+            key (hashable): The idempotency key of the submission, or None to always run fn.
+            fn (callable): Function with no arguments that performs the submission.
+
+        Returns:
+            The result of fn, from this call or from the first call with the same key.
+        """
+        if key is None:
+            return fn()
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, [threading.Lock(), 0])
+            key_lock[1] += 1
+
+        try:
+            with key_lock[0]:
+                with self._lock:
+                    if key in self._results:
+                        self._results.move_to_end(key)
+                        return self._results[key]
+                result = fn()
+                with self._lock:
+                    self._results[key] = result
+                    while len(self._results) > self.max_entries:
+                        self._results.popitem(last=False)
+                return result
+        finally:
+            # Drop the lock with its last user, whether the submission succeeded or failed
+            with self._lock:
+                key_lock[1] -= 1
+                if not key_lock[1]:
+                    del self._key_locks[key]
+
+    def seen(self, key):
+        """
+        Check whether a submission has completed.
+
+        Args:
+            key (hashable): The idempotency key of the submission.
+
+        Returns:
+            bool: True if a submission with this key has completed.
+        """
+        with self._lock:
+            return key in self._results
+
+
+# Process-wide registry shared by every Streamlit session
+submissions = IdempotencyRegistry()
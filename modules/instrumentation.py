@@ -0,0 +1,408 @@
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+# Shortest time between two writes of the Prometheus text file, in seconds
+TEXTFILE_INTERVAL_SECONDS = 15
+
+logger = logging.getLogger(__name__)
+
+# Counting is cheap enough to leave on; set INSTRUMENTATION = false in st.secrets to turn it off
+enabled = st.secrets.get("INSTRUMENTATION", True)
+log_reruns = st.secrets.get("INSTRUMENTATION_LOG", False)
+textfile_path = st.secrets.get("METRICS_TEXTFILE")
+
+
+class CallStats:
+    """
+    Running totals for one kind of call.
+    """
+
+    __slots__ = ('count', 'errors', 'retries', 'seconds', 'max_seconds', 'rows', 'bytes')
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.retries = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.rows = 0
+        self.bytes = 0
+
+
+class Metrics:
+    """
+    Call and cache counters for one scope: a rerun, a session or the whole process.
+
+    Calls are keyed by (source, call, worksheet). Source is 'backend' for storage backend
+    calls made by the pages, and 'request' for the HTTP requests sent to Google Sheets,
+    which are keyed by 'read', 'write' or 'shared read' (a read answered by an identical
+    request already in flight).
+    """
+
+    def __init__(self):
+        self.calls = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.started_at = time.time()
+
+    def add_call(self, key, seconds, ok, retries=0, rows=0, nbytes=0):
+        """
+        Add one call to the totals.
+
+        Args:
+            key (tuple): (source, call, worksheet).
+            seconds (float): How long the call took.
+            ok (bool): Whether the call succeeded.
+            retries (int): Number of retries the call needed.
+            rows (int): Number of rows read or written.
+            nbytes (int): Number of bytes sent and received.
+        """
+        stats = self.calls.get(key)
+        if stats is None:
+            stats = self.calls[key] = CallStats()
+        stats.count += 1
+        stats.errors += not ok
+        stats.retries += retries
+        stats.seconds += seconds
+        stats.max_seconds = max(stats.max_seconds, seconds)
+        stats.rows += rows
+        stats.bytes += nbytes
+
+    def add_cache_lookup(self, hit):
+        """
+        Count one lookup in the shared sheet cache.
+
+        Args:
+            hit (bool): Whether the value was cached.
+        """
+        if hit:
+            self.cache_hits += 1
+        else:
+            self.cache_misses += 1
+
+    def cache_hit_rate(self):
+        """
+        Get the share of cache lookups that were hits.
+
+        Returns:
+            float: Hit rate between 0 and 1, or None if there were no lookups.
+        """
+        lookups = self.cache_hits + self.cache_misses
+        return self.cache_hits / lookups if lookups else None
+
+    def to_dict(self):
+        """
+        Get the counters as plain data, e.g. for a structured log line.
+
+        Returns:
+            dict: calls (a list of dicts), cache_hits, cache_misses and cache_hit_rate.
+        """
+        return {
+            'calls': [
+                {
+                    'source': source, 'call': call, 'worksheet': worksheet,
+                    'count': stats.count, 'errors': stats.errors, 'retries': stats.retries,
+                    'seconds': round(stats.seconds, 4), 'max_seconds': round(stats.max_seconds, 4),
+                    'rows': stats.rows, 'bytes': stats.bytes,
+                }
+                for (source, call, worksheet), stats in sorted(self.calls.items(), key=str)
+            ],
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'cache_hit_rate': self.cache_hit_rate(),
+        }
+
+
+class CallRecord:
+    """
+    A backend call in progress; requests sent while it runs add their retries and bytes to it.
+    """
+
+    __slots__ = ('rows', 'retries', 'bytes')
+
+    def __init__(self, rows=0):
+        self.rows = rows
+        self.retries = 0
+        self.bytes = 0
+
+
+# Process-wide counters shared by every Streamlit session
+process_metrics = Metrics()
+_process_lock = threading.Lock()
+
+# The backend call running in each thread
+_active = threading.local()
+
+# Whether each script thread is inside a rerun_scope
+_runs = threading.local()
+
+_textfile_written_at = 0.0
+
+
+def _session_scopes():
+    """
+    Get the rerun and session counters of the Streamlit session running in this thread.
+
+    Returns:
+        tuple: (rerun Metrics, session Metrics), or None outside a script run, e.g. in the
+        journal flusher.
+    """
+    if get_script_run_ctx(suppress_warning=True) is None:
+        return None
+    scopes = st.session_state.get("_metrics")
+    if scopes is None:
+        scopes = st.session_state["_metrics"] = (Metrics(), Metrics())
+    return scopes
+
+
+def _add_call(key, seconds, ok, retries=0, rows=0, nbytes=0):
+    with _process_lock:
+        process_metrics.add_call(key, seconds, ok, retries, rows, nbytes)
+    scopes = _session_scopes()
+    if scopes is not None:
+        for metrics in scopes:
+            metrics.add_call(key, seconds, ok, retries, rows, nbytes)
+
+
+@contextmanager
+def track_backend_call(call, worksheet=None, rows=0):
+    """
+    Time and count a storage backend call made by a page.
+
+    Args:
+        call (str): The backend method, e.g. 'load_tables'.
+        worksheet (str): The worksheet the call is mostly about.
+        rows (int): Number of rows written; set record.rows inside the block for rows read.
+
+    Yields:
+        CallRecord: The call, whose rows can be updated once they are known.
+    """
+    record = CallRecord(rows)
+    if not enabled:
+        yield record
+        return
+    outer = getattr(_active, 'record', None)
+    _active.record = record
+    started = time.perf_counter()
+    ok = False
+    try:
+        yield record
+        ok = True
+    finally:
+        _active.record = outer
+        _add_call(
+            ('backend', call, worksheet), time.perf_counter() - started, ok,
+            record.retries, record.rows, record.bytes
+        )
+
+
+def record_request(kind, seconds, ok, retries=0, response=None, shared=False):
+    """
+    Count one HTTP request sent to Google Sheets by the request scheduler.
+
+    Args:
+        kind (str): 'read' or 'write'.
+        seconds (float): Time from scheduling to the response, including quota waits and retries.
+        ok (bool): Whether the request succeeded.
+        retries (int): Number of retries the request needed.
+        response: The response, used to count the bytes sent and received.
+        shared (bool): Whether the read was answered by an identical request already in flight.
+    """
+    if not enabled:
+        return
+    nbytes = 0
+    if not shared and response is not None:
+        content = getattr(response, 'content', None)
+        body = getattr(getattr(response, 'request', None), 'body', None)
+        nbytes = (len(content) if content else 0) + (len(body) if body else 0)
+    record = getattr(_active, 'record', None)
+    if record is not None:
+        record.retries += retries
+        record.bytes += nbytes
+    _add_call(('request', f"shared {kind}" if shared else kind, None), seconds, ok, retries, 0, nbytes)
+
+
+def record_cache_lookup(hit):
+    """
+    Count one lookup in the shared sheet cache.
+
+    Args:
+        hit (bool): Whether the value was cached.
+    """
+    if not enabled:
+        return
+    with _process_lock:
+        process_metrics.add_cache_lookup(hit)
+    scopes = _session_scopes()
+    if scopes is not None:
+        for metrics in scopes:
+            metrics.add_cache_lookup(hit)
+
+
+def start_rerun():
+    """
+    Start counting a new script run of the current session.
+    """
+    if not enabled:
+        return
+    scopes = _session_scopes()
+    st.session_state["_metrics"] = (Metrics(), scopes[1])
+
+
+def finish_rerun(fragment=None):
+    """
+    Log the counters of the script run that is ending and refresh the Prometheus text file.
+
+    Enable the log with INSTRUMENTATION_LOG = true and the text file with
+    METRICS_TEXTFILE = "/path/to/bwu_clipboard.prom" in st.secrets.
+
+    Args:
+        fragment (str): The fragment whose rerun is ending, or None for a full script run.
+    """
+    global _textfile_written_at
+    if not enabled:
+        return
+    rerun, _ = _session_scopes()
+    if log_reruns and rerun.calls:
+        ctx = get_script_run_ctx(suppress_warning=True)
+        logger.info(json.dumps({
+            'event': 'rerun',
+            'session': ctx.session_id if ctx else None,
+            'fragment': fragment,
+            'seconds': round(time.time() - rerun.started_at, 4),
+            **rerun.to_dict(),
+        }))
+    if textfile_path and time.time() - _textfile_written_at >= TEXTFILE_INTERVAL_SECONDS:
+        _textfile_written_at = time.time()
+        # Write then rename, so a scrape never sees half a file
+        temporary_path = f"{textfile_path}.tmp"
+        with open(temporary_path, "w") as f:
+            f.write(prometheus_text())
+        os.replace(temporary_path, textfile_path)
+
+
+@contextmanager
+def rerun_scope(fragment=None):
+    """
+    Count a script run of the current session and log its counters when it ends.
+
+    The counters are logged however the run ends, including by st.rerun(). Scopes do not
+    nest: a fragment drawn as part of a full script run is counted with it, and only a
+    fragment rerunning on its own gets a scope of its own.
+
+    Args:
+        fragment (str): The fragment rerunning on its own, or None for a full script run.
+    """
+    if getattr(_runs, 'open', False):
+        yield
+        return
+    _runs.open = True
+    start_rerun()
+    try:
+        yield
+    finally:
+        _runs.open = False
+        finish_rerun(fragment)
+
+
+def tracked_fragment(fn):
+    """
+    Give a fragment function a rerun_scope, so its reruns on their own are counted and logged.
+
+    Apply it under @st.fragment.
+
+    Args:
+        fn (callable): The fragment function.
+
+    Returns:
+        callable: The wrapped function.
+    """
+    @functools.wraps(fn)
+    def run(*args, **kwargs):
+        with rerun_scope(fn.__name__):
+            return fn(*args, **kwargs)
+    return run
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"')
+
+
+def prometheus_text():
+    """
+    Render the process-wide counters in the Prometheus text exposition format.
+
+    Returns:
+        str: The metrics.
+    """
+    metrics = [
+        ('bwu_sheets_calls_total', 'Backend calls and Google Sheets requests.', 'count'),
+        ('bwu_sheets_call_errors_total', 'Calls that failed.', 'errors'),
+        ('bwu_sheets_call_retries_total', 'Retries after rate limits and server errors.', 'retries'),
+        ('bwu_sheets_call_seconds_total', 'Time spent in calls.', 'seconds'),
+        ('bwu_sheets_call_rows_total', 'Rows read or written by backend calls.', 'rows'),
+        ('bwu_sheets_call_bytes_total', 'Bytes sent and received.', 'bytes'),
+    ]
+    lines = []
+    with _process_lock:
+        for name, help_text, field in metrics:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for (source, call, worksheet), stats in process_metrics.calls.items():
+                labels = f'source="{_label(source)}",call="{_label(call)}",worksheet="{_label(worksheet or "")}"'
+                lines.append(f"{name}{{{labels}}} {getattr(stats, field)}")
+        lines.append("# HELP bwu_sheet_cache_lookups_total Lookups in the shared sheet cache.")
+        lines.append("# TYPE bwu_sheet_cache_lookups_total counter")
+        lines.append(f'bwu_sheet_cache_lookups_total{{result="hit"}} {process_metrics.cache_hits}')
+        lines.append(f'bwu_sheet_cache_lookups_total{{result="miss"}} {process_metrics.cache_misses}')
+    return "\n".join(lines) + "\n"
+
+
+def _show_metrics(summary):
+    """
+    Display a table of call counters and the cache hit rate.
+
+    Args:
+        summary (dict): The counters to show, see Metrics.to_dict.
+    """
+    hit_rate = summary['cache_hit_rate']
+    st.caption(
+        f"Cache: {summary['cache_hits']} hits, {summary['cache_misses']} misses"
+        + (f" ({hit_rate:.0%})" if hit_rate is not None else "")
+    )
+    if summary['calls']:
+        st.dataframe(summary['calls'], hide_index=True, use_container_width=True)
+    else:
+        st.caption("No calls")
+
+
+def debug_panel_ui():
+    """
+    Display the admin debug panel with the counters of this rerun, the session and the process.
+
+    Shown at the bottom of the sidebar when DEBUG_PANEL = true in st.secrets. Call it after
+    the page has rendered so the rerun counters are complete.
+    """
+    if not enabled:
+        return
+    rerun, session = _session_scopes()
+    with st.expander("Debug"):
+        st.markdown("**This rerun**")
+        _show_metrics(rerun.to_dict())
+        st.markdown("**This session**")
+        _show_metrics(session.to_dict())
+        st.markdown("**All sessions**")
+        with _process_lock:
+            process_summary = process_metrics.to_dict()
+        _show_metrics(process_summary)
+        st.download_button(
+            "Download Prometheus metrics", prometheus_text(), file_name="bwu_clipboard.prom", mime="text/plain"
+        )
@@ -0,0 +1,220 @@
+import hashlib
+import uuid
+from collections import namedtuple
+
+# Column layout of the wide matches tab, one row per player per point
+MATCH_COLUMNS = [
+    'tournament_name', 'date', 'opponent', 'point_number', 'player_name', 'line', 'position',
+    'point_scored', 'score_for', 'score_against', 'score', 'match_id'
+]
+
+# Column layout of the normalized match tables
+MATCH_INDEX_COLUMNS = ['match_id', 'tournament_name', 'date', 'opponent']
+POINT_COLUMNS = ['point_id', 'match_id', 'point_number', 'point_scored', 'score_for', 'score_against']
+POINT_PLAYER_COLUMNS = ['point_id', 'player_id']
+PLAYER_COLUMNS = ['player_id', 'player_name', 'line', 'position']
+
+NormalizedMatches = namedtuple('NormalizedMatches', ['matches', 'points', 'point_players', 'players'])
+
+
+def _short_hash(*parts):
+    """
+    Build a short, stable id from some values.
+
+    Args:
+        *parts: Values identifying the thing being named.
+
+    Returns:
+        str: A 10 character hex id.
+    """
+    return hashlib.sha1("|".join(str(part) for part in parts).encode("utf-8")).hexdigest()[:10]
+
+
+def new_match_id():
+    """
+    Get an id for a new match.
+
+    Every match gets its own id, so a rematch against the same opponent on the same day
+    is kept apart from the first game.
+
+    Returns:
+        str: The match id.
+    """
+    return uuid.uuid4().hex[:16]
+
+
+def make_match_id(tournament_name, date, opponent):
+    """
+    Get the id of a match recorded before match ids were stored with its rows.
+
+    The id only depends on the tournament, date and opponent.
+
+    Args:
+        tournament_name (str): The name of the tournament.
+        date (str): The match date, YYYY-MM-DD.
+        opponent (str): The name of the opponent.
+
+    Returns:
+        str: The match id.
+    """
+    return _short_hash(tournament_name, date, opponent)
+
+
+def row_match_id(row):
+    """
+    Get the id of the match a wide row belongs to.
+
+    Args:
+        row (list): A row in MATCH_COLUMNS order.
+
+    Returns:
+        str: The stored match id, or the id derived from the tournament, date and opponent
+        for rows written before match ids were stored.
+    """
+    if len(row) > 11 and row[11] not in ('', None):
+        return str(row[11])
+    return make_match_id(row[0], row[1], row[2])
+
+
+def make_point_id(match_id, point_number):
+    """
+    Get the id of a point within a match.
+
+    Args:
+        match_id (str): The match id.
+        point_number (int): The point number within the match.
+
+    Returns:
+        str: The point id.
+    """
+    return f"{match_id}-{point_number}"
+
+
+def make_player_id(player_name, line, position):
+    """
+    Get the id of a player with a line and position assignment.
+
+    Args:
+        player_name (str): The name of the player.
+        line (str): The player's line.
+        position (str): The player's position.
+
+    Returns:
+        str: The player id.
+    """
+    return _short_hash(player_name, line, position)
+
+
+def _to_int(value):
+    """
+    Convert a sheet value to an int where possible.
+
+    Args:
+        value: The value read from a sheet.
+
+    Returns:
+        The value as an int, or unchanged if it is not a whole number.
+    """
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return value
+
+
+def match_progress(row):
+    """
+    Get where a match stood after the point in one of its wide rows.
+
+    Args:
+        row (list): A row in MATCH_COLUMNS order.
+
+    Returns:
+        dict: match_id, tournament_name, date, opponent, point_number (of this point),
+        score_for and score_against.
+    """
+    return {
+        'match_id': row_match_id(row),
+        'tournament_name': row[0],
+        'date': row[1],
+        'opponent': row[2],
+        'point_number': _to_int(row[3]),
+        'score_for': _to_int(row[8]),
+        'score_against': _to_int(row[9]),
+    }
+
+
+def normalize_match_rows(rows):
+    """
+    Convert wide match rows (one row per player per point) to the normalized tables.
+
+    Args:
+        rows (list): List of lists in MATCH_COLUMNS order.
+
+    Returns:
+        NormalizedMatches: Rows for the match index, points, point players and players
+        tables, each a list of lists in the matching *_COLUMNS order, without duplicates.
+    """
+    matches = {}
+    points = {}
+    point_players = {}
+    players = {}
+    for row in rows:
+        record = dict(zip(MATCH_COLUMNS, row))
+        match_id = row_match_id(row)
+        point_id = make_point_id(match_id, record['point_number'])
+        player_id = make_player_id(record['player_name'], record['line'], record['position'])
+
+        matches.setdefault(match_id, [match_id, record['tournament_name'], record['date'], record['opponent']])
+        points.setdefault(point_id, [
+            point_id, match_id, _to_int(record['point_number']), record['point_scored'],
+            _to_int(record['score_for']), _to_int(record['score_against'])
+        ])
+        point_players.setdefault((point_id, player_id), [point_id, player_id])
+        players.setdefault(player_id, [player_id, record['player_name'], record['line'], record['position']])
+
+    return NormalizedMatches(
+        list(matches.values()), list(points.values()), list(point_players.values()), list(players.values())
+    )
+
+
+def denormalize_match_rows(normalized):
+    """
+    Rebuild wide match rows from the normalized tables.
+
+    Args:
+        normalized (NormalizedMatches): Rows of the normalized tables.
+
+    Returns:
+        list: List of lists in MATCH_COLUMNS order, in the order the points were recorded.
+    """
+    matches = {row[0]: row for row in normalized.matches}
+    players = {row[0]: row for row in normalized.players}
+    players_by_point = {}
+    for point_id, player_id in normalized.point_players:
+        players_by_point.setdefault(point_id, []).append(player_id)
+
+    rows = []
+    for point_id, match_id, point_number, point_scored, score_for, score_against in normalized.points:
+        _, tournament_name, date, opponent = matches[match_id]
+        score_for = _to_int(score_for)
+        score_against = _to_int(score_against)
+        for player_id in players_by_point.get(point_id, []):
+            _, player_name, line, position = players[player_id]
+            rows.append([
+                tournament_name, date, opponent, _to_int(point_number), player_name, line, position,
+                point_scored, score_for, score_against, f"{score_for}-{score_against}", match_id
+            ])
+    return rows
+
+
+def count_cells(rows):
+    """
+    Count the cells taken up by some rows.
+
+    Args:
+        rows (list): List of lists.
+
+    Returns:
+        int: Number of cells.
+    """
+    return sum(len(row) for row in rows)
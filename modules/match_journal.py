@@ -0,0 +1,400 @@
+import json
+import logging
+import random
+import sqlite3
+import threading
+import time
+
+import streamlit as st
+
+from modules.match_format import match_progress
+
+DEFAULT_JOURNAL_PATH = "match_journal.sqlite3"
+
+# Most points pushed to the sheet in one append_rows call
+MAX_POINTS_PER_FLUSH = 50
+
+# Most recent journaled points searched for a match by tournament, date and opponent
+MATCH_SEARCH_POINTS = 200
+
+# Retry delays for failed flushes, in seconds
+BACKOFF_BASE_SECONDS = 1
+BACKOFF_MAX_SECONDS = 60
+
+logger = logging.getLogger(__name__)
+
+
+class MatchJournal:
+    """
+    A durable, append-only local journal of recorded points.
+
+    Each point is committed to a SQLite database before anything goes over the network.
+    A background thread then pushes pending points to the matches tab in batches, retrying
+    with exponential backoff until the write succeeds, so a point is never lost to a bad
+    connection. A write can reach the sheet even though the request failed, so before a
+    point is sent again the sheet is checked for it and it is only resent if missing.
+
+    The sheet rows each point was written to are kept from the append response, so a
+    recent point can be deleted or overwritten without searching the sheet for it.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        # Held while rows are written to the sheet, so row ranges do not move under a write
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._flusher = None
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS points (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                rows TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                synced_at REAL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS points_pending ON points (id) WHERE synced_at IS NULL")
+        # Journals created before points had an identity lack these columns
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(points)")}
+        if 'match_id' not in columns:
+            self._conn.execute("ALTER TABLE points ADD COLUMN match_id TEXT")
+            self._conn.execute("ALTER TABLE points ADD COLUMN point_number INTEGER")
+        if 'first_row' not in columns:
+            # The sheet row of the first row of the point, once synced
+            self._conn.execute("ALTER TABLE points ADD COLUMN first_row INTEGER")
+        if 'sent_at' not in columns:
+            # When the point was last sent to the sheet, set before the write so a failed
+            # write is known to have maybe been applied
+            self._conn.execute("ALTER TABLE points ADD COLUMN sent_at REAL")
+        self._conn.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS points_by_match ON points (match_id, point_number) "
+            "WHERE match_id IS NOT NULL"
+        )
+
+    def append(self, rows, match_id=None, point_number=None):
+        """
+        Durably record the rows of one point and wake the flusher.
+
+        A point is only journaled once per (match_id, point_number), so a retried save
+        does not write the point to the sheet twice.
+
+        Args:
+            rows (list): List of lists containing the match data rows for the point.
+            match_id (str): The id of the match the point belongs to.
+            point_number (int): The point number within the match.
+
+        Returns:
+            int: The journal id of the point, or None if it was already journaled.
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO points (rows, created_at, match_id, point_number) VALUES (?, ?, ?, ?)",
+                (json.dumps(rows), time.time(), match_id, point_number)
+            )
+        if not cursor.rowcount:
+            return None
+        self._wake.set()
+        return cursor.lastrowid
+
+    def last_point(self, match_id):
+        """
+        Get the last journaled point of a match, using the index on (match_id, point_number).
+
+        Args:
+            match_id (str): The match id.
+
+        Returns:
+            dict: See match_progress, or None if no point of the match was journaled here.
+        """
+        with self._lock:
+            last = self._conn.execute(
+                "SELECT rows FROM points WHERE match_id = ? ORDER BY point_number DESC LIMIT 1",
+                (match_id,)
+            ).fetchone()
+        return match_progress(json.loads(last[0])[0]) if last else None
+
+    def last_match(self, tournament_name, date, opponent):
+        """
+        Get the last journaled point of the latest match against an opponent on a date.
+
+        Only the last MATCH_SEARCH_POINTS points journaled here are searched.
+
+        Args:
+            tournament_name (str): The name of the tournament.
+            date (str): The match date.
+            opponent (str): The name of the opponent.
+
+        Returns:
+            dict: See match_progress, or None if no such match was journaled recently.
+        """
+        with self._lock:
+            recent = self._conn.execute(
+                "SELECT rows FROM points WHERE match_id IS NOT NULL ORDER BY id DESC LIMIT ?",
+                (MATCH_SEARCH_POINTS,)
+            ).fetchall()
+        for rows, in recent:
+            point = match_progress(json.loads(rows)[0])
+            if (point['tournament_name'], point['date'], point['opponent']) == (tournament_name, date, opponent):
+                return self.last_point(point['match_id'])
+        return None
+
+    def recent_points(self, match_id, count):
+        """
+        Get the rows of the last points of a match journaled here.
+
+        Args:
+            match_id (str): The match id.
+            count (int): Number of points to return at most.
+
+        Returns:
+            list: List of (point number, rows) tuples, oldest first.
+        """
+        with self._lock:
+            recent = self._conn.execute(
+                "SELECT point_number, rows FROM points WHERE match_id = ? ORDER BY point_number DESC LIMIT ?",
+                (match_id, count)
+            ).fetchall()
+        return [(point_number, json.loads(rows)) for point_number, rows in reversed(recent)]
+
+    def _located_points(self, match_id, point_numbers):
+        """
+        Look up journaled points with their sync state and sheet rows.
+
+        Args:
+            match_id (str): The match id.
+            point_numbers (list): The point numbers.
+
+        Returns:
+            dict: Point number -> (journal id, rows, synced, first sheet row or None).
+
+        Raises:
+            ValueError: If a point is not in the journal, or was synced without its sheet rows.
+        """
+        located = {}
+        for point_number in point_numbers:
+            point = self._conn.execute(
+                "SELECT id, rows, synced_at, first_row FROM points WHERE match_id = ? AND point_number = ?",
+                (match_id, point_number)
+            ).fetchone()
+            if point is None:
+                raise ValueError(f"Point {point_number} was not recorded on this server")
+            point_id, rows, synced_at, first_row = point
+            if synced_at is not None and first_row is None:
+                raise ValueError(f"The sheet rows of point {point_number} are not known; fix it in the sheet")
+            located[point_number] = (point_id, json.loads(rows), synced_at is not None, first_row)
+        return located
+
+    def remove_point(self, match_id, point_number, delete_rows):
+        """
+        Take a point out of the journal and, if it was synced, delete its sheet rows.
+
+        A point still waiting to sync never reaches the sheet. Rows journaled after it
+        move up in the sheet, and their stored row numbers move with them.
+
+        Args:
+            match_id (str): The match id.
+            point_number (int): The point number.
+            delete_rows (callable): Function taking the first and last sheet row to delete and
+                the rows expected there.
+
+        Raises:
+            ValueError: If the point cannot be located, see _located_points.
+        """
+        with self._flush_lock:
+            with self._lock:
+                point_id, rows, synced, first_row = self._located_points(match_id, [point_number])[point_number]
+            if synced:
+                delete_rows(first_row, first_row + len(rows) - 1, rows)
+            with self._lock, self._conn:
+                self._conn.execute("BEGIN")
+                self._conn.execute("DELETE FROM points WHERE id = ?", (point_id,))
+                if synced:
+                    self._conn.execute(
+                        "UPDATE points SET first_row = first_row - ? WHERE first_row > ?", (len(rows), first_row)
+                    )
+
+    def replace_points(self, match_id, points, update_rows):
+        """
+        Replace the rows of journaled points, overwriting the synced ones in the sheet in one request.
+
+        Args:
+            match_id (str): The match id.
+            points (list): List of (point number, rows) tuples. Each point keeps its number of rows.
+            update_rows (callable): Function taking a list of (first sheet row, rows) tuples.
+
+        Raises:
+            ValueError: If a point cannot be located, see _located_points.
+        """
+        with self._flush_lock:
+            with self._lock:
+                located = self._located_points(match_id, [point_number for point_number, _ in points])
+            updates = [
+                (located[point_number][3], rows) for point_number, rows in points if located[point_number][2]
+            ]
+            if updates:
+                update_rows(updates)
+            with self._lock, self._conn:
+                self._conn.execute("BEGIN")
+                self._conn.executemany(
+                    "UPDATE points SET rows = ? WHERE id = ?",
+                    [(json.dumps(rows), located[point_number][0]) for point_number, rows in points]
+                )
+
+    def pending_count(self):
+        """
+        Count the points that have not reached the sheet yet.
+
+        Returns:
+            int: Number of points pending sync.
+        """
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM points WHERE synced_at IS NULL").fetchone()[0]
+
+    def _take_pending(self):
+        """
+        Get the oldest pending points.
+
+        Returns:
+            list: List of (id, rows, (match_id, point_number), sent before) tuples, oldest first.
+        """
+        with self._lock:
+            pending = self._conn.execute(
+                "SELECT id, rows, match_id, point_number, sent_at FROM points WHERE synced_at IS NULL "
+                "ORDER BY id LIMIT ?",
+                (MAX_POINTS_PER_FLUSH,)
+            ).fetchall()
+        return [
+            (point_id, json.loads(rows), (match_id, point_number), sent_at is not None)
+            for point_id, rows, match_id, point_number, sent_at in pending
+        ]
+
+    def _already_written(self, pending, find_rows):
+        """
+        Mark the points of an earlier, failed send that reached the sheet anyway as synced.
+
+        Args:
+            pending (list): Pending points, see _take_pending.
+            find_rows (callable): See flush.
+
+        Returns:
+            list: The pending points that still have to be sent.
+        """
+        resent = [point for point in pending if point[3] and point[2][0] is not None]
+        if not resent or find_rows is None:
+            return pending
+        found = find_rows([key for _, _, key, _ in resent], sum(len(rows) for _, rows, _, _ in resent))
+        if not found:
+            return pending
+        synced_at = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE points SET synced_at = ?, first_row = ? WHERE id = ?",
+                [(synced_at, found[key], point_id) for point_id, _, key, _ in pending if key in found]
+            )
+        return [point for point in pending if point[2] not in found]
+
+    def _mark_sent(self, pending):
+        """
+        Record that points are about to be written to the sheet.
+
+        Args:
+            pending (list): Pending points, see _take_pending.
+        """
+        sent_at = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE points SET sent_at = ? WHERE id = ?", [(sent_at, point[0]) for point in pending]
+            )
+
+    def _mark_synced(self, pending, first_row=None):
+        """
+        Mark points as written to the sheet.
+
+        Args:
+            pending (list): Pending points in the order they were written, see _take_pending.
+            first_row (int): The sheet row the first row was written to, if known.
+        """
+        synced_at = time.time()
+        updates = []
+        for point_id, rows, _, _ in pending:
+            updates.append((synced_at, first_row, point_id))
+            if first_row is not None:
+                first_row += len(rows)
+        with self._lock:
+            self._conn.executemany("UPDATE points SET synced_at = ?, first_row = ? WHERE id = ?", updates)
+
+    def flush(self, write_rows, find_rows=None):
+        """
+        Push one batch of pending points to the sheet.
+
+        Args:
+            write_rows (callable): Function that appends a list of rows to the matches tab and
+                returns the sheet row the first one was written to, or None.
+            find_rows (callable): Function taking a list of (match_id, point_number) keys and
+                their total number of rows, and returning a dictionary of the keys found in
+                the sheet -> the sheet row of their first row, or None if not known. Without
+                it, points whose earlier send failed are sent again as they are.
+
+        Returns:
+            int: Number of points written or found already written.
+        """
+        with self._flush_lock:
+            pending = self._take_pending()
+            if not pending:
+                return 0
+            to_send = self._already_written(pending, find_rows)
+            if to_send:
+                self._mark_sent(to_send)
+                # Coalesce every pending point into a single append; the points are written one after another
+                first_row = write_rows([row for _, rows, _, _ in to_send for row in rows])
+                self._mark_synced(to_send, first_row)
+            return len(pending)
+
+    def _run_flusher(self, write_rows, find_rows):
+        """
+        Flush pending points forever, backing off after failures.
+
+        Args:
+            write_rows (callable): Function that appends a list of rows to the matches tab.
+            find_rows (callable): See flush.
+        """
+        failures = 0
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            try:
+                while self.flush(write_rows, find_rows):
+                    pass
+                failures = 0
+            except Exception as e:
+                delay = min(BACKOFF_BASE_SECONDS * 2 ** failures, BACKOFF_MAX_SECONDS)
+                delay = random.uniform(delay / 2, delay)
+                failures += 1
+                logger.warning("Flushing match journal failed (%s), retrying in %.1fs", e, delay)
+                time.sleep(delay)
+                self._wake.set()
+
+    def start_flusher(self, write_rows, find_rows=None):
+        """
+        Start the background flusher thread if it is not already running.
+
+        Args:
+            write_rows (callable): Function that appends a list of rows to the matches tab.
+            find_rows (callable): See flush.
+        """
+        with self._lock:
+            if self._flusher is not None and self._flusher.is_alive():
+                return
+            self._flusher = threading.Thread(
+                target=self._run_flusher, args=(write_rows, find_rows), name="match-journal-flusher", daemon=True
+            )
+            self._flusher.start()
+        # Pick up anything left over from before a restart
+        self._wake.set()
+
+
+# Process-wide journal shared by every Streamlit session
+match_journal = MatchJournal(st.secrets.get("JOURNAL_PATH", DEFAULT_JOURNAL_PATH))
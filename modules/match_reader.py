@@ -0,0 +1,285 @@
+import threading
+
+from gspread.exceptions import APIError
+from gspread.utils import rowcol_to_a1, ValueRenderOption
+
+from modules.match_format import MATCH_COLUMNS
+
+# Rows probed in one request while looking for the last row of a worksheet
+PROBES_PER_REQUEST = 20
+
+
+def _trimmed(row):
+    """
+    Drop the trailing blank cells the Sheets API leaves out of some responses.
+
+    Args:
+        row (list): A row of sheet values.
+
+    Returns:
+        list: The row without trailing empty strings.
+    """
+    row = list(row)
+    while row and row[-1] == '':
+        row.pop()
+    return row
+
+
+def _has_values(value_range):
+    return any(value != '' for row in value_range for value in row)
+
+
+def read_tail(worksheet, width, max_rows, grid_rows, numbered=False):
+    """
+    Read the header and the last rows of a worksheet without reading the rest of it.
+
+    The end of the data is found by probing evenly spaced rows, PROBES_PER_REQUEST at a
+    time, until it is known to within max_rows. The number of requests grows with the
+    logarithm of the sheet size, so a season of points costs two or three small requests.
+
+    Args:
+        worksheet (gspread.Worksheet): The worksheet.
+        width (int): Number of columns to read.
+        max_rows (int): Number of rows to return at most.
+        grid_rows (int): Number of rows in the worksheet grid, including empty ones.
+        numbered (bool): Return each row as a (sheet row number, row) tuple.
+
+    Returns:
+        tuple: (header row, list of up to max_rows last rows, oldest first).
+    """
+    last_column = rowcol_to_a1(1, width)[:-1]
+    # Row first_data - 1 has data and row past_data has none
+    first_data, past_data = 2, grid_rows + 1
+    while past_data - first_data > max_rows:
+        step = max(1, (past_data - first_data) // (PROBES_PER_REQUEST + 1))
+        probes = list(range(first_data + step - 1, past_data, step))[:PROBES_PER_REQUEST]
+        values = worksheet.batch_get(
+            [f"A{row}:{last_column}{row}" for row in probes], value_render_option=ValueRenderOption.unformatted
+        )
+        with_data = [row for row, value_range in zip(probes, values) if _has_values(value_range)]
+        if with_data:
+            first_data = max(with_data) + 1
+        past_data = min((row for row in probes if row >= first_data), default=past_data)
+
+    # The range is open-ended, so rows appended since grid_rows was read are included
+    start = max(2, first_data - max_rows)
+    header, rows = worksheet.batch_get(
+        [f"A1:{last_column}1", f"A{start}:{last_column}"], value_render_option=ValueRenderOption.unformatted
+    )
+    rows = [
+        (start + offset, _trimmed(row)) if numbered else _trimmed(row)
+        for offset, row in enumerate(rows) if any(value != '' for value in row)
+    ]
+    return (_trimmed(header[0]) if header else []), rows[-max_rows:]
+
+
+def read_chunks(worksheet, width, chunk_rows):
+    """
+    Read a worksheet a fixed number of rows at a time, so the whole tab is never held at once.
+
+    Args:
+        worksheet (gspread.Worksheet): The worksheet.
+        width (int): Number of columns to read.
+        chunk_rows (int): Number of rows to read per request.
+
+    Yields:
+        tuple: (header row, list of the non-blank rows of one chunk).
+    """
+    last_column = rowcol_to_a1(1, width)[:-1]
+    header = None
+    start = 2
+    while True:
+        ranges = [f"A{start}:{last_column}{start + chunk_rows - 1}"]
+        if header is None:
+            ranges.insert(0, f"A1:{last_column}1")
+        try:
+            values = worksheet.batch_get(ranges, value_render_option=ValueRenderOption.unformatted)
+        except APIError as e:
+            # The previous chunk ended exactly at the end of the grid
+            if "exceeds grid limits" not in str(e):
+                raise
+            return
+        if header is None:
+            header = _trimmed(values[0][0]) if values[0] else []
+        rows = values[-1]
+        yield header, [_trimmed(row) for row in rows if any(value != '' for value in row)]
+        # Trailing blank rows are left out of the response, so a short chunk is the last one
+        if len(rows) < chunk_rows:
+            return
+        start += chunk_rows
+
+
+def match_rows_from_sheet(header, rows):
+    """
+    Put raw rows of a matches tab in MATCH_COLUMNS order, finding each column by the header.
+
+    Args:
+        header (list): The header row of the sheet.
+        rows (list): List of lists of raw sheet values.
+
+    Returns:
+        list: List of lists in MATCH_COLUMNS order.
+    """
+    positions = [header.index(column) if column in header else None for column in MATCH_COLUMNS]
+    return [
+        [row[position] if position is not None and position < len(row) else '' for position in positions]
+        for row in rows
+    ]
+
+
+class IncrementalMatchReader:
+    """
+    Reads the wide matches tab incrementally into an in-memory columnar store.
+
+    The first refresh reads the whole tab. Later refreshes fetch only the rows appended
+    since the last one, together with the header and the last row already ingested. If
+    either of those has changed, the sheet was edited above the cursor and the whole tab
+    is read again.
+    """
+
+    def __init__(self, get_worksheet):
+        """
+        Args:
+            get_worksheet (callable): Function with no arguments returning the matches worksheet.
+        """
+        self._get_worksheet = get_worksheet
+        self._lock = threading.Lock()
+        self._header = None
+        self._last_row = None
+        self._columns = {column: [] for column in MATCH_COLUMNS}
+        self.rows_ingested = 0
+        self.sheet_rows_read = 0
+        self.full_reloads = 0
+
+    def _store(self, header, rows):
+        """
+        Add sheet rows to the columnar store, mapping sheet columns to MATCH_COLUMNS by header.
+
+        Blank rows move the cursor but are not stored.
+
+        Args:
+            header (list): The header row of the sheet.
+            rows (list): List of lists of raw sheet values, in sheet order.
+        """
+        self.sheet_rows_read += len(rows)
+        if rows:
+            self._last_row = _trimmed(rows[-1])
+        rows = [row for row in rows if _trimmed(row)]
+        positions = [header.index(column) if column in header else None for column in MATCH_COLUMNS]
+        for column, position in zip(MATCH_COLUMNS, positions):
+            values = self._columns[column]
+            if position is None:
+                values.extend([''] * len(rows))
+            else:
+                values.extend(row[position] if position < len(row) else '' for row in rows)
+        self.rows_ingested += len(rows)
+
+    def _reload(self, worksheet):
+        """
+        Read the whole tab and replace the store.
+
+        Args:
+            worksheet (gspread.Worksheet): The matches worksheet.
+        """
+        values = worksheet.get_values(value_render_option=ValueRenderOption.unformatted)
+        self._header = _trimmed(values[0]) if values else []
+        self._last_row = self._header
+        self._columns = {column: [] for column in MATCH_COLUMNS}
+        self.rows_ingested = 0
+        self.sheet_rows_read = 0
+        self.full_reloads += 1
+        self._store(self._header, values[1:])
+
+    def _fetch_tail(self, worksheet):
+        """
+        Fetch the header, the last row read and any rows after it in one request.
+
+        Args:
+            worksheet (gspread.Worksheet): The matches worksheet.
+
+        Returns:
+            tuple: (header row, last row read, list of new rows).
+        """
+        width = max(len(self._header), len(MATCH_COLUMNS))
+        last_column = rowcol_to_a1(1, width)[:-1]
+        last_read = self.sheet_rows_read + 1  # Row 1 is the header
+        ranges = [f"A1:{last_column}1", f"A{last_read}:{last_column}{last_read}"]
+        try:
+            header, last_row, new_rows = worksheet.batch_get(
+                ranges + [f"A{last_read + 1}:{last_column}"],
+                value_render_option=ValueRenderOption.unformatted,
+            )
+        except APIError as e:
+            # Nothing has been appended if the next row is past the end of the grid
+            if "exceeds grid limits" not in str(e):
+                raise
+            header, last_row = worksheet.batch_get(ranges, value_render_option=ValueRenderOption.unformatted)
+            new_rows = []
+        return (
+            _trimmed(header[0]) if header else [],
+            _trimmed(last_row[0]) if last_row else [],
+            list(new_rows),
+        )
+
+    def refresh(self):
+        """
+        Bring the store up to date with the sheet.
+
+        Returns:
+            int: Change in the number of rows in the store.
+        """
+        with self._lock:
+            before = self.rows_ingested
+            worksheet = self._get_worksheet()
+            if self._header is None:
+                self._reload(worksheet)
+                return self.rows_ingested - before
+
+            header, last_row, new_rows = self._fetch_tail(worksheet)
+            if header != self._header or last_row != self._last_row:
+                # Something above the cursor was edited, inserted or deleted
+                self._reload(worksheet)
+            else:
+                self._store(self._header, new_rows)
+            return self.rows_ingested - before
+
+    @property
+    def loaded(self):
+        """
+        bool: Whether the tab has been read at least once.
+        """
+        return self._header is not None
+
+    def tail(self, count):
+        """
+        Get the most recently ingested rows.
+
+        Args:
+            count (int): Number of rows to return at most.
+
+        Returns:
+            list: List of lists in MATCH_COLUMNS order, oldest first.
+        """
+        with self._lock:
+            start = max(0, self.rows_ingested - count)
+            return [list(row) for row in zip(*(self._columns[column][start:] for column in MATCH_COLUMNS))]
+
+    def rows(self):
+        """
+        Get every ingested row.
+
+        Returns:
+            list: List of lists in MATCH_COLUMNS order.
+        """
+        with self._lock:
+            return [list(row) for row in zip(*(self._columns[column] for column in MATCH_COLUMNS))]
+
+    def columns(self):
+        """
+        Get a snapshot of the columnar store.
+
+        Returns:
+            dict: Column name -> list of values, for every column in MATCH_COLUMNS.
+        """
+        with self._lock:
+            return {column: list(values) for column, values in self._columns.items()}
@@ -0,0 +1,319 @@
+import threading
+import time
+from collections import namedtuple
+
+PointRecord = namedtuple('PointRecord', ['idempotency_key', 'scored', 'score_for', 'score_against'])
+
+# Outcomes of MatchRegistry.record_point
+RECORDED = 'recorded'
+DUPLICATE = 'duplicate'
+CONFLICT = 'conflict'
+
+# Matches without a change for this long are dropped from the registry, in seconds
+IDLE_MATCH_SECONDS = 6 * 60 * 60
+
+
+class MatchState:
+    """
+    The authoritative progress of one match, shared by every session recording it.
+    """
+
+    def __init__(self, match_id, tournament_name, date, opponent, score_for=0, score_against=0, next_point=1):
+        self.match_id = match_id
+        self.tournament_name = tournament_name
+        self.date = date
+        self.opponent = opponent
+        self.score_for = score_for
+        self.score_against = score_against
+        self.next_point = next_point
+        self.points = {}
+        self.updated_at = time.time()
+
+    def snapshot(self):
+        """
+        Get a copy of the score that is safe to read without the registry lock.
+
+        Returns:
+            dict: match_id, tournament_name, date, opponent, score_for, score_against,
+            point_number (the next point to play) and updated_at.
+        """
+        return {
+            'match_id': self.match_id,
+            'tournament_name': self.tournament_name,
+            'date': self.date,
+            'opponent': self.opponent,
+            'score_for': self.score_for,
+            'score_against': self.score_against,
+            'point_number': self.next_point,
+            'updated_at': self.updated_at,
+        }
+
+
+class MatchRegistry:
+    """
+    Process-wide registry of matches in progress.
+
+    Every device recording a match talks to the same MatchState, so they all see one
+    score. Points are claimed by number with an idempotency key: repeating a claim with
+    the same key is a no-op, and claiming a number another device already used is refused.
+
+    Finished matches are dropped with end_match, and matches idle for longer than
+    idle_seconds are dropped as new ones are registered or listed. A device still
+    recording a dropped match registers it again from the stored points.
+    """
+
+    def __init__(self, idle_seconds=IDLE_MATCH_SECONDS):
+        self.idle_seconds = idle_seconds
+        self._matches = {}
+        self._lock = threading.Lock()
+        # Bumped on every change, so readers can share one list of snapshots per version
+        self._version = 0
+        self._active = (-1, ())
+
+    def get(self, match_id):
+        """
+        Get a snapshot of a match.
+
+        Args:
+            match_id (str): The match id.
+
+        Returns:
+            dict: See MatchState.snapshot, or None if the match is not known.
+        """
+        with self._lock:
+            state = self._matches.get(match_id)
+            return state.snapshot() if state else None
+
+    def find(self, tournament_name, date, opponent):
+        """
+        Get a snapshot of the match most recently recorded against an opponent on a date.
+
+        Lets a device join a match another device started without knowing its id.
+
+        Args:
+            tournament_name (str): The name of the tournament.
+            date (str): The match date.
+            opponent (str): The name of the opponent.
+
+        Returns:
+            dict: See MatchState.snapshot, or None if no such match is known.
+        """
+        with self._lock:
+            states = [
+                state for state in self._matches.values()
+                if (state.tournament_name, state.date, state.opponent) == (tournament_name, date, opponent)
+            ]
+            return max(states, key=lambda state: state.updated_at).snapshot() if states else None
+
+    def ensure(self, match_id, tournament_name, date, opponent, score_for=0, score_against=0, next_point=1):
+        """
+        Register a match if it is not known yet, starting from the given score.
+
+        Args:
+            match_id (str): The match id.
+            tournament_name (str): The name of the tournament.
+            date (str): The match date.
+            opponent (str): The name of the opponent.
+            score_for (int): Our score so far.
+            score_against (int): The opponent's score so far.
+            next_point (int): The number of the next point to play.
+
+        Returns:
+            dict: Snapshot of the registered match.
+        """
+        with self._lock:
+            self._evict_idle()
+            state = self._matches.get(match_id)
+            if state is None:
+                state = self._matches[match_id] = MatchState(
+                    match_id, tournament_name, date, opponent, score_for, score_against, next_point
+                )
+                self._version += 1
+            return state.snapshot()
+
+    def end_match(self, match_id, if_unplayed=False):
+        """
+        Drop a match from the registry, e.g. because a new match was started.
+
+        Args:
+            match_id (str): The match id.
+            if_unplayed (bool): Only drop the match if no point of it was recorded.
+
+        Returns:
+            bool: True if the match was dropped.
+        """
+        with self._lock:
+            state = self._matches.get(match_id)
+            if state is None or (if_unplayed and state.next_point > 1):
+                return False
+            del self._matches[match_id]
+            self._version += 1
+            return True
+
+    def _evict_idle(self):
+        """
+        Drop the matches that have not changed for idle_seconds. Called with the lock held.
+        """
+        cutoff = time.time() - self.idle_seconds
+        idle = [match_id for match_id, state in self._matches.items() if state.updated_at < cutoff]
+        for match_id in idle:
+            del self._matches[match_id]
+        if idle:
+            self._version += 1
+
+    def record_point(self, match_id, point_number, idempotency_key, scored):
+        """
+        Claim a point number for a match and update the score.
+
+        Args:
+            match_id (str): The match id.
+            point_number (int): The point number the device is recording.
+            idempotency_key (str): Identifies this submission of the point.
+            scored (bool): Whether our team scored the point.
+
+        Returns:
+            tuple: (RECORDED, DUPLICATE or CONFLICT, snapshot of the match after the call).
+        """
+        with self._lock:
+            state = self._matches[match_id]
+            existing = state.points.get(point_number)
+            if existing is not None:
+                status = DUPLICATE if existing.idempotency_key == idempotency_key else CONFLICT
+                return status, state.snapshot()
+            if point_number != state.next_point:
+                return CONFLICT, state.snapshot()
+
+            if scored:
+                state.score_for += 1
+            else:
+                state.score_against += 1
+            state.points[point_number] = PointRecord(idempotency_key, scored, state.score_for, state.score_against)
+            state.next_point = point_number + 1
+            state.updated_at = time.time()
+            self._version += 1
+            return RECORDED, state.snapshot()
+
+    def get_point(self, match_id, point_number):
+        """
+        Get a recorded point.
+
+        Args:
+            match_id (str): The match id.
+            point_number (int): The point number.
+
+        Returns:
+            PointRecord: The point, or None if it has not been recorded here.
+        """
+        with self._lock:
+            state = self._matches.get(match_id)
+            return state.points.get(point_number) if state else None
+
+    def unrecord_point(self, match_id, point_number, idempotency_key):
+        """
+        Take back the most recent point, e.g. because saving it failed.
+
+        Args:
+            match_id (str): The match id.
+            point_number (int): The point number.
+            idempotency_key (str): The key the point was recorded with.
+
+        Returns:
+            bool: True if the point was taken back.
+        """
+        with self._lock:
+            state = self._matches.get(match_id)
+            if state is None or point_number != state.next_point - 1:
+                return False
+            point = state.points.get(point_number)
+            if point is None or point.idempotency_key != idempotency_key:
+                return False
+            del state.points[point_number]
+            if point.scored:
+                state.score_for -= 1
+            else:
+                state.score_against -= 1
+            state.next_point = point_number
+            state.updated_at = time.time()
+            self._version += 1
+            return True
+
+    def undo_point(self, match_id, point_number, scored):
+        """
+        Take back the last point of a match, whoever recorded it.
+
+        Args:
+            match_id (str): The match id.
+            point_number (int): The point number, which must be the last one recorded.
+            scored (bool): Whether our team scored the point.
+
+        Returns:
+            tuple: (True if the point was taken back, snapshot of the match after the call).
+        """
+        with self._lock:
+            state = self._matches[match_id]
+            if point_number != state.next_point - 1:
+                return False, state.snapshot()
+            state.points.pop(point_number, None)
+            if scored:
+                state.score_for -= 1
+            else:
+                state.score_against -= 1
+            state.next_point = point_number
+            state.updated_at = time.time()
+            self._version += 1
+            return True, state.snapshot()
+
+    def change_outcome(self, match_id, point_number, was_scored, scored):
+        """
+        Correct the outcome of a recorded point, moving the score of it and every later point.
+
+        Args:
+            match_id (str): The match id.
+            point_number (int): The point number.
+            was_scored (bool): The outcome that was recorded.
+            scored (bool): The correct outcome.
+
+        Returns:
+            dict: Snapshot of the match after the call.
+        """
+        with self._lock:
+            state = self._matches[match_id]
+            if was_scored != scored:
+                change = 1 if scored else -1
+                state.score_for += change
+                state.score_against -= change
+                for number, point in state.points.items():
+                    if number >= point_number:
+                        state.points[number] = point._replace(
+                            scored=scored if number == point_number else point.scored,
+                            score_for=point.score_for + change,
+                            score_against=point.score_against - change,
+                        )
+                state.updated_at = time.time()
+                self._version += 1
+            return state.snapshot()
+
+    def active_matches(self):
+        """
+        Get snapshots of every known match, most recently updated first.
+
+        The snapshots are only rebuilt after a change, so any number of readers share
+        one tuple. Do not modify it.
+
+        Returns:
+            tuple: Tuple of snapshots, see MatchState.snapshot.
+        """
+        with self._lock:
+            self._evict_idle()
+            version, snapshots = self._active
+            if version != self._version:
+                snapshots = tuple(sorted(
+                    (state.snapshot() for state in self._matches.values()),
+                    key=lambda snapshot: snapshot['updated_at'], reverse=True
+                ))
+                self._active = (self._version, snapshots)
+            return snapshots
+
+
+# Process-wide registry shared by every Streamlit session
+match_registry = MatchRegistry()
@@ -0,0 +1,106 @@
+"""
+Convert the wide matches tab to the normalized match tables.
+
+Usage:
+    python -m modules.migrate_matches [--dry-run] [--force]
+
+Reads every row of the matches tab, writes the compact match index, points, point
+players and players tabs, and reports how many cells the new layout uses. Set
+MATCH_STORAGE_FORMAT = "normalized" in st.secrets afterwards so new points are written
+in the normalized layout.
+"""
+import argparse
+
+from modules.google_sheets_connection import get_spreadsheet, reset_connections
+from modules.match_format import (
+    MATCH_INDEX_COLUMNS, POINT_COLUMNS, POINT_PLAYER_COLUMNS, PLAYER_COLUMNS,
+    normalize_match_rows, denormalize_match_rows, count_cells
+)
+from modules.storage import _sheets_backend
+
+NORMALIZED_COLUMNS = (MATCH_INDEX_COLUMNS, POINT_COLUMNS, POINT_PLAYER_COLUMNS, PLAYER_COLUMNS)
+
+
+def get_or_add_worksheet(spreadsheet, worksheet_name, columns):
+    """
+    Get a worksheet by name, adding it if the spreadsheet does not have it.
+
+    Args:
+        spreadsheet (gspread.Spreadsheet): The Google Sheets document.
+        worksheet_name (str): The name of the worksheet.
+        columns (list): The header of the worksheet.
+
+    Returns:
+        gspread.Worksheet: The worksheet.
+    """
+    existing = {worksheet.title: worksheet for worksheet in spreadsheet.worksheets()}
+    if worksheet_name in existing:
+        return existing[worksheet_name]
+    return spreadsheet.add_worksheet(title=worksheet_name, rows=1, cols=len(columns))
+
+
+def _comparable(rows):
+    """
+    Put wide rows in a form that can be compared regardless of order and value types.
+
+    The score string is left out because it is derived from the score columns.
+
+    Args:
+        rows (list): List of lists in MATCH_COLUMNS order.
+
+    Returns:
+        list: Sorted tuples of the row values as strings.
+    """
+    return sorted(tuple(str(value) for value in row[:10]) for row in rows)
+
+
+def migrate_matches(dry_run=False, force=False):
+    """
+    Copy the wide matches tab into the normalized match tables.
+
+    Args:
+        dry_run (bool): Only report the sizes, do not write anything.
+        force (bool): Overwrite normalized tabs that already contain data.
+
+    Returns:
+        tuple: (cells in the wide layout, cells in the normalized layout).
+    """
+    backend = _sheets_backend()
+    backend.match_format = "wide"
+    wide_rows = backend.get_match_rows()
+    normalized = normalize_match_rows(wide_rows)
+
+    # Make sure nothing is lost before writing anything
+    if _comparable(denormalize_match_rows(normalized)) != _comparable(wide_rows):
+        raise ValueError(
+            "Normalized tables do not reproduce the matches tab; "
+            "it may contain duplicate players or conflicting outcomes within a point"
+        )
+
+    wide_cells = count_cells(wide_rows)
+    normalized_cells = sum(count_cells(rows) for rows in normalized)
+    if dry_run:
+        return wide_cells, normalized_cells
+
+    spreadsheet = get_spreadsheet(backend.credentials, backend.sheet_name)
+    for worksheet_name, columns, rows in zip(backend.normalized_tab_names, NORMALIZED_COLUMNS, normalized):
+        worksheet = get_or_add_worksheet(spreadsheet, worksheet_name, columns)
+        if len(worksheet.get_values("A2:A2")) and not force:
+            raise ValueError(f"Worksheet '{worksheet_name}' already has data; use --force to overwrite it")
+        worksheet.clear()
+        worksheet.update([columns] + rows, "A1", value_input_option='RAW')
+
+    # Worksheets may have been added, so look them up again
+    reset_connections()
+    return wide_cells, normalized_cells
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert the matches tab to the normalized match tables.")
+    parser.add_argument("--dry-run", action="store_true", help="only report the sizes")
+    parser.add_argument("--force", action="store_true", help="overwrite normalized tabs that have data")
+    args = parser.parse_args()
+
+    wide_cells, normalized_cells = migrate_matches(dry_run=args.dry_run, force=args.force)
+    print(f"Wide layout: {wide_cells} cells")
+    print(f"Normalized layout: {normalized_cells} cells ({normalized_cells / max(wide_cells, 1):.0%})")
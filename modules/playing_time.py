@@ -0,0 +1,326 @@
+import threading
+
+from modules.match_format import make_point_id, row_match_id
+
+# Players per point
+LINE_SIZE = 7
+
+# Handlers in a suggested line; the rest are cutters and hybrids
+SUGGESTED_HANDLERS = 3
+
+
+class PlayerTime:
+    """
+    Running playing-time counters for one player in one match or tournament.
+
+    streak and last_point are only kept for a match, where point numbers follow each other.
+    """
+
+    __slots__ = ('points', 'o_points', 'd_points', 'streak', 'last_point')
+
+    def __init__(self):
+        self.points = 0
+        self.o_points = 0
+        self.d_points = 0
+        # Consecutive points played up to last_point
+        self.streak = 0
+        self.last_point = None
+
+
+class MatchTime:
+    """
+    Playing time in one match: the players and outcome of each point, and per-player counters.
+    """
+
+    __slots__ = ('tournament_name', 'lines', 'results', 'players', 'last_point')
+
+    def __init__(self, tournament_name):
+        self.tournament_name = tournament_name
+        # Point number -> list of (player name, line) on the field
+        self.lines = {}
+        # Point number -> whether we scored it
+        self.results = {}
+        self.players = {}
+        self.last_point = None
+
+
+class PlayingTimeTracker:
+    """
+    Process-wide playing-time counters, kept up to date as points are saved.
+
+    The counters are built once from the stored match history and then only updated in
+    memory, so reading them between points never goes back to the backend. Points are
+    counted once per (match, point number), so the history and a live save of the same
+    point do not count twice.
+
+    The history is read without holding the lock, so the counters can be read and
+    updated while it loads. A point undone or corrected during the load is not taken
+    from the history, which may have been read before the change.
+
+    A point is an O point when the previous point of the match was lost, and a D point
+    when it was won, as on the Stats page. The first point of a match is an O point when
+    most of the players on it are from the O line.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._matches = {}
+        self._tournaments = {}
+        self.loaded = False
+        # The error that stopped the history loading, if any
+        self.load_error = None
+        self._loading = False
+        # Points undone, and outcomes corrected, while the history was loading
+        self._removed_while_loading = set()
+        self._results_while_loading = {}
+
+    def ensure_loaded(self, load_rows):
+        """
+        Count the stored match history, once per process.
+
+        Returns straight away if another thread is already loading it.
+
+        Args:
+            load_rows (callable): Function with no arguments returning every match row in
+                MATCH_COLUMNS order. If it fails, only points saved from now on are counted.
+        """
+        with self._lock:
+            if self.loaded or self._loading:
+                return
+            self._loading = True
+        rows = ()
+        try:
+            rows = load_rows()
+        except Exception as e:
+            self.load_error = e
+            raise
+        finally:
+            with self._lock:
+                self._add_rows(rows, skip=self._removed_while_loading)
+                for (match_id, point_number), scored in self._results_while_loading.items():
+                    self._set_result(match_id, point_number, scored)
+                self._removed_while_loading = set()
+                self._results_while_loading = {}
+                self._loading = False
+                self.loaded = True
+
+    def load_in_background(self, load_rows):
+        """
+        Start counting the stored match history in a background thread, once per process.
+
+        Args:
+            load_rows (callable): See ensure_loaded.
+        """
+        with self._lock:
+            if self.loaded or self._loading:
+                return
+
+        def load():
+            try:
+                self.ensure_loaded(load_rows)
+            except Exception:
+                # Kept in load_error for the pages to show
+                pass
+
+        threading.Thread(target=load, name="playing-time", daemon=True).start()
+
+    def add_rows(self, rows):
+        """
+        Count the points in a batch of match rows, e.g. the rows of a point that was just saved.
+
+        Args:
+            rows (list): List of lists in MATCH_COLUMNS order, grouped by point.
+        """
+        with self._lock:
+            self._add_rows(rows)
+
+    def remove_point(self, match_id, point_number):
+        """
+        Stop counting a point, e.g. after it was undone.
+
+        Args:
+            match_id (str): The match id.
+            point_number (int): The point number.
+        """
+        with self._lock:
+            if self._loading:
+                self._removed_while_loading.add((match_id, point_number))
+                self._results_while_loading.pop((match_id, point_number), None)
+            match = self._matches.get(match_id)
+            if match is not None and match.lines.pop(point_number, None) is not None:
+                match.results.pop(point_number, None)
+                self._recount(match)
+
+    def set_result(self, match_id, point_number, scored):
+        """
+        Correct the outcome of a counted point, which changes whether the next point is O or D.
+
+        Args:
+            match_id (str): The match id.
+            point_number (int): The point number.
+            scored (bool): Whether our team scored the point.
+        """
+        with self._lock:
+            if self._loading:
+                self._results_while_loading[(match_id, point_number)] = scored
+            self._set_result(match_id, point_number, scored)
+
+    def _set_result(self, match_id, point_number, scored):
+        match = self._matches.get(match_id)
+        if match is not None and point_number in match.results:
+            match.results[point_number] = scored
+            self._recount(match)
+
+    def _add_rows(self, rows, skip=()):
+        points = {}
+        for row in rows:
+            match_id = row_match_id(row)
+            point = points.setdefault(make_point_id(match_id, row[3]), (match_id, row[0], row[3], row[7], []))
+            point[4].append((row[4], row[5]))
+
+        changed = {}
+        for match_id, tournament_name, point_number, point_scored, players in points.values():
+            try:
+                point_number = int(point_number)
+            except (TypeError, ValueError):
+                continue
+            if (match_id, point_number) in skip:
+                continue
+            match = self._matches.get(match_id)
+            if match is None:
+                match = self._matches[match_id] = MatchTime(tournament_name)
+            if point_number in match.lines:
+                continue
+            match.lines[point_number] = players
+            match.results[point_number] = str(point_scored).lower() == 'yes'
+            changed[match_id] = match
+
+        for match in changed.values():
+            self._recount(match)
+
+    def _recount(self, match):
+        """
+        Rebuild the counters of a match from its points and update its tournament's totals.
+
+        A match has a few dozen points at most, so this is cheap enough to run on every change.
+
+        Args:
+            match (MatchTime): The match.
+        """
+        tournament = self._tournaments.setdefault(match.tournament_name, {})
+        for player_name, player in match.players.items():
+            total = tournament[player_name]
+            total.points -= player.points
+            total.o_points -= player.o_points
+            total.d_points -= player.d_points
+
+        players = {}
+        for point_number in sorted(match.lines):
+            on_field = match.lines[point_number]
+            previous = match.results.get(point_number - 1)
+            if previous is None:
+                is_o = sum(line == 'O' for _, line in on_field) * 2 >= len(on_field)
+            else:
+                is_o = not previous
+            for player_name, _ in on_field:
+                player = players.get(player_name)
+                if player is None:
+                    player = players[player_name] = PlayerTime()
+                player.points += 1
+                if is_o:
+                    player.o_points += 1
+                else:
+                    player.d_points += 1
+                player.streak = player.streak + 1 if player.last_point == point_number - 1 else 1
+                player.last_point = point_number
+        match.players = players
+        match.last_point = max(match.lines, default=None)
+
+        for player_name, player in players.items():
+            total = tournament.get(player_name)
+            if total is None:
+                total = tournament[player_name] = PlayerTime()
+            total.points += player.points
+            total.o_points += player.o_points
+            total.d_points += player.d_points
+
+    def summary(self, match_id, tournament_name):
+        """
+        Get every player's counters for a match and its tournament.
+
+        Args:
+            match_id (str): The match id, or None if no match is being recorded.
+            tournament_name (str): The name of the tournament.
+
+        Returns:
+            dict: Player name -> (points this match, O points, D points, consecutive
+            points ending with the last point of the match, points this tournament).
+        """
+        with self._lock:
+            match = self._matches.get(match_id) or MatchTime(tournament_name)
+            tournament = self._tournaments.get(tournament_name, {})
+            summary = {}
+            for name in set(match.players) | set(tournament):
+                in_match = match.players.get(name) or PlayerTime()
+                on_last_point = in_match.last_point is not None and in_match.last_point == match.last_point
+                total = tournament.get(name)
+                summary[name] = (
+                    in_match.points, in_match.o_points, in_match.d_points,
+                    in_match.streak if on_last_point else 0,
+                    total.points if total else 0,
+                )
+            return summary
+
+    def next_point_is_o(self, match_id):
+        """
+        Work out whether the next point of a match will be played on offence.
+
+        Args:
+            match_id (str): The match id.
+
+        Returns:
+            bool: True after a lost point, False after a won one, None before the first point.
+        """
+        with self._lock:
+            match = self._matches.get(match_id)
+            if match is None or match.last_point is None:
+                return None
+            return not match.results[match.last_point]
+
+
+def suggest_line(roster, summary, o_point=True):
+    """
+    Propose 7 players for the next point, favouring those who have played least.
+
+    Players come from the line for the point first (the O line on offence) and from the
+    other line if it is short. Within a line, players who sat out the last point and have
+    played fewer points this match, then this tournament, come first. The line is filled
+    with SUGGESTED_HANDLERS handlers and cutters or hybrids for the rest, where the roster allows.
+
+    Args:
+        roster (RosterIndex): The tournament roster.
+        summary (dict): Playing time per player, see PlayingTimeTracker.summary.
+        o_point (bool): Whether the point will be played on offence.
+
+    Returns:
+        list: The names of the suggested players.
+    """
+    def rest_order(player):
+        points, _, _, streak, tournament_points = summary.get(player.name, (0, 0, 0, 0, 0))
+        return (streak > 0, points, tournament_points)
+
+    preferred = 'O' if o_point else 'D'
+    lines = sorted(roster.lines, key=lambda line: line != preferred)
+    candidates = [player for line in lines for player in sorted(roster.by_line[line], key=rest_order)]
+
+    handlers = [player for player in candidates if player.position == 'Handler'][:SUGGESTED_HANDLERS]
+    others = [player for player in candidates if player.position != 'Handler'][:LINE_SIZE - len(handlers)]
+    picked = {player.name for player in handlers + others}
+    # Keep the priority order, then fill any gap with whoever is left
+    chosen = [player for player in candidates if player.name in picked]
+    chosen += [player for player in candidates if player.name not in picked][:LINE_SIZE - len(chosen)]
+    return [player.name for player in chosen]
+
+
+# Process-wide counters shared by every Streamlit session
+playing_time = PlayingTimeTracker()
@@ -1,84 +1,767 @@
 import streamlit as st
 import pandas as pd
-from modules.google_sheets_connection import connect_to_google_sheets
+from modules.storage import get_backend, get_sheets_sync_backend, NOT_IN_TAIL
+from modules.roster_index import build_roster_index
+from modules.sheet_cache import sheet_cache
+from modules.match_journal import match_journal
+from modules.match_format import new_match_id
+from modules.match_state import match_registry, CONFLICT, DUPLICATE
+from modules.playing_time import playing_time, suggest_line
+from modules.instrumentation import track_backend_call, tracked_fragment
 import gspread
+import uuid
 from datetime import datetime
 
-# Input fields for JSON keyfile, Google Sheets name, and worksheet name
-credentials = st.secrets["gcp_service_account"]
-sheet_name = st.secrets["SHEET_NAME"]
+# Worksheet names, also used to key the shared cache
 tournament_tab_name = st.secrets["TOURNAMENT_TAB_NAME"]
 tournament_roster_tab_name = st.secrets["TOURNAMENT_ROSTER_TAB_NAME"]
 matches_tab_name = st.secrets["MATCHES_TAB_NAME"]
 
+# How often the score card checks for points recorded on other devices, in seconds
+SCOREBOARD_REFRESH_SECONDS = 5
+
+# Most recent points of a match that can be undone or corrected
+EDITABLE_POINTS = 5
+
+# Points of the session's match counted while the match history loads; more than any match has
+PLAYING_TIME_SEED_POINTS = 200
+
+def load_record_match_data():
+    """
+    Load the tournaments and every tournament roster in one request and fill the shared cache.
+    
+    Later calls to get_tournaments and get_tournament_roster_index are then served from the cache.
+    """
+    def load():
+        with track_backend_call('load_tables', tournament_roster_tab_name) as call:
+            tables = get_backend().load_tables(tournaments=True, tournament_rosters=True)
+            call.rows = len(tables.tournaments) + sum(len(rows) for rows in tables.tournament_rosters.values())
+        sheet_cache.set((tournament_tab_name,), tables.tournaments)
+        for name in tables.tournaments:
+            sheet_cache.set(
+                (tournament_roster_tab_name, name),
+                build_roster_index(tables.tournament_rosters.get(name, []))
+            )
+        return True
+    
+    sheet_cache.get_or_load(('page', 'record_match'), load)
+
 def get_tournaments():
     """
-    Get the list of tournaments from the tournaments tab in Google Sheets.
+    Get the list of tournaments from the storage backend.
+    
+    The list is served from the shared cache and only read from storage when it has expired.
     
     Returns:
         list: List of tournament names.
     """
-    try:
-        sheet = connect_to_google_sheets(credentials, sheet_name, tournament_tab_name)
-        data = sheet.get_all_records()
-        tournaments = [row.get('tournament_name') for row in data if 'tournament_name' in row]
+    def load():
+        with track_backend_call('get_tournaments', tournament_tab_name) as call:
+            tournaments = get_backend().get_tournaments()
+            call.rows = len(tournaments)
         return tournaments
+    
+    try:
+        return list(sheet_cache.get_or_load((tournament_tab_name,), load))
     except Exception as e:
         raise e
 
-def get_tournament_roster(tournament_name):
+def get_tournament_roster_index(tournament_name):
     """
-    Get the roster for a specific tournament from the tournament_rosters tab in Google Sheets.
+    Get the roster index for a specific tournament from the storage backend.
+    
+    The index is built once per roster load and served from the shared cache.
     
     Args:
         tournament_name (str): The name of the tournament.
         
     Returns:
-        pandas.DataFrame: DataFrame containing the tournament roster.
+        RosterIndex: Index of the tournament roster by line and by player name.
     """
+    def load():
+        with track_backend_call('get_tournament_roster', tournament_roster_tab_name) as call:
+            records = get_backend().get_tournament_roster(tournament_name)
+            call.rows = len(records)
+        return build_roster_index(records)
+    
     try:
-        sheet = connect_to_google_sheets(credentials, sheet_name, tournament_roster_tab_name)
-        data = sheet.get_all_records()
-        df = pd.DataFrame(data)
-        # Filter for the selected tournament
-        df = df[df['tournament_name'] == tournament_name]
-        return df
+        return sheet_cache.get_or_load((tournament_roster_tab_name, tournament_name), load)
     except Exception as e:
         raise e
 
-def save_match_data(match_data):
+def get_tournament_roster(tournament_name):
     """
-    Save the match data to the matches tab in Google Sheets.
+    Get the roster for a specific tournament from the storage backend.
+    
+    Args:
+        tournament_name (str): The name of the tournament.
+        
+    Returns:
+        pandas.DataFrame: DataFrame containing the tournament roster.
+    """
+    roster = get_tournament_roster_index(tournament_name)
+    df = pd.DataFrame(roster.records(), columns=['player_name', 'line', 'position'])
+    df.insert(0, 'tournament_name', tournament_name)
+    return df
+
+def _load_match_rows():
+    with track_backend_call('get_match_rows', matches_tab_name) as call:
+        rows = get_backend().get_match_rows()
+        call.rows = len(rows)
+    return rows
+
+def load_playing_time():
+    """
+    Count the playing time in the stored match history, once per process.
+    
+    After that the counters are updated in memory as points are saved.
+    """
+    playing_time.ensure_loaded(_load_match_rows)
+
+def start_playing_time(match_info):
+    """
+    Start counting the stored match history in the background, and count the session's match now.
+    
+    Until the history is counted, the points of the session's match are taken from the
+    match journal or the local backend, so the page never waits for the whole matches tab.
+    
+    Args:
+        match_info (dict): The session's match.
+    """
+    playing_time.load_in_background(_load_match_rows)
+    match_id = match_info["match_id"]
+    if playing_time.loaded or not match_id or st.session_state.get("playing_time_seeded") == match_id:
+        return
+    # Points already counted, e.g. by a load that just finished, are not counted twice
+    recent = get_recent_points(match_info, PLAYING_TIME_SEED_POINTS)
+    playing_time.add_rows([row for _, rows in recent for row in rows])
+    st.session_state.playing_time_seeded = match_id
+
+def sync_match_rows(match_data):
+    """
+    Push journaled match rows to Google Sheets.
     
     Args:
         match_data (list): List of lists containing match data rows.
+    
+    Returns:
+        int: The sheet row the first row was written to, kept by the journal for undo and edits.
+    """
+    with track_backend_call('append_match_rows', matches_tab_name, rows=len(match_data)):
+        first_row = get_sheets_sync_backend().append_match_rows(match_data)
+    # Anything cached from the matches tab is now out of date
+    sheet_cache.invalidate_worksheet(matches_tab_name)
+    return first_row
+
+
+def find_synced_points(keys, row_count):
+    """
+    Find which journaled points already reached Google Sheets, before they are sent again.
+    
+    Args:
+        keys (list): (match_id, point_number) tuples of the points.
+        row_count (int): Total number of rows of the points.
+    
+    Returns:
+        dict: (match_id, point_number) -> sheet row of the first row, for the points found.
+    """
+    with track_backend_call('find_match_points', matches_tab_name):
+        return get_sheets_sync_backend().find_match_points(keys, row_count)
+
+
+def save_match_data(match_data, match_id=None, point_number=None):
+    """
+    Save the match data for one point.
+    
+    Rows for a local backend are written immediately. Rows for Google Sheets are committed
+    to the local match journal and pushed to the matches tab in the background, so saving
+    does not wait on the network. Either way a point is stored at most once per
+    (match_id, point_number).
+    
+    Args:
+        match_data (list): List of lists containing match data rows.
+        match_id (str): The id of the match the point belongs to.
+        point_number (int): The point number within the match.
         
     Returns:
         bool: True if the data was successfully saved, False otherwise.
     """
     try:
-        sheet = connect_to_google_sheets(credentials, sheet_name, matches_tab_name)
+        if not match_data:
+            return True
         
-        # Use batch append for efficiency
-        if match_data:
-            sheet.append_rows(
-                match_data, 
-                value_input_option='RAW',
-                insert_data_option='INSERT_ROWS',
-                table_range='A1'
-            )
+        # A local backend is written straight away
+        backend = get_backend()
+        if backend.is_local:
+            with track_backend_call('append_match_rows', matches_tab_name, rows=len(match_data)):
+                backend.append_match_rows(match_data)
+            sheet_cache.invalidate_worksheet(matches_tab_name)
         
+        # Google Sheets is written in the background from the journal
+        if get_sheets_sync_backend() is not None:
+            match_journal.append(match_data, match_id, point_number)
+            match_journal.start_flusher(sync_match_rows, find_synced_points)
+        
+        playing_time.add_rows(match_data)
         return True
     except Exception as e:
         raise e
 
 
+def get_recent_points(match_info, count=EDITABLE_POINTS):
+    """
+    Get the rows of the last points of the session's match.
+    
+    Points synced to Google Sheets come from the local match journal, which also knows the
+    sheet rows they were written to; otherwise they come from the local backend.
+    
+    Args:
+        match_info (dict): The session's match.
+        count (int): Number of points to return at most.
+    
+    Returns:
+        list: List of (point number, rows) tuples, oldest first.
+    """
+    if get_sheets_sync_backend() is not None:
+        return match_journal.recent_points(match_info["match_id"], count)
+    with track_backend_call('get_recent_points', matches_tab_name) as call:
+        recent = get_backend().get_recent_points(match_info["match_id"], count)
+        call.rows = sum(len(rows) for _, rows in recent)
+    return recent
+
+
+def _point_scored(rows):
+    return str(rows[0][7]).lower() == "yes"
+
+
+def undo_last_point(match_info):
+    """
+    Take back the last point of a match: the shared score, the stored rows and the playing time.
+    
+    Rows already synced to Google Sheets are deleted in one request using the row range
+    the journal kept when they were appended, so the matches tab is never searched.
+    
+    Args:
+        match_info (dict): The session's match.
+    
+    Returns:
+        dict: Snapshot of the match from the match registry after the undo.
+    
+    Raises:
+        ValueError: If there is no point to undo or its rows cannot be located.
+    """
+    match_id = match_info["match_id"]
+    recent = get_recent_points(match_info, 1)
+    if not recent:
+        raise ValueError("There is no point to undo")
+    point_number, rows = recent[-1]
+    scored = _point_scored(rows)
+    
+    undone, shared = match_registry.undo_point(match_id, point_number, scored)
+    if not undone:
+        raise ValueError(f"Point {shared['point_number'] - 1} was recorded on another server; undo it there")
+    try:
+        sync_backend = get_sheets_sync_backend()
+        if sync_backend is not None:
+            with track_backend_call('delete_match_rows', matches_tab_name, rows=len(rows)):
+                match_journal.remove_point(match_id, point_number, sync_backend.delete_match_rows)
+        backend = get_backend()
+        if backend.is_local:
+            with track_backend_call('delete_point', matches_tab_name, rows=len(rows)):
+                backend.delete_point(match_id, point_number)
+    except Exception:
+        # Put the point back so the score still agrees with the stored rows
+        match_registry.record_point(match_id, point_number, uuid.uuid4().hex, scored)
+        raise
+    
+    sheet_cache.invalidate_worksheet(matches_tab_name)
+    playing_time.remove_point(match_id, point_number)
+    return shared
+
+
+def edit_point_outcome(match_info, point_number, scored):
+    """
+    Correct the outcome of one of the last points of a match.
+    
+    The score columns of that point and every later point change with it, so all of
+    their rows are overwritten together, in one request for rows synced to Google Sheets.
+    
+    Args:
+        match_info (dict): The session's match.
+        point_number (int): The point number.
+        scored (bool): Whether our team scored the point.
+    
+    Returns:
+        dict: Snapshot of the match from the match registry after the edit.
+    
+    Raises:
+        ValueError: If the point is not one of the last EDITABLE_POINTS points recorded here.
+    """
+    match_id = match_info["match_id"]
+    recent = get_recent_points(match_info)
+    numbers = [number for number, _ in recent]
+    if point_number not in numbers:
+        raise ValueError(f"Only the last {EDITABLE_POINTS} points can be corrected")
+    later = recent[numbers.index(point_number):]
+    was_scored = _point_scored(later[0][1])
+    if was_scored == scored:
+        return match_registry.get(match_id)
+    
+    change = 1 if scored else -1
+    updated = []
+    for number, rows in later:
+        new_rows = []
+        for row in rows:
+            row = list(row)
+            if number == point_number:
+                row[7] = "Yes" if scored else "No"
+            row[8] = int(row[8]) + change
+            row[9] = int(row[9]) - change
+            row[10] = f"{row[8]}-{row[9]}"
+            new_rows.append(row)
+        updated.append((number, new_rows))
+    
+    shared = match_registry.change_outcome(match_id, point_number, was_scored, scored)
+    try:
+        if shared["point_number"] - 1 != later[-1][0]:
+            raise ValueError(f"Point {shared['point_number'] - 1} was recorded on another server; correct it there")
+        sync_backend = get_sheets_sync_backend()
+        if sync_backend is not None:
+            rows_written = sum(len(rows) for _, rows in updated)
+            with track_backend_call('update_match_rows', matches_tab_name, rows=rows_written):
+                match_journal.replace_points(match_id, updated, sync_backend.update_match_rows)
+        backend = get_backend()
+        if backend.is_local:
+            with track_backend_call('update_points', matches_tab_name, rows=len(updated)):
+                backend.update_points([rows for _, rows in updated])
+    except Exception:
+        shared = match_registry.change_outcome(match_id, point_number, scored, was_scored)
+        raise
+    
+    sheet_cache.invalidate_worksheet(matches_tab_name)
+    playing_time.set_result(match_id, point_number, scored)
+    return shared
+
+
+def _fix_points_panel():
+    """
+    Display the last points of the match with buttons to correct their outcome or undo the last one.
+    """
+    match_info = st.session_state.match_info
+    try:
+        recent = get_recent_points(match_info)
+    except Exception as e:
+        st.error(f"Error loading recent points: {e}")
+        return
+    if not recent:
+        return
+    
+    with st.expander("Fix a recent point", expanded=False):
+        action = None
+        for point_number, rows in reversed(recent):
+            scored = _point_scored(rows)
+            col1, col2 = st.columns([3, 1])
+            with col1:
+                st.write(
+                    f"**Point {point_number}**: {'scored' if scored else 'lost'}, "
+                    f"{rows[0][8]} - {rows[0][9]}"
+                )
+                st.caption(", ".join(str(row[4]) for row in rows))
+            with col2:
+                if st.button("Mark lost" if scored else "Mark scored", key=f"edit_point_{point_number}"):
+                    action = lambda point_number=point_number, scored=scored: edit_point_outcome(
+                        match_info, point_number, not scored
+                    )
+        
+        last_point = recent[-1][0]
+        if st.button(f"Undo point {last_point}", use_container_width=True, key="undo_point"):
+            action = lambda: undo_last_point(match_info)
+        
+        if action is None:
+            return
+        try:
+            shared = action()
+        except ValueError as e:
+            st.error(str(e))
+            return
+        except gspread.exceptions.APIError as e:
+            st.error(f"API Error: {e.response.text}")
+            return
+        except Exception as e:
+            st.error(f"Error: {e}")
+            return
+        _follow_shared_match(shared)
+        st.session_state.shown_point_number = shared["point_number"]
+        st.rerun()
+
+
+def _follow_shared_match(shared):
+    """
+    Copy the shared score and point number of a match into this session.
+    
+    Args:
+        shared (dict): Snapshot of the match from the match registry.
+    """
+    st.session_state.match_info["point_number"] = shared["point_number"]
+    st.session_state.match_info["score_for"] = shared["score_for"]
+    st.session_state.match_info["score_against"] = shared["score_against"]
+
+
+def _resume_match(match_id):
+    """
+    Find where a match left off and register it in the shared match registry.
+    
+    The registry answers for matches this process already knows. After a restart the last
+    point comes from the local match journal or, failing that, from the last rows of the
+    stored match history. Only a match that is not among those rows is looked up in the
+    whole history, with a warning, since that is much slower.
+    
+    Args:
+        match_id (str): The match id.
+        
+    Returns:
+        dict: Snapshot of the match from the match registry, or None if it has no recorded points.
+    """
+    shared = match_registry.get(match_id)
+    if shared is not None:
+        return shared
+    
+    last_point = match_journal.last_point(match_id)
+    if last_point is None:
+        with track_backend_call('get_last_point', matches_tab_name):
+            last_point = get_backend().get_last_point(match_id)
+    if last_point == NOT_IN_TAIL:
+        st.warning("This match is not among the latest points; looking it up in the whole match history")
+        with track_backend_call('get_last_point', matches_tab_name):
+            last_point = get_backend().get_last_point(match_id, full_search=True)
+    if last_point is None:
+        return None
+    return match_registry.ensure(
+        match_id, last_point["tournament_name"], last_point["date"], last_point["opponent"],
+        last_point["score_for"], last_point["score_against"], last_point["point_number"] + 1
+    )
+
+
+def _registered_match(match_info):
+    """
+    Get the session's match from the shared match registry, registering it again if needed.
+    
+    A match dropped from the registry, e.g. after being idle, picks up where its stored
+    points left off, or from this session's score if it has none.
+    
+    Args:
+        match_info (dict): The session's match, with its match id.
+    
+    Returns:
+        dict: Snapshot of the match from the match registry.
+    """
+    shared = _resume_match(match_info["match_id"])
+    if shared is None:
+        shared = match_registry.ensure(
+            match_info["match_id"], match_info["tournament_name"], match_info["date"], match_info["opponent"],
+            match_info["score_for"], match_info["score_against"], match_info["point_number"]
+        )
+    return shared
+
+
+def _resume_latest_match(match_info):
+    """
+    Pick up the latest stored match of the session's tournament, date and opponent.
+    
+    Used when the match is not in the shared match registry, e.g. after a restart. The
+    last point comes from the local match journal or, failing that, from the last rows of
+    the stored match history.
+    
+    Args:
+        match_info (dict): The session's match, without a match id.
+    
+    Returns:
+        dict: Snapshot of the match from the match registry, or None if no such match was found.
+    """
+    key = (match_info["tournament_name"], match_info["date"], match_info["opponent"])
+    last_point = match_journal.last_match(*key)
+    if last_point is None:
+        with track_backend_call('find_last_match', matches_tab_name):
+            last_point = get_backend().find_last_match(*key)
+    if last_point is None:
+        return None
+    return match_registry.ensure(
+        last_point["match_id"], *key,
+        last_point["score_for"], last_point["score_against"], last_point["point_number"] + 1
+    )
+
+
+def _join_shared_match():
+    """
+    Register the session's match in the shared match registry and follow its score.
+    
+    A session already recording a match follows it by id, picking up where it left off or
+    from this session's score if it has no recorded points. Otherwise the session joins the
+    match another device is recording against the same opponent today, picks up the latest
+    stored one, e.g. after a restart, or starts a new match from 0 - 0. The match id is kept in the page URL so a reload comes back to the
+    same match.
+    """
+    match_info = st.session_state.match_info
+    if match_info["match_id"]:
+        shared = _registered_match(match_info)
+    else:
+        shared = match_registry.find(match_info["tournament_name"], match_info["date"], match_info["opponent"])
+        if shared is None:
+            shared = _resume_latest_match(match_info)
+        if shared is None:
+            shared = match_registry.ensure(
+                new_match_id(), match_info["tournament_name"], match_info["date"], match_info["opponent"]
+            )
+    match_id = match_info["match_id"] = shared["match_id"]
+    _follow_shared_match(shared)
+    if st.query_params.get("match") != match_id:
+        st.query_params["match"] = match_id
+
+
+def _reset_point_entry():
+    """
+    Forget the point number and submission the save panel kept for the previous match.
+    """
+    st.session_state.pop("shown_point_number", None)
+    st.session_state.pop("point_idempotency_key", None)
+
+
+@st.fragment(run_every=SCOREBOARD_REFRESH_SECONDS)
+@tracked_fragment
+def _scoreboard_card():
+    """
+    Display the score card, refreshing on its own to pick up points recorded on other devices.
+    
+    A change to the shared score reruns the whole page so the point number in the save
+    panel moves on too.
+    """
+    match_info = st.session_state.match_info
+    if match_info["match_id"]:
+        shared = match_registry.get(match_info["match_id"])
+        if shared and shared["point_number"] != match_info["point_number"]:
+            _follow_shared_match(shared)
+            st.rerun()
+    
+    st.markdown(f"""
+    <div class="match-info-card">
+        <div class="match-score">{match_info['score_for']} - {match_info['score_against']}</div>
+        <p><b>Point:</b> {match_info['point_number']} | 
+        <b>Date:</b> {match_info['date']}</p>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    # Show how many points are still waiting to reach the sheet
+    pending_points = match_journal.pending_count()
+    if pending_points:
+        st.caption(f"⏳ {pending_points} point{'s' if pending_points != 1 else ''} pending sync")
+    else:
+        st.caption("✔️ All points synced")
+
+
+def _selected_players(roster):
+    """
+    Get the players currently selected in the selection panel.
+    
+    Args:
+        roster (RosterIndex): The tournament roster.
+    
+    Returns:
+        list: List of dicts with player_name, line, position and selected for each selected player.
+    """
+    player_selections = []
+    for line in roster.lines:
+        for player_name in st.session_state.get(f"line_{line}_players", []):
+            # Left over from another tournament's roster
+            if player_name not in roster.by_name:
+                continue
+            player_line, position = roster.by_name[player_name]
+            player_selections.append({
+                'player_name': player_name,
+                'line': player_line,
+                'position': position,
+                'selected': True
+            })
+    return player_selections
+
+
+@st.fragment
+@tracked_fragment
+def _selection_panel(roster):
+    """
+    Display the per-line player pickers.
+    
+    Picking a player only reruns this panel, so the rest of the page is neither
+    re-rendered nor reloaded.
+    
+    Args:
+        roster (RosterIndex): The tournament roster.
+    """
+    match_info = st.session_state.match_info
+    summary = playing_time.summary(match_info["match_id"], match_info["tournament_name"])
+    
+    # Group players by line for better organization
+    st.markdown("### Select exactly 7 players")
+    
+    # Propose the players who have rested longest, before the pickers are drawn so they show it
+    if st.button("Suggest line", use_container_width=True):
+        o_point = playing_time.next_point_is_o(match_info["match_id"])
+        suggested = set(suggest_line(roster, summary, o_point is not False))
+        for line in roster.lines:
+            st.session_state[f"line_{line}_players"] = [
+                player.name for player in roster.by_line[line] if player.name in suggested
+            ]
+    
+    def label(player_name):
+        points, o_points, d_points, streak, tournament_points = summary.get(player_name, (0, 0, 0, 0, 0))
+        played = f"{points} pt{'s' if points != 1 else ''}" + (f" ({o_points}O/{d_points}D)" if points else "")
+        in_a_row = f", {streak} in a row" if streak > 1 else ""
+        return f"{roster.label(player_name)} · {played}{in_a_row} · {tournament_points} this tournament"
+    
+    # Show players grouped by line
+    for line in roster.lines:
+        # The labels change after every point, which makes a new widget; carry the selection over
+        # to it, keeping only players still on this line, since the tournament may have changed
+        if f"line_{line}_players" in st.session_state:
+            on_line = {player.name for player in roster.by_line[line]}
+            st.session_state[f"line_{line}_players"] = [
+                player_name for player_name in st.session_state[f"line_{line}_players"] if player_name in on_line
+            ]
+        with st.expander(f"Line: {line}", expanded=True):
+            # Create a multiselect for this line's players, labelled with position and playing time
+            st.multiselect(
+                f"Select players",
+                options=[player.name for player in roster.by_line[line]],
+                format_func=label,
+                key=f"line_{line}_players"
+            )
+    
+    player_selections = _selected_players(roster)
+    
+    # Show counter for selected players
+    st.write(f"**{len(player_selections)}/7** players selected")
+    
+    # Show current selection summary
+    if player_selections:
+        with st.expander("Selected Players", expanded=False):
+            # Create a neat table for selected players
+            st.table(pd.DataFrame([
+                {"Player": p['player_name'], "Line": p['line'], "Position": p['position']}
+                for p in player_selections
+            ]))
+
+
+@st.fragment
+@tracked_fragment
+def _save_point_panel(roster):
+    """
+    Display the point outcome and the save button, and record the point when it is pressed.
+    
+    Args:
+        roster (RosterIndex): The tournament roster.
+    """
+    match_info = st.session_state.match_info
+    
+    # The point number this panel showed when the button was pressed. It is kept across
+    # reruns so a point recorded meanwhile on another device is not overwritten.
+    shown_point_number = st.session_state.get("shown_point_number", match_info["point_number"])
+    st.session_state.shown_point_number = match_info["point_number"]
+    
+    # Point outcome - simple UI
+    st.markdown("### Point Outcome")
+    point_scored = st.radio(
+        "Did your team score?",
+        options=["Yes", "No"],
+        horizontal=True
+    )
+    
+    # Submit button - make it more prominent
+    if not st.button('SAVE POINT', use_container_width=True, type="primary"):
+        return
+    
+    player_selections = _selected_players(roster)
+    selected_count = len(player_selections)
+    
+    if not match_info["opponent"]:
+        st.error("Please enter an opponent name")
+        return
+    
+    if selected_count != 7:
+        st.error(f"Please select exactly 7 players for the point. You selected {selected_count}")
+        return
+    
+    # Claim the point in the shared match state; a repeat of this submission is a no-op
+    point_number = shown_point_number
+    if "point_idempotency_key" not in st.session_state:
+        st.session_state.point_idempotency_key = uuid.uuid4().hex
+    point_key = st.session_state.point_idempotency_key
+    _registered_match(match_info)
+    status, shared = match_registry.record_point(
+        match_info["match_id"], point_number, point_key, point_scored == "Yes"
+    )
+    
+    if status == CONFLICT:
+        st.session_state.shown_point_number = shared["point_number"]
+        _follow_shared_match(shared)
+        st.warning(
+            f"Point {point_number} was already recorded on another device. "
+            f"The score is now {shared['score_for']} - {shared['score_against']}; "
+            f"select the line for point {shared['point_number']}."
+        )
+        return
+    
+    # Prepare data for the matches sheet
+    point_scored_value = "Yes" if point_scored == "Yes" else "No"
+    match_data = []
+    for player in player_selections:
+        match_data.append([
+            match_info["tournament_name"],
+            match_info["date"],
+            match_info["opponent"],
+            point_number,
+            player['player_name'],
+            player['line'],
+            player['position'],
+            point_scored_value,
+            shared["score_for"],
+            shared["score_against"],
+            f"{shared['score_for']}-{shared['score_against']}",
+            match_info["match_id"]
+        ])
+    
+    try:
+        success = status == DUPLICATE or save_match_data(match_data, match_info["match_id"], point_number)
+        if success:
+            st.success(f"✅ Point {point_number} recorded!")
+            # Move on to the next point with a fresh idempotency key
+            del st.session_state.point_idempotency_key
+            _follow_shared_match(shared)
+            # Rerun the whole page so the score card and point number move on
+            st.rerun()
+        else:
+            match_registry.unrecord_point(match_info["match_id"], point_number, point_key)
+            st.error("Failed to save match data")
+    except gspread.exceptions.APIError as e:
+        match_registry.unrecord_point(match_info["match_id"], point_number, point_key)
+        st.error(f"API Error: {e.response.text}")
+    except Exception as e:
+        match_registry.unrecord_point(match_info["match_id"], point_number, point_key)
+        st.error(f"Error: {e}")
+
+
 def record_match_ui():
     """
     Display UI for recording match data, optimized for mobile devices.
+    
+    The page is split into fragments that rerun on their own: the score card, the
+    player selection panel and the save action. Data is loaded once per full rerun,
+    outside the fragments, so picking players never goes back to the backend.
     """
     st.header("Record Match")
     
+    # Make sure points left over from an earlier run keep syncing
+    if get_sheets_sync_backend() is not None:
+        match_journal.start_flusher(sync_match_rows, find_synced_points)
+    
     # Initialize session state for match tracking
     if "match_info" not in st.session_state:
         st.session_state.match_info = {
@@ -87,12 +770,29 @@ def record_match_ui():
             "date": datetime.now().strftime("%Y-%m-%d"),
             "point_number": 1,
             "score_for": 0,
-            "score_against": 0
+            "score_against": 0,
+            "match_id": None
         }
+        # After a reload or a dropped connection, pick the match in the URL back up
+        if st.query_params.get("match"):
+            try:
+                shared = _resume_match(st.query_params["match"])
+            except Exception as e:
+                shared = None
+                st.warning(f"Could not resume the match: {e}")
+            if shared is not None:
+                st.session_state.match_info.update(
+                    tournament_name=shared["tournament_name"],
+                    opponent=shared["opponent"],
+                    date=shared["date"],
+                    match_id=shared["match_id"]
+                )
+                _follow_shared_match(shared)
     
     # Tournament and opponent selection - stacked for mobile
     # Get list of tournaments
     try:
+        load_record_match_data()
         tournaments = get_tournaments()
         # Tournament selection dropdown
         tournament_name = st.selectbox(
@@ -110,10 +810,23 @@ def record_match_ui():
         value=st.session_state.match_info["opponent"] if st.session_state.match_info["opponent"] else ""
     )
     
-    # Update session state with tournament and opponent
+    # Update session state with tournament and opponent; a different opponent is a different match
     if tournament_name != st.session_state.match_info["tournament_name"] or opponent != st.session_state.match_info["opponent"]:
         st.session_state.match_info["tournament_name"] = tournament_name
         st.session_state.match_info["opponent"] = opponent
+        # A match left before its first point, e.g. a half-typed name, is dropped
+        if st.session_state.match_info["match_id"]:
+            match_registry.end_match(st.session_state.match_info["match_id"], if_unplayed=True)
+        st.session_state.match_info["match_id"] = None
+        _reset_point_entry()
+    
+    # Every device recording this match follows one shared score
+    if st.session_state.match_info["opponent"]:
+        try:
+            _join_shared_match()
+        except Exception as e:
+            st.error(f"Error loading match: {e}")
+            return
     
     # Display current match info in a compact card
     st.markdown("""
@@ -131,159 +844,40 @@ def record_match_ui():
     </style>
     """, unsafe_allow_html=True)
     
-    with st.container():
-        st.markdown(f"""
-        <div class="match-info-card">
-            <div class="match-score">{st.session_state.match_info['score_for']} - {st.session_state.match_info['score_against']}</div>
-            <p><b>Point:</b> {st.session_state.match_info['point_number']} | 
-            <b>Date:</b> {st.session_state.match_info['date']}</p>
-        </div>
-        """, unsafe_allow_html=True)
+    _scoreboard_card()
     
     # Get tournament roster
     if st.session_state.match_info["tournament_name"]:
         try:
-            roster_df = get_tournament_roster(st.session_state.match_info["tournament_name"])
-            if roster_df.empty:
-                st.warning(f"No players found for tournament: {st.session_state.match_info['tournament_name']}")
-                return
-            
-            # Form for recording a point
-            with st.form(key='record_point_form'):
-                st.subheader(f"Point {st.session_state.match_info['point_number']}")
-                
-                # Group players by line for better organization
-                st.markdown("### Select exactly 7 players")
-                
-                # Create player selection with line info
-                all_lines = sorted(roster_df['line'].unique())
-                
-                # Track selected players across all lines
-                selected_player_names = []
-                
-                # For storing complete player info when selected
-                player_selections = []
-                
-                # Show players grouped by line
-                for line in all_lines:
-                    with st.expander(f"Line: {line}", expanded=True):
-                        line_players = roster_df[roster_df['line'] == line]
-                        
-                        # Create a multiselect for this line's players
-                        line_player_options = []
-                        line_player_labels = {}
-                        
-                        # Create clear labels with position info
-                        for _, player in line_players.iterrows():
-                            player_name = player.get('player_name', "")
-                            position = player.get('position', "")
-                            display_name = f"{player_name} ({position})"
-                            line_player_options.append(player_name)
-                            line_player_labels[player_name] = display_name
-                        
-                        # Custom format for selectbox options
-                        line_selected_players = st.multiselect(
-                            f"Select players",
-                            options=line_player_options,
-                            format_func=lambda x: line_player_labels[x],
-                            key=f"line_{line}_players"
-                        )
-                        
-                        # Add selected players to our tracking lists
-                        selected_player_names.extend(line_selected_players)
-                        
-                        # Get complete info for selected players
-                        for player_name in line_selected_players:
-                            player_info = line_players[line_players['player_name'] == player_name].iloc[0]
-                            player_selections.append({
-                                'player_name': player_name,
-                                'line': player_info['line'],
-                                'position': player_info['position'],
-                                'selected': True
-                            })
-                
-                # Show counter for selected players
-                selected_count = len(selected_player_names)
-                st.write(f"**{selected_count}/7** players selected")
-                
-                # Point outcome - simple UI
-                st.markdown("### Point Outcome")
-                point_scored = st.radio(
-                    "Did your team score?",
-                    options=["Yes", "No"],
-                    horizontal=True
-                )
-                
-                # Submit button - make it more prominent
-                submit_button = st.form_submit_button(label='SAVE POINT', use_container_width=True)
-            
-            # Show current selection summary outside the form
-            if selected_player_names:
-                with st.expander("Selected Players", expanded=False):
-                    # Create a neat table for selected players
-                    st.table(pd.DataFrame([
-                        {"Player": p['player_name'], "Line": p['line'], "Position": p['position']}
-                        for p in player_selections
-                    ]))
-            
-            # Process form submission
-            if submit_button:
-                selected_count = len(selected_player_names)
-                
-                if not st.session_state.match_info["opponent"]:
-                    st.error("Please enter an opponent name")
-                    return
-                
-                if selected_count != 7:
-                    st.error(f"Please select exactly 7 players for the point. You selected {selected_count}")
-                    return
-                
-                # Update scores
-                if point_scored == "Yes":
-                    st.session_state.match_info["score_for"] += 1
-                    point_scored_value = "Yes"
-                else:
-                    st.session_state.match_info["score_against"] += 1
-                    point_scored_value = "No"
-                
-                # Prepare data for the matches sheet
-                match_data = []
-                for player in player_selections:
-                    match_data.append([
-                        st.session_state.match_info["tournament_name"],
-                        st.session_state.match_info["date"],
-                        st.session_state.match_info["opponent"],
-                        st.session_state.match_info["point_number"],
-                        player['player_name'],
-                        player['line'],
-                        player['position'],
-                        point_scored_value,
-                        st.session_state.match_info["score_for"],
-                        st.session_state.match_info["score_against"],
-                        f"{st.session_state.match_info['score_for']}-{st.session_state.match_info['score_against']}"
-                    ])
-                
-                try:
-                    success = save_match_data(match_data)
-                    if success:
-                        st.success(f"✅ Point {st.session_state.match_info['point_number']} recorded!")
-                        # Increment point number for next point
-                        st.session_state.match_info["point_number"] += 1
-                        # Force rerun to update the UI
-                        st.rerun()
-                    else:
-                        st.error("Failed to save match data")
-                except gspread.exceptions.APIError as e:
-                    st.error(f"API Error: {e.response.text}")
-                except Exception as e:
-                    st.error(f"Error: {e}")
-                
+            roster = get_tournament_roster_index(st.session_state.match_info["tournament_name"])
         except Exception as e:
             st.error(f"Error loading tournament roster: {e}")
             return
+        if not roster.players:
+            st.warning(f"No players found for tournament: {st.session_state.match_info['tournament_name']}")
+            return
+        
+        try:
+            start_playing_time(st.session_state.match_info)
+        except Exception as e:
+            st.warning(f"Playing time only counts points recorded from now on ({e})")
+        if playing_time.load_error is not None:
+            st.warning(f"Playing time only counts points recorded from now on ({playing_time.load_error})")
+        elif not playing_time.loaded:
+            st.caption("Counting tournament playing time from earlier matches...")
+        
+        st.subheader(f"Point {st.session_state.match_info['point_number']}")
+        _selection_panel(roster)
+        _save_point_panel(roster)
+        
+        if st.session_state.match_info["match_id"]:
+            _fix_points_panel()
     
     # Option to start a new match - make button full width
     if st.button("Start New Match", use_container_width=True):
+        # The previous match is over, so it leaves the live scoreboard
+        if st.session_state.match_info["match_id"]:
+            match_registry.end_match(st.session_state.match_info["match_id"])
         # Reset match info except for tournament name and opponent
         st.session_state.match_info = {
             "tournament_name": st.session_state.match_info["tournament_name"],
@@ -291,7 +885,16 @@ def record_match_ui():
             "date": datetime.now().strftime("%Y-%m-%d"),
             "point_number": 1,
             "score_for": 0,
-            "score_against": 0
+            "score_against": 0,
+            "match_id": None
         }
+        _reset_point_entry()
+        # A rematch gets its own id, so it is never confused with the game just played
+        if st.session_state.match_info["opponent"]:
+            match_info = st.session_state.match_info
+            shared = match_registry.ensure(
+                new_match_id(), match_info["tournament_name"], match_info["date"], match_info["opponent"]
+            )
+            match_info["match_id"] = shared["match_id"]
         st.success("Started new match")
         st.rerun()
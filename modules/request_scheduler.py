@@ -0,0 +1,231 @@
+import logging
+import random
+import threading
+import time
+
+import gspread
+import requests
+import streamlit as st
+from gspread.exceptions import APIError
+from modules.instrumentation import record_request
+
+DEFAULT_READS_PER_MINUTE = 60
+DEFAULT_WRITES_PER_MINUTE = 60
+
+# Status codes worth retrying: timeouts, rate limits and server errors
+RETRY_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+# Status code of a request refused for quota, which is known not to have been applied
+RATE_LIMITED = 429
+
+# Endpoints of POST requests that set values and can be sent twice with the same result
+IDEMPOTENT_POST_SUFFIXES = ('/values:batchUpdate', '/values:batchClear', ':clear')
+
+logger = logging.getLogger(__name__)
+
+
+class SheetsUnavailableError(Exception):
+    """
+    Raised when Google Sheets keeps rejecting a request after every retry.
+    """
+
+
+class TokenBucket:
+    """
+    A thread-safe token bucket that allows a fixed number of requests per minute.
+    """
+
+    def __init__(self, per_minute):
+        self.capacity = per_minute
+        self.tokens = float(per_minute)
+        self.refill_per_second = per_minute / 60
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, max_wait):
+        """
+        Take a token, waiting for one to become available if the bucket is empty.
+
+        Args:
+            max_wait (float): Longest time to wait, in seconds.
+
+        Returns:
+            bool: True if a token was taken, False if none became available in time.
+        """
+        deadline = time.monotonic() + max_wait
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.refill_per_second)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait = (1 - self.tokens) / self.refill_per_second
+            if now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class _InFlight:
+    """
+    A request that other callers with the same key can wait on.
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class RequestScheduler:
+    """
+    Central gate for every Google Sheets request.
+
+    Reads and writes draw from separate per-minute token buckets. Requests rejected with
+    a rate limit are retried with jittered exponential backoff. Server errors, timeouts and
+    dropped connections are only retried for requests that can safely be applied twice,
+    since a write may have been applied before it failed; other writes are left for the
+    caller to check and retry. Identical reads issued at the same time from different
+    sessions share one request.
+    """
+
+    def __init__(self, reads_per_minute=DEFAULT_READS_PER_MINUTE, writes_per_minute=DEFAULT_WRITES_PER_MINUTE,
+                 max_retries=5, base_delay=1.0, max_delay=32.0, max_queue_wait=60.0):
+        self.buckets = {'read': TokenBucket(reads_per_minute), 'write': TokenBucket(writes_per_minute)}
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_queue_wait = max_queue_wait
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def _backoff(self, attempt):
+        """
+        Get the delay before a retry, with full jitter.
+
+        Args:
+            attempt (int): The number of the failed attempt, starting at 0.
+
+        Returns:
+            float: Seconds to wait.
+        """
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def _execute(self, kind, fn, idempotent):
+        """
+        Run a request under the quota, retrying transient failures.
+
+        Args:
+            kind (str): 'read' or 'write'.
+            fn (callable): Function with no arguments that performs the request.
+            idempotent (bool): Whether sending the request twice has the same effect as once.
+
+        Returns:
+            The result of fn.
+        """
+        started = time.perf_counter()
+        result = None
+        ok = False
+        attempt = 0
+        try:
+            for attempt in range(self.max_retries + 1):
+                if not self.buckets[kind].acquire(self.max_queue_wait):
+                    raise SheetsUnavailableError(
+                        f"Too many Google Sheets {kind}s queued; please try again in a minute"
+                    )
+                try:
+                    result = fn()
+                    ok = True
+                    return result
+                except APIError as e:
+                    # Only a rate limit is known not to have been applied
+                    retryable = e.code == RATE_LIMITED or (idempotent and e.code in RETRY_STATUS_CODES)
+                    if not retryable or attempt == self.max_retries:
+                        if retryable:
+                            raise SheetsUnavailableError(
+                                "Google Sheets is busy or over its quota; please try again in a minute"
+                            ) from e
+                        raise
+                    error = e
+                except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                    if not idempotent or attempt == self.max_retries:
+                        raise SheetsUnavailableError("Could not reach Google Sheets; check the connection") from e
+                    error = e
+                delay = self._backoff(attempt)
+                logger.warning("Google Sheets %s failed (%s), retrying in %.1fs", kind, error, delay)
+                time.sleep(delay)
+        finally:
+            record_request(kind, time.perf_counter() - started, ok, attempt, result)
+
+    def call(self, kind, fn, coalesce_key=None, idempotent=None):
+        """
+        Run a Google Sheets request through the scheduler.
+
+        Args:
+            kind (str): 'read' or 'write'.
+            fn (callable): Function with no arguments that performs the request.
+            coalesce_key (hashable): For reads, requests with the same key that are already
+                in flight are shared instead of sent again.
+            idempotent (bool): Whether the request can be sent twice with the same effect,
+                such as overwriting fixed cells. Defaults to True for reads and False for
+                writes, which are then only retried after a rate limit.
+
+        Returns:
+            The result of fn.
+        """
+        if idempotent is None:
+            idempotent = kind == 'read'
+        if coalesce_key is None:
+            return self._execute(kind, fn, idempotent)
+
+        with self._lock:
+            in_flight = self._in_flight.get(coalesce_key)
+            leader = in_flight is None
+            if leader:
+                in_flight = self._in_flight[coalesce_key] = _InFlight()
+
+        if not leader:
+            started = time.perf_counter()
+            in_flight.done.wait()
+            record_request(kind, time.perf_counter() - started, in_flight.error is None, shared=True)
+            if in_flight.error is not None:
+                raise in_flight.error
+            return in_flight.result
+
+        try:
+            in_flight.result = self._execute(kind, fn, idempotent)
+            return in_flight.result
+        except Exception as e:
+            in_flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[coalesce_key]
+            in_flight.done.set()
+
+
+class ScheduledHTTPClient(gspread.HTTPClient):
+    """
+    gspread HTTP client that sends every request through the process-wide scheduler.
+    """
+
+    def request(self, method, endpoint, params=None, data=None, json=None, files=None, headers=None):
+        def send():
+            return super(ScheduledHTTPClient, self).request(
+                method, endpoint, params=params, data=data, json=json, files=files, headers=headers
+            )
+
+        if method.upper() == 'GET':
+            # Identical reads from different sessions share one request
+            return scheduler.call('read', send, coalesce_key=(id(self.session), endpoint, repr(params)))
+        # Setting cell values can be repeated; appends, inserts and deletes cannot
+        idempotent = method.upper() == 'PUT' or endpoint.endswith(IDEMPOTENT_POST_SUFFIXES)
+        return scheduler.call('write', send, idempotent=idempotent)
+
+
+# Process-wide scheduler shared by every Streamlit session
+scheduler = RequestScheduler(
+    reads_per_minute=st.secrets.get("SHEETS_READS_PER_MINUTE", DEFAULT_READS_PER_MINUTE),
+    writes_per_minute=st.secrets.get("SHEETS_WRITES_PER_MINUTE", DEFAULT_WRITES_PER_MINUTE),
+)
@@ -0,0 +1,165 @@
+import csv
+import io
+from collections import namedtuple
+
+import streamlit as st
+from modules.storage import get_backend
+from modules.sheet_cache import sheet_cache
+from modules.instrumentation import track_backend_call
+
+# Rows written per request. Every chunk is one append, so an import of a few hundred
+# players uses a handful of the per-minute write quota, and each request stays small.
+IMPORT_CHUNK_ROWS = 250
+
+LINES = ("O", "D")
+POSITIONS = ("Handler", "Cutter", "Hybrid")
+
+# Worksheet names, also used to key the shared cache
+tournament_tab_name = st.secrets["TOURNAMENT_TAB_NAME"]
+tournament_roster_tab_name = st.secrets["TOURNAMENT_ROSTER_TAB_NAME"]
+
+# What an import would write. rows are [tournament_name, player_name, line, position]
+# rows that are not on a roster yet; skipped counts rows that are; errors lists problems
+# that stop the import.
+ImportPlan = namedtuple('ImportPlan', ['new_tournaments', 'rows', 'skipped', 'errors'])
+
+
+def read_import_csv(data):
+    """
+    Read the rows of a roster CSV.
+
+    The header must have tournament_name and player_name columns and may have line and
+    position columns. Header names are matched ignoring case and spaces.
+
+    Args:
+        data (bytes): The contents of the CSV file.
+
+    Returns:
+        list: List of (line number, record) tuples, with records keyed by column name.
+
+    Raises:
+        ValueError: If the file is not UTF-8 or a required column is missing.
+    """
+    try:
+        text = data.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        raise ValueError("The file is not a UTF-8 CSV file")
+
+    reader = csv.reader(io.StringIO(text))
+    header = [column.strip().lower().replace(' ', '_') for column in next(reader, [])]
+    missing = [column for column in ('tournament_name', 'player_name') if column not in header]
+    if missing:
+        raise ValueError(f"Missing column: {', '.join(missing)}")
+
+    return [
+        (line_number, {column: value.strip() for column, value in zip(header, row)})
+        for line_number, row in enumerate(reader, start=2)
+        if any(value.strip() for value in row)
+    ]
+
+
+def plan_import(records, roster, tables):
+    """
+    Validate roster rows against the club roster and drop the ones already on a tournament roster.
+
+    A blank line or position is taken from the club roster. The existing tournament rosters
+    are indexed once by (tournament, player), so checking each row is a dictionary lookup.
+
+    Args:
+        records (list): (line number, record) tuples from read_import_csv.
+        roster (RosterIndex): The club roster.
+        tables (Tables): The tournament names and tournament rosters, see StorageBackend.load_tables.
+
+    Returns:
+        ImportPlan: The rows to write, the tournaments to add and any errors.
+    """
+    existing = {
+        (tournament_name, player.name)
+        for tournament_name, players in tables.tournament_rosters.items()
+        for player in players
+    }
+    known_tournaments = set(tables.tournaments)
+
+    new_tournaments = []
+    rows = []
+    seen = {}
+    skipped = 0
+    errors = []
+    for line_number, record in records:
+        tournament_name = record.get('tournament_name', '')
+        player_name = record.get('player_name', '')
+        if not tournament_name or not player_name:
+            errors.append(f"Row {line_number}: tournament_name and player_name are required")
+            continue
+        if player_name not in roster.by_name:
+            errors.append(f"Row {line_number}: '{player_name}' is not on the club roster")
+            continue
+
+        roster_line, roster_position = roster.by_name[player_name]
+        line = record.get('line') or roster_line
+        position = record.get('position') or roster_position
+        if not line or not position:
+            errors.append(f"Row {line_number}: line and position are required, the club roster has none for '{player_name}'")
+            continue
+        if line not in LINES:
+            errors.append(f"Row {line_number}: line must be one of {', '.join(LINES)}, not '{line}'")
+            continue
+        if position not in POSITIONS:
+            errors.append(f"Row {line_number}: position must be one of {', '.join(POSITIONS)}, not '{position}'")
+            continue
+
+        key = (tournament_name, player_name)
+        if key in seen:
+            if seen[key] != (line, position):
+                errors.append(f"Row {line_number}: '{player_name}' is listed twice for '{tournament_name}'")
+            else:
+                skipped += 1
+            continue
+        seen[key] = (line, position)
+
+        if key in existing:
+            skipped += 1
+            continue
+        if tournament_name not in known_tournaments:
+            known_tournaments.add(tournament_name)
+            new_tournaments.append(tournament_name)
+        rows.append([tournament_name, player_name, line, position])
+
+    return ImportPlan(new_tournaments, rows, skipped, errors)
+
+
+def run_import(plan, progress=None, chunk_rows=IMPORT_CHUNK_ROWS):
+    """
+    Add the tournaments and write the roster rows of an import plan, a chunk at a time.
+
+    Each chunk is a single request and is complete once it returns. If the import stops
+    part way, planning it again from fresh rosters skips the rows already written, so
+    running it again resumes where it stopped.
+
+    Args:
+        plan (ImportPlan): The plan from plan_import.
+        progress (callable): Called with the number of rows written so far after each chunk.
+        chunk_rows (int): Number of rows written per request.
+
+    Returns:
+        int: Number of rows written.
+    """
+    backend = get_backend()
+    for tournament_name in plan.new_tournaments:
+        with track_backend_call('add_tournament', tournament_tab_name, rows=1):
+            added = backend.add_tournament(tournament_name, [])
+        if added:
+            sheet_cache.patch((tournament_tab_name,), lambda names, name=tournament_name: names + [name])
+
+    written = 0
+    for start in range(0, len(plan.rows), chunk_rows):
+        chunk = plan.rows[start:start + chunk_rows]
+        with track_backend_call('append_tournament_roster_rows', tournament_roster_tab_name, rows=len(chunk)):
+            backend.append_tournament_roster_rows(chunk)
+        # The Record Match page loads these rosters again on next use
+        for tournament_name in {row[0] for row in chunk}:
+            sheet_cache.invalidate((tournament_roster_tab_name, tournament_name))
+        written += len(chunk)
+        if progress:
+            progress(written)
+    return written
@@ -0,0 +1,69 @@
+from collections import namedtuple
+from types import MappingProxyType
+
+Player = namedtuple('Player', ['name', 'line', 'position'])
+
+
+class RosterIndex:
+    """
+    An immutable lookup structure over a roster, built once per roster load.
+
+    Attributes:
+        players (tuple): Every Player in roster order.
+        lines (tuple): The sorted line names.
+        by_line (Mapping): Line name -> tuple of the Players on that line.
+        by_name (Mapping): Player name -> (line, position).
+    """
+
+    __slots__ = ('players', 'lines', 'by_line', 'by_name')
+
+    def __init__(self, players):
+        by_line = {}
+        for player in players:
+            by_line.setdefault(player.line, []).append(player)
+
+        object.__setattr__(self, 'players', tuple(players))
+        object.__setattr__(self, 'lines', tuple(sorted(by_line)))
+        object.__setattr__(self, 'by_line', MappingProxyType({line: tuple(p) for line, p in by_line.items()}))
+        object.__setattr__(self, 'by_name', MappingProxyType({p.name: (p.line, p.position) for p in players}))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("RosterIndex is immutable")
+
+    def __len__(self):
+        return len(self.players)
+
+    def label(self, player_name):
+        """
+        Get the display label for a player.
+
+        Args:
+            player_name (str): The name of the player.
+
+        Returns:
+            str: The player name with their position, e.g. "Sam (Handler)".
+        """
+        position = self.by_name.get(player_name, ('', ''))[1]
+        return f"{player_name} ({position})" if position else player_name
+
+    def records(self):
+        """
+        Get the roster as a list of dictionaries.
+
+        Returns:
+            list: List of dictionaries with player_name, line and position keys.
+        """
+        return [{'player_name': p.name, 'line': p.line, 'position': p.position} for p in self.players]
+
+
+def build_roster_index(players):
+    """
+    Build a roster index from roster records.
+
+    Args:
+        players (list): List of Player records, as returned by the storage backends.
+
+    Returns:
+        RosterIndex: The roster index.
+    """
+    return RosterIndex(list(players))
@@ -0,0 +1,81 @@
+import time
+
+import streamlit as st
+from modules.instrumentation import tracked_fragment
+from modules.match_state import match_registry
+
+# How often spectators' scoreboards refresh, in seconds
+SCOREBOARD_REFRESH_SECONDS = 10
+
+# Matches without a new point for this long drop off the scoreboard, in seconds
+LIVE_WINDOW_SECONDS = 6 * 60 * 60
+
+
+def get_live_matches(match_id=None):
+    """
+    Get the matches recorded recently, from the shared match registry.
+
+    Every spectator reads the same in-memory snapshot that the coaches' devices update
+    as they record points, so viewers never cause a read from storage. A match only
+    shows once its first point is recorded, so typing an opponent's name does not put
+    an empty game on the board.
+
+    Args:
+        match_id (str): Only return this match, if given.
+
+    Returns:
+        list: List of match snapshots, most recently updated first. See MatchState.snapshot.
+    """
+    cutoff = time.time() - LIVE_WINDOW_SECONDS
+    return [
+        match for match in match_registry.active_matches()
+        if match["point_number"] > 1 and match["updated_at"] >= cutoff and match_id in (None, match["match_id"])
+    ]
+
+
+def _minutes_ago(timestamp):
+    """
+    Describe how long ago something happened.
+
+    Args:
+        timestamp (float): The time, in seconds since the epoch.
+
+    Returns:
+        str: e.g. "just now" or "5 min ago".
+    """
+    minutes = int((time.time() - timestamp) // 60)
+    return "just now" if minutes < 1 else f"{minutes} min ago"
+
+
+@st.fragment(run_every=SCOREBOARD_REFRESH_SECONDS)
+@tracked_fragment
+def _live_scores(match_id):
+    """
+    Display a card per live match, refreshing on its own.
+
+    Args:
+        match_id (str): Only show this match, if given.
+    """
+    matches = get_live_matches(match_id)
+    if not matches:
+        st.info("No matches in progress right now. This page updates by itself.")
+        return
+
+    for match in matches:
+        with st.container(border=True):
+            st.markdown(f"**{match['tournament_name']}** vs **{match['opponent']}**")
+            st.metric("Score", f"{match['score_for']} - {match['score_against']}")
+            st.caption(
+                f"Point {match['point_number']} next | {match['date']} | "
+                f"updated {_minutes_ago(match['updated_at'])}"
+            )
+
+
+def scoreboard_ui():
+    """
+    Display the read-only live scoreboard. It needs no login, so parents and teammates can follow games.
+
+    Open it with ?view=scoreboard, or ?view=scoreboard&match=<match id> for a single match.
+    """
+    st.header("Live Scores")
+    _live_scores(st.query_params.get("match") if st.query_params.get("view") == "scoreboard" else None)
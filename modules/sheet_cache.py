@@ -0,0 +1,140 @@
+import threading
+import time
+from collections import OrderedDict
+
+import streamlit as st
+from modules.instrumentation import record_cache_lookup
+
+DEFAULT_TTL_SECONDS = 300
+DEFAULT_MAX_ENTRIES = 256
+
+
+class TTLCache:
+    """
+    A small thread-safe cache with a time-to-live and a bound on the number of entries.
+
+    Keys are tuples whose first element is the worksheet the data came from, so that
+    every entry for a worksheet can be invalidated at once. When the cache is full the
+    least recently used entry is evicted.
+    """
+
+    def __init__(self, ttl_seconds=DEFAULT_TTL_SECONDS, max_entries=DEFAULT_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get_fresh(self, key):
+        """
+        Return the cached value for key if it has not expired (caller holds the lock).
+
+        Args:
+            key (tuple): The cache key.
+
+        Returns:
+            tuple: (True, value) on a hit, (False, None) on a miss.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return False, None
+        self._entries.move_to_end(key)
+        return True, value
+
+    def _store(self, key, value):
+        """
+        Store a value and evict the oldest entries past the size bound (caller holds the lock).
+
+        Args:
+            key (tuple): The cache key.
+            value: The value to cache.
+        """
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get_or_load(self, key, loader):
+        """
+        Get a cached value, calling loader to fill the cache on a miss.
+
+        Args:
+            key (tuple): The cache key, starting with the worksheet name.
+            loader (callable): Function with no arguments that loads the value.
+
+        Returns:
+            The cached or freshly loaded value.
+        """
+        with self._lock:
+            hit, value = self._get_fresh(key)
+        record_cache_lookup(hit)
+        if hit:
+            return value
+        value = loader()
+        with self._lock:
+            self._store(key, value)
+        return value
+
+    def set(self, key, value):
+        """
+        Store a value directly, e.g. after a write made by this process.
+
+        Args:
+            key (tuple): The cache key.
+            value: The value to cache.
+        """
+        with self._lock:
+            self._store(key, value)
+
+    def patch(self, key, update):
+        """
+        Update a cached value in place of reloading it.
+
+        Nothing happens if the key is not cached, so the next read loads fresh data.
+
+        Args:
+            key (tuple): The cache key.
+            update (callable): Function taking the cached value and returning the new value.
+        """
+        with self._lock:
+            hit, value = self._get_fresh(key)
+            if hit:
+                self._store(key, update(value))
+
+    def invalidate(self, key):
+        """
+        Drop a single cached entry.
+
+        Args:
+            key (tuple): The cache key.
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def invalidate_worksheet(self, worksheet_name):
+        """
+        Drop every cached entry that was read from a worksheet.
+
+        Args:
+            worksheet_name (str): The name of the worksheet.
+        """
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == worksheet_name]:
+                del self._entries[key]
+
+    def clear(self):
+        """
+        Drop every cached entry.
+        """
+        with self._lock:
+            self._entries.clear()
+
+
+# Process-wide cache shared by every Streamlit session
+sheet_cache = TTLCache(
+    ttl_seconds=st.secrets.get("CACHE_TTL_SECONDS", DEFAULT_TTL_SECONDS),
+    max_entries=st.secrets.get("CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES),
+)
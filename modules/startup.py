@@ -0,0 +1,97 @@
+import importlib
+import logging
+import sys
+import threading
+import time
+
+import streamlit as st
+
+# The module and UI function behind each page. Page modules pull in pandas, gspread and
+# the backend singletons, so they are only imported when a page is first shown.
+PAGE_MODULES = {
+    "Add Tournament": ("modules.add_tournament", "add_tournament_ui"),
+    "Record Match": ("modules.record_match", "record_match_ui"),
+    "Stats": ("modules.stats", "stats_ui"),
+    "Scoreboard": ("modules.scoreboard", "scoreboard_ui"),
+}
+
+logger = logging.getLogger(__name__)
+
+# Seconds spent importing each page module in this process
+import_seconds = {}
+
+_prewarm_lock = threading.Lock()
+_prewarm_thread = None
+
+
+def load_page(page):
+    """
+    Get the UI function of a page, importing its module on first use.
+
+    Args:
+        page (str): The page name, a key of PAGE_MODULES.
+
+    Returns:
+        callable: The function that renders the page.
+    """
+    module_name, ui_name = PAGE_MODULES[page]
+    already_imported = module_name in sys.modules
+    started = time.perf_counter()
+    # import_module waits for an import still running in the prewarm thread
+    module = importlib.import_module(module_name)
+    if not already_imported:
+        import_seconds.setdefault(module_name, time.perf_counter() - started)
+    return getattr(module, ui_name)
+
+
+def _prewarm():
+    """
+    Import every page, load the Record Match data into the shared cache and count playing time.
+    """
+    started = time.perf_counter()
+    try:
+        for page in PAGE_MODULES:
+            load_page(page)
+        from modules.record_match import load_record_match_data, load_playing_time
+        load_record_match_data()
+        load_playing_time()
+        logger.info("Prewarm finished in %.2fs", time.perf_counter() - started)
+    except Exception as e:
+        logger.warning("Prewarm failed (%s); pages will load on first use", e)
+
+
+def prewarm():
+    """
+    Start loading the pages and their data in a background thread, once per process.
+
+    Runs after login so the first page a coach opens does not pay for the imports, the
+    Google login and the first Sheets read. Disabled by setting PREWARM = false in st.secrets.
+    """
+    global _prewarm_thread
+    if not st.secrets.get("PREWARM", True):
+        return
+    with _prewarm_lock:
+        if _prewarm_thread is not None:
+            return
+        _prewarm_thread = threading.Thread(target=_prewarm, name="prewarm", daemon=True)
+        _prewarm_thread.start()
+
+
+def report_startup_timing(run_started):
+    """
+    Show how long this script run and the page imports took, if STARTUP_TIMING is enabled in st.secrets.
+
+    Args:
+        run_started (float): time.perf_counter() at the start of the script run.
+    """
+    if not st.secrets.get("STARTUP_TIMING", False):
+        return
+    run_seconds = time.perf_counter() - run_started
+    logger.info(
+        "Script run took %.3fs; page imports: %s", run_seconds,
+        ", ".join(f"{name} {seconds:.3f}s" for name, seconds in import_seconds.items()) or "none"
+    )
+    with st.sidebar:
+        st.caption(f"Script run: {run_seconds * 1000:.0f} ms")
+        for name, seconds in import_seconds.items():
+            st.caption(f"Import {name}: {seconds * 1000:.0f} ms")
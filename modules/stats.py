@@ -0,0 +1,214 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+from modules.storage import get_backend
+from modules.match_format import MATCH_COLUMNS, row_match_id
+from modules.sheet_cache import sheet_cache
+
+# Worksheet name, also used to key the shared cache
+matches_tab_name = st.secrets["MATCHES_TAB_NAME"]
+
+MATCH_KEY = ['tournament_name', 'date', 'opponent', 'match_id']
+POINT_KEY = MATCH_KEY + ['point_number']
+
+
+def build_match_frame(rows):
+    """
+    Build a columnar DataFrame from wide match rows.
+
+    Args:
+        rows (list): List of lists in MATCH_COLUMNS order.
+
+    Returns:
+        pandas.DataFrame: One row per player per point, with categorical text columns,
+        integer point numbers and a boolean 'scored' column.
+    """
+    df = pd.DataFrame(rows, columns=MATCH_COLUMNS)
+    df['match_id'] = [row_match_id(row) for row in rows]
+    for column in ['tournament_name', 'date', 'opponent', 'player_name', 'line', 'position', 'match_id']:
+        df[column] = df[column].astype(str).astype('category')
+    for column in ['point_number', 'score_for', 'score_against']:
+        df[column] = pd.to_numeric(df[column], errors='coerce').fillna(0).astype(np.int32)
+    df['scored'] = df['point_scored'].astype(str).str.lower().eq('yes')
+    return df
+
+
+def load_match_frame():
+    """
+    Load every match row into a columnar DataFrame.
+
+    The frame is built once and served from the shared cache until a point is saved.
+
+    Returns:
+        pandas.DataFrame: See build_match_frame.
+    """
+    return sheet_cache.get_or_load((matches_tab_name, 'frame'), lambda: build_match_frame(get_backend().get_match_rows()))
+
+
+def point_frame(df):
+    """
+    Reduce match rows to one row per point and work out whether each point was played on offence.
+
+    A team receives the pull after being scored on, so a point is an O point when the
+    previous point of the match was lost and a D point when it was won. The first point
+    of a match has no previous point, so it counts as an O point when most of the players
+    on the field are from the O line.
+
+    Args:
+        df (pandas.DataFrame): Match rows from build_match_frame.
+
+    Returns:
+        pandas.DataFrame: One row per point with POINT_KEY columns, 'point_id', 'scored' and 'is_o'.
+    """
+    if df.empty:
+        return pd.DataFrame(columns=POINT_KEY + ['point_id', 'scored', 'is_o'])
+
+    points = (
+        df.assign(o_share=df['line'].astype(str).eq('O'))
+        .groupby(POINT_KEY, observed=True, sort=True)
+        .agg(scored=('scored', 'first'), o_share=('o_share', 'mean'))
+        .reset_index()
+    )
+    previous_scored = points.groupby(MATCH_KEY, observed=True)['scored'].shift(1)
+    points['is_o'] = np.where(previous_scored.isna(), points['o_share'] >= 0.5, previous_scored.eq(False))
+    points['point_id'] = np.arange(len(points), dtype=np.int32)
+    return points.drop(columns='o_share')
+
+
+def _with_point_ids(df, points):
+    """
+    Attach the point id, outcome and O/D flag of each point to its player rows.
+
+    Args:
+        df (pandas.DataFrame): Match rows from build_match_frame.
+        points (pandas.DataFrame): Points from point_frame.
+
+    Returns:
+        pandas.DataFrame: The player rows with 'point_id', 'scored' and 'is_o' columns.
+    """
+    return df.drop(columns='scored').merge(points, on=POINT_KEY, how='inner')
+
+
+def player_stats(df, points):
+    """
+    Compute per-player plus/minus, points played and O hold / D break percentages.
+
+    Args:
+        df (pandas.DataFrame): Match rows from build_match_frame.
+        points (pandas.DataFrame): Points from point_frame.
+
+    Returns:
+        pandas.DataFrame: One row per player, best plus/minus first.
+    """
+    rows = _with_point_ids(df, points)
+    scored = rows['scored'].to_numpy()
+    is_o = rows['is_o'].to_numpy(dtype=bool)
+    rows = rows.assign(
+        plus_minus=np.where(scored, 1, -1),
+        o_points=is_o,
+        holds=is_o & scored,
+        d_points=~is_o,
+        breaks=~is_o & scored,
+    )
+    stats = rows.groupby('player_name', observed=True).agg(
+        points_played=('point_id', 'size'),
+        plus_minus=('plus_minus', 'sum'),
+        o_points=('o_points', 'sum'),
+        holds=('holds', 'sum'),
+        d_points=('d_points', 'sum'),
+        breaks=('breaks', 'sum'),
+    )
+    stats['o_hold_pct'] = (stats['holds'] / stats['o_points'].replace(0, np.nan) * 100).round(1)
+    stats['d_break_pct'] = (stats['breaks'] / stats['d_points'].replace(0, np.nan) * 100).round(1)
+    return stats.sort_values(['plus_minus', 'points_played'], ascending=False).reset_index()
+
+
+def line_stats(df, points, min_points=2):
+    """
+    Compute how each 7-player combination performed.
+
+    Args:
+        df (pandas.DataFrame): Match rows from build_match_frame.
+        points (pandas.DataFrame): Points from point_frame.
+        min_points (int): Leave out combinations that played fewer points than this.
+
+    Returns:
+        pandas.DataFrame: One row per combination, most efficient first.
+    """
+    rows = _with_point_ids(df, points)
+    rows['player_name'] = rows['player_name'].astype(str)
+    combos = (
+        rows.sort_values(['point_id', 'player_name'])
+        .groupby('point_id', sort=False)['player_name']
+        .agg(', '.join)
+        .rename('players')
+    )
+    lines = points.set_index('point_id')[['scored', 'is_o']].join(combos, how='inner')
+    lines['scored'] = lines['scored'].astype(np.int32)
+    stats = lines.groupby('players').agg(
+        points_played=('scored', 'size'),
+        scored=('scored', 'sum'),
+        o_points=('is_o', 'sum'),
+    )
+    stats = stats[stats['points_played'] >= min_points]
+    stats['plus_minus'] = stats['scored'] * 2 - stats['points_played']
+    stats['efficiency_pct'] = (stats['scored'] / stats['points_played'] * 100).round(1)
+    return stats.sort_values(['efficiency_pct', 'points_played'], ascending=False).reset_index()
+
+
+def stats_ui():
+    """
+    Display player and line statistics computed from the recorded matches.
+    """
+    st.header("Stats")
+
+    # Pick up points recorded on other devices; only new rows are fetched
+    if st.button("Refresh"):
+        sheet_cache.invalidate((matches_tab_name, 'frame'))
+
+    try:
+        df = load_match_frame()
+    except Exception as e:
+        st.error(f"Error loading matches: {e}")
+        return
+
+    if df.empty:
+        st.info("No points have been recorded yet")
+        return
+
+    tournaments = sorted(df['tournament_name'].cat.categories)
+    tournament_name = st.selectbox("Tournament", ["All tournaments"] + tournaments)
+    if tournament_name != "All tournaments":
+        df = df[df['tournament_name'] == tournament_name]
+
+    points = point_frame(df)
+    o_points = points['is_o'].to_numpy(dtype=bool)
+    scored = points['scored'].to_numpy(dtype=bool)
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Points", len(points))
+    col2.metric("O-line hold %", f"{scored[o_points].mean() * 100:.0f}%" if o_points.any() else "-")
+    col3.metric("D-line break %", f"{scored[~o_points].mean() * 100:.0f}%" if (~o_points).any() else "-")
+
+    st.subheader("Players")
+    st.dataframe(player_stats(df, points), hide_index=True, use_container_width=True)
+
+    st.subheader("Lines")
+    min_points = st.number_input("Minimum points together", min_value=1, value=2, step=1)
+    st.dataframe(line_stats(df, points, min_points), hide_index=True, use_container_width=True)
+
+    st.subheader("Export")
+    st.caption("Save every point to Parquet files, one per tournament, for analysis outside the app.")
+    if st.button("Export to Parquet"):
+        # Imported here so pyarrow is only loaded when an export runs
+        from modules.export_matches import export_matches, export_archive, export_dir
+        try:
+            with st.spinner("Exporting matches..."):
+                result = export_matches()
+        except Exception as e:
+            st.error(f"Error exporting matches: {e}")
+            return
+        st.success(f"Exported {result.points} new points ({result.rows} rows) to {export_dir}")
+        st.download_button(
+            "Download export", export_archive(), file_name="bwu_clipboard_export.zip", mime="application/zip"
+        )
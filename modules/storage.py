@@ -0,0 +1,1137 @@
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from collections import namedtuple
+
+import streamlit as st
+
+from gspread.utils import ValueRenderOption, a1_range_to_grid_range, absolute_range_name, rowcol_to_a1
+
+from modules.column_reader import ColumnReader
+from modules.google_sheets_connection import connect_to_google_sheets, get_spreadsheet
+from modules.match_reader import IncrementalMatchReader, match_rows_from_sheet, read_chunks, read_tail
+from modules.match_format import (
+    MATCH_COLUMNS, MATCH_INDEX_COLUMNS, POINT_COLUMNS, NormalizedMatches, normalize_match_rows,
+    denormalize_match_rows, make_match_id, make_point_id, match_progress, row_match_id
+)
+from modules.roster_index import Player
+
+DEFAULT_SQLITE_PATH = "bwu_clipboard.sqlite3"
+
+# Match rows read per request when the whole history is streamed, e.g. for an export
+MATCH_CHUNK_ROWS = 2000
+
+# Most recent match rows searched when resuming a match, about 30 points of 7 players
+RESUME_TAIL_ROWS = 210
+
+# Result of StorageBackend.get_last_point when a match is not among the most recent rows
+NOT_IN_TAIL = 'not_in_tail'
+
+# Error of the Sheets backend's point editing methods, which would have to search the matches tab
+JOURNALED_POINTS_MESSAGE = "Points in Google Sheets are changed through the match journal, which knows their rows"
+
+# Columns of the wide matches tab that say where a match stood after each point
+PROGRESS_COLUMNS = ['tournament_name', 'date', 'opponent', 'point_number', 'score_for', 'score_against', 'match_id']
+
+# Column layout of the tournament_rosters tab
+TOURNAMENT_ROSTER_COLUMNS = ['tournament_name', 'player_name', 'line', 'position']
+
+# Columns read from the club roster tab, which is maintained by hand; line and position are optional
+ROSTER_COLUMNS = ['player_name', 'line', 'position']
+
+# Result of StorageBackend.load_tables; tables that were not requested are None
+Tables = namedtuple('Tables', ['tournaments', 'roster', 'tournament_rosters'])
+
+
+def _append_cells_request(sheet_id, rows):
+    """
+    Build a batchUpdate request that appends rows to a worksheet.
+
+    Args:
+        sheet_id (int): The id of the worksheet.
+        rows (list): List of lists of values.
+
+    Returns:
+        dict: The appendCells request.
+    """
+    def cell(value):
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return {'userEnteredValue': {'stringValue': str(value)}}
+        return {'userEnteredValue': {'numberValue': value}}
+
+    return {
+        'appendCells': {
+            'sheetId': sheet_id,
+            'rows': [{'values': [cell(value) for value in row]} for row in rows],
+            'fields': 'userEnteredValue',
+        }
+    }
+
+
+class StorageBackend(ABC):
+    """
+    Interface for where tournaments, rosters and match rows are stored.
+
+    Rosters are returned as lists of Player records and match rows as lists in
+    MATCH_COLUMNS order, so callers do not depend on the storage engine. A backend
+    that leaves out any abstract method cannot be created.
+    """
+
+    # True when reads and writes never leave the machine
+    is_local = False
+
+    @abstractmethod
+    def get_tournaments(self):
+        """
+        Get the names of all tournaments.
+
+        Returns:
+            list: List of tournament names.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_roster(self):
+        """
+        Get the club roster.
+
+        Returns:
+            list: List of Player records.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_tournament_roster(self, tournament_name):
+        """
+        Get the roster for a specific tournament.
+
+        Args:
+            tournament_name (str): The name of the tournament.
+
+        Returns:
+            list: List of Player records.
+        """
+        raise NotImplementedError
+
+    def load_tables(self, tournaments=False, roster=False, tournament_rosters=False):
+        """
+        Load everything a page needs at once.
+
+        Args:
+            tournaments (bool): Load the tournament names.
+            roster (bool): Load the club roster.
+            tournament_rosters (bool): Load the roster of every tournament.
+
+        Returns:
+            Tables: The tournament names, the club roster Players, and a dictionary of
+            tournament name -> roster Players, each None if it was not requested.
+        """
+        tournament_names = self.get_tournaments() if tournaments or tournament_rosters else None
+        return Tables(
+            tournament_names if tournaments else None,
+            self.get_roster() if roster else None,
+            {name: self.get_tournament_roster(name) for name in tournament_names} if tournament_rosters else None,
+        )
+
+    @abstractmethod
+    def add_tournament(self, tournament_name, roster_rows):
+        """
+        Add a new tournament and its roster.
+
+        Args:
+            tournament_name (str): The name of the tournament to add.
+            roster_rows (list): List of [tournament_name, player_name, line, position] rows.
+
+        Returns:
+            bool: True if the tournament was added, False if it already exists.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def append_tournament_roster_rows(self, roster_rows):
+        """
+        Add players to the rosters of existing tournaments, in one write.
+
+        Args:
+            roster_rows (list): List of [tournament_name, player_name, line, position] rows.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def append_match_rows(self, rows):
+        """
+        Append match rows.
+
+        Args:
+            rows (list): List of lists in MATCH_COLUMNS order.
+
+        Returns:
+            int: The sheet row the first row was written to, or None if the backend has no row numbers.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_recent_points(self, match_id, count):
+        """
+        Get the rows of the last points of a match.
+
+        Only local backends keep points this way. Points synced to Google Sheets are
+        found through the match journal, which knows the sheet rows they were written to.
+
+        Args:
+            match_id (str): The match id.
+            count (int): Number of points to return at most.
+
+        Returns:
+            list: List of (point number, rows) tuples, oldest first.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete_point(self, match_id, point_number):
+        """
+        Delete the rows of one point. Only local backends do this, see get_recent_points.
+
+        Args:
+            match_id (str): The match id.
+            point_number (int): The point number.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def update_points(self, points):
+        """
+        Overwrite the outcome and score of recent points in one write. Only local
+        backends do this, see get_recent_points.
+
+        Args:
+            points (list): List of row lists, one per point, in MATCH_COLUMNS order.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_match_rows(self):
+        """
+        Get every recorded match row.
+
+        Returns:
+            list: List of lists in MATCH_COLUMNS order.
+        """
+        raise NotImplementedError
+
+    def iter_match_rows(self, chunk_rows=MATCH_CHUNK_ROWS):
+        """
+        Get every recorded match row, a chunk at a time.
+
+        Args:
+            chunk_rows (int): Number of rows per chunk.
+
+        Yields:
+            list: List of up to chunk_rows lists in MATCH_COLUMNS order, oldest first.
+        """
+        rows = self.get_match_rows()
+        for start in range(0, len(rows), chunk_rows):
+            yield rows[start:start + chunk_rows]
+
+    def get_last_point(self, match_id, full_search=False):
+        """
+        Find the last recorded point of a match.
+
+        Backends that would have to download the match history search only the last
+        RESUME_TAIL_ROWS match rows unless full_search is set, so resuming does not slow
+        down as the season grows. A match can drop out of those rows, for example when
+        other matches are recorded while it is paused, so a miss there is reported as
+        NOT_IN_TAIL rather than as a match without points. This default searches every row.
+
+        Args:
+            match_id (str): The match id, see row_match_id.
+            full_search (bool): Search the whole match history, not only the last rows.
+
+        Returns:
+            dict: See match_progress, NOT_IN_TAIL if only the last rows were searched and
+            the match is not among them, or None if the match has no points.
+        """
+        for row in reversed(self.get_match_rows()):
+            if row_match_id(row) == match_id:
+                return match_progress(row)
+        return None
+
+    def find_last_match(self, tournament_name, date, opponent):
+        """
+        Find the last recorded point of the latest match against an opponent on a date.
+
+        Lets a match be picked up again by tournament, date and opponent, e.g. after a
+        restart. Backends that would have to download the match history search only the
+        last RESUME_TAIL_ROWS match rows. This default searches every row.
+
+        Args:
+            tournament_name (str): The name of the tournament.
+            date (str): The match date.
+            opponent (str): The name of the opponent.
+
+        Returns:
+            dict: See match_progress, or None if no such match was found.
+        """
+        return _last_match_point(self.get_match_rows(), tournament_name, date, opponent)
+
+
+class SheetsBackend(StorageBackend):
+    """
+    Storage in a Google Sheets document, one worksheet per table.
+
+    Match rows are stored either in the wide matches tab (one row per player per point)
+    or, with match_format="normalized", in compact match index, points, point players and
+    players tabs. Reads always return the wide layout.
+    """
+
+    def __init__(self, credentials, sheet_name, tournament_tab_name, roster_tab_name,
+                 tournament_roster_tab_name, matches_tab_name, match_format="wide",
+                 normalized_tab_names=None):
+        self.credentials = credentials
+        self.sheet_name = sheet_name
+        self.tournament_tab_name = tournament_tab_name
+        self.roster_tab_name = roster_tab_name
+        self.tournament_roster_tab_name = tournament_roster_tab_name
+        self.matches_tab_name = matches_tab_name
+        self.match_format = match_format
+        # NormalizedMatches of worksheet names for the normalized layout
+        self.normalized_tab_names = normalized_tab_names or NormalizedMatches(
+            "match_index", "points", "point_players", "players"
+        )
+        # Ids already written to the normalized match index and players tabs
+        self._known_ids = {}
+        self._known_ids_lock = threading.Lock()
+        self._tournament_lock = threading.Lock()
+        # Whether the wide matches tab is known to have the match_id column header
+        self._has_match_id_column = False
+        self._match_id_column_lock = threading.Lock()
+        # Keeps the wide matches tab in memory and only fetches newly appended rows
+        self._match_reader = IncrementalMatchReader(lambda: self._worksheet(self.matches_tab_name))
+        # Reads only the columns the app uses. The layout of the tabs the app writes is
+        # known; the club roster's is read from its header row on first use.
+        self._columns = ColumnReader(
+            lambda: get_spreadsheet(self.credentials, self.sheet_name),
+            {
+                tournament_tab_name: ['tournament_name'],
+                tournament_roster_tab_name: TOURNAMENT_ROSTER_COLUMNS,
+                matches_tab_name: MATCH_COLUMNS,
+                self.normalized_tab_names.matches: MATCH_INDEX_COLUMNS,
+                self.normalized_tab_names.points: POINT_COLUMNS,
+            },
+        )
+
+    def _worksheet(self, worksheet_name):
+        """
+        Get a worksheet from the shared connection.
+
+        Args:
+            worksheet_name (str): The name of the worksheet.
+
+        Returns:
+            gspread.Worksheet: The Google Sheets worksheet object.
+        """
+        return connect_to_google_sheets(self.credentials, self.sheet_name, worksheet_name)
+
+    def get_tournaments(self):
+        return self.load_tables(tournaments=True).tournaments
+
+    def get_roster(self):
+        return self.load_tables(roster=True).roster
+
+    def get_tournament_roster(self, tournament_name):
+        return self.load_tables(tournament_rosters=True).tournament_rosters.get(tournament_name, [])
+
+    def load_tables(self, tournaments=False, roster=False, tournament_rosters=False):
+        # Every requested column of every tab comes back in a single request
+        requested = [
+            (tournaments, self.tournament_tab_name, ['tournament_name']),
+            (roster, self.roster_tab_name, ROSTER_COLUMNS),
+            (tournament_rosters, self.tournament_roster_tab_name, TOURNAMENT_ROSTER_COLUMNS),
+        ]
+        tables = iter(self._columns.read([
+            (worksheet_name, columns) for wanted, worksheet_name, columns in requested if wanted
+        ]))
+        tournament_rows, roster_rows, tournament_roster_rows = (
+            next(tables) if wanted else None for wanted, _, _ in requested
+        )
+
+        tournament_names = None
+        if tournament_rows is not None:
+            tournament_names = [name for (name,) in tournament_rows]
+            # Let the duplicate check see tournaments added elsewhere
+            with self._known_ids_lock:
+                self._known_ids.setdefault(self.tournament_tab_name, set()).update(tournament_names)
+
+        roster_players = None
+        if roster_rows is not None:
+            roster_players = [Player(str(name), line, position) for name, line, position in roster_rows]
+
+        rosters_by_tournament = None
+        if tournament_roster_rows is not None:
+            rosters_by_tournament = {}
+            for tournament_name, name, line, position in tournament_roster_rows:
+                rosters_by_tournament.setdefault(tournament_name, []).append(Player(str(name), line, position))
+
+        return Tables(tournament_names, roster_players, rosters_by_tournament)
+
+    def add_tournament(self, tournament_name, roster_rows):
+        spreadsheet = get_spreadsheet(self.credentials, self.sheet_name)
+        tournament_sheet = self._worksheet(self.tournament_tab_name)
+        roster_sheet = self._worksheet(self.tournament_roster_tab_name)
+
+        # Check the in-memory index of names and reserve the name, so a concurrent
+        # submission of the same tournament sees it as taken
+        known_tournaments = self._get_known_ids(self.tournament_tab_name)
+        with self._tournament_lock:
+            if tournament_name in known_tournaments:
+                return False
+            known_tournaments.add(tournament_name)
+
+        # batchUpdate is atomic, so either both tabs are written or neither is
+        requests = [_append_cells_request(tournament_sheet.id, [[tournament_name]])]
+        if roster_rows:
+            requests.append(_append_cells_request(roster_sheet.id, roster_rows))
+        written = False
+        try:
+            spreadsheet.batch_update({'requests': requests})
+            written = True
+        except Exception:
+            # The request may have been applied even though the response was lost
+            try:
+                written = tournament_name in tournament_sheet.col_values(1)[1:]
+            except Exception:
+                # Not known to be written, so the error of the write is reported
+                pass
+            if not written:
+                raise
+        finally:
+            if not written:
+                # Roll back the reservation so the tournament can be submitted again
+                with self._tournament_lock:
+                    known_tournaments.discard(tournament_name)
+        return True
+
+    def append_tournament_roster_rows(self, roster_rows):
+        self._append_rows(self.tournament_roster_tab_name, roster_rows)
+
+    def _append_rows(self, worksheet_name, rows):
+        """
+        Append rows to the end of a worksheet.
+
+        Args:
+            worksheet_name (str): The name of the worksheet.
+            rows (list): List of lists to append.
+
+        Returns:
+            int: The sheet row the first row was written to, from the range in the response.
+        """
+        response = self._worksheet(worksheet_name).append_rows(
+            rows,
+            value_input_option='RAW',
+            insert_data_option='INSERT_ROWS',
+            table_range='A1'
+        )
+        updated_range = (response or {}).get('updates', {}).get('updatedRange')
+        if not updated_range:
+            return None
+        return a1_range_to_grid_range(updated_range.rsplit('!', 1)[-1]).get('startRowIndex', 0) + 1
+
+    def _get_known_ids(self, worksheet_name):
+        """
+        Get the ids in the first column of a worksheet, reading them only once.
+
+        Args:
+            worksheet_name (str): The name of the worksheet.
+
+        Returns:
+            set: The ids already stored in the worksheet.
+        """
+        with self._known_ids_lock:
+            if worksheet_name not in self._known_ids:
+                self._known_ids[worksheet_name] = set(self._worksheet(worksheet_name).col_values(1)[1:])
+            return self._known_ids[worksheet_name]
+
+    def _append_normalized_match_rows(self, rows):
+        """
+        Append wide match rows to the normalized match tables.
+
+        Every tab is written in one batchUpdate, which is atomic, so a failure never
+        leaves a point without its players or a player row without its point.
+
+        Args:
+            rows (list): List of lists in MATCH_COLUMNS order.
+        """
+        normalized = normalize_match_rows(rows)
+        tabs = self.normalized_tab_names
+
+        # Match and player rows are shared between points, so only add the new ones
+        new_ids = {}
+        requests = []
+        for worksheet_name, table_rows in zip(tabs, normalized):
+            if worksheet_name in (tabs.matches, tabs.players):
+                known_ids = self._get_known_ids(worksheet_name)
+                table_rows = [row for row in table_rows if row[0] not in known_ids]
+                new_ids[worksheet_name] = [row[0] for row in table_rows]
+            if table_rows:
+                requests.append(_append_cells_request(self._worksheet(worksheet_name).id, table_rows))
+        if not requests:
+            return
+        get_spreadsheet(self.credentials, self.sheet_name).batch_update({'requests': requests})
+
+        with self._known_ids_lock:
+            for worksheet_name, ids in new_ids.items():
+                self._known_ids[worksheet_name].update(ids)
+
+    def _ensure_match_id_column(self):
+        """
+        Add the match_id header to a wide matches tab created before match ids were stored.
+
+        The header row is only checked once per process.
+
+        Raises:
+            ValueError: If the column after the score is already used for something else.
+        """
+        with self._match_id_column_lock:
+            if self._has_match_id_column:
+                return
+            header = self._worksheet(self.matches_tab_name).row_values(1)
+            position = MATCH_COLUMNS.index('match_id')
+            if 'match_id' not in header:
+                if len(header) > position and header[position]:
+                    raise ValueError(
+                        f"Column {rowcol_to_a1(1, position + 1)[:-1]} of {self.matches_tab_name} must be match_id, "
+                        f"not {header[position]}"
+                    )
+                get_spreadsheet(self.credentials, self.sheet_name).values_batch_update({
+                    'valueInputOption': 'RAW',
+                    'data': [{
+                        'range': absolute_range_name(self.matches_tab_name, rowcol_to_a1(1, position + 1)),
+                        'values': [['match_id']],
+                    }],
+                })
+            self._has_match_id_column = True
+
+    def append_match_rows(self, rows):
+        if self.match_format == "normalized":
+            # Rows are spread over several tabs, so there is no single row range
+            self._append_normalized_match_rows(rows)
+            return None
+        self._ensure_match_id_column()
+        return self._append_rows(self.matches_tab_name, rows)
+
+    def find_match_points(self, keys, row_count):
+        """
+        Find which points are already among the last rows of the match history.
+
+        Used before sending points again after a write failed, since the write may have
+        been applied anyway.
+
+        Args:
+            keys (list): (match_id, point_number) tuples of the points.
+            row_count (int): Total number of rows of the points.
+
+        Returns:
+            dict: (match_id, point_number) -> sheet row of the first row of the point in the
+            wide matches tab (None in the normalized layout), for the points found.
+        """
+        wanted = set(keys)
+        if self.match_format == "normalized":
+            tabs = self.normalized_tab_names
+            grid_rows, = self._grid_rows([tabs.points])
+            _, points = read_tail(
+                self._worksheet(tabs.points), len(POINT_COLUMNS), len(wanted) + RESUME_TAIL_ROWS // 7, grid_rows
+            )
+            point_ids = {row[0] for row in points}
+            return {key: None for key in wanted if make_point_id(*key) in point_ids}
+
+        grid_rows, = self._grid_rows([self.matches_tab_name])
+        # Rows other devices appended since are searched too
+        header, numbered = read_tail(
+            self._worksheet(self.matches_tab_name), len(MATCH_COLUMNS), row_count + RESUME_TAIL_ROWS, grid_rows,
+            numbered=True
+        )
+        found = {}
+        for (row_number, _), row in zip(numbered, match_rows_from_sheet(header, [row for _, row in numbered])):
+            key = (row_match_id(row), match_progress(row)['point_number'])
+            if key in wanted:
+                found.setdefault(key, row_number)
+        return found
+
+    def delete_match_rows(self, first_row, last_row, rows):
+        """
+        Delete rows of the wide matches tab in one request. The rows below move up.
+
+        The row range comes from when the rows were appended, and the tab may have been
+        changed since by hand or by another server, so the range is read first and nothing
+        is deleted unless it still holds the point.
+
+        A delete cannot be sent twice, since the second one would remove the rows that
+        moved up, so it is not retried. If it fails, the rows are read back to tell
+        whether it was applied anyway.
+
+        Args:
+            first_row (int): The first sheet row to delete.
+            last_row (int): The last sheet row to delete.
+            rows (list): The rows expected there, in MATCH_COLUMNS order.
+
+        Raises:
+            ValueError: If the range no longer holds the point.
+            Exception: The error of the failed delete, if the rows are still there.
+        """
+        if not self._points_at([(first_row, rows)])[0]:
+            raise ValueError(_moved_point_message(rows, first_row))
+        worksheet = self._worksheet(self.matches_tab_name)
+        try:
+            get_spreadsheet(self.credentials, self.sheet_name).batch_update({'requests': [{
+                'deleteDimension': {
+                    'range': {'sheetId': worksheet.id, 'dimension': 'ROWS', 'startIndex': first_row - 1, 'endIndex': last_row}
+                }
+            }]})
+        except Exception:
+            if self._points_at([(first_row, rows)])[0]:
+                raise
+
+    def _points_at(self, points):
+        """
+        Check whether the rows of points are still at their ranges of the wide matches tab, in one request.
+
+        Args:
+            points (list): List of (first sheet row, rows) tuples, rows in MATCH_COLUMNS order.
+
+        Returns:
+            list: For each point, True if every row in its range belongs to it.
+        """
+        last_column = rowcol_to_a1(1, len(MATCH_COLUMNS))[:-1]
+        header, *ranges = self._worksheet(self.matches_tab_name).batch_get(
+            [f"A1:{last_column}1"] + [
+                f"A{first_row}:{last_column}{first_row + len(rows) - 1}" for first_row, rows in points
+            ],
+            value_render_option=ValueRenderOption.unformatted
+        )
+        header = header[0] if header else []
+        found = []
+        for (_, rows), stored in zip(points, ranges):
+            stored = match_rows_from_sheet(header, stored)
+            key = (row_match_id(rows[0]), match_progress(rows[0])['point_number'])
+            found.append(len(stored) == len(rows) and all(
+                (row_match_id(row), match_progress(row)['point_number']) == key for row in stored
+            ))
+        return found
+
+    def update_match_rows(self, updates):
+        """
+        Overwrite rows of the wide matches tab in one request.
+
+        The ranges are read first, as for delete_match_rows, and nothing is written unless
+        every one of them still holds its point.
+
+        Args:
+            updates (list): List of (first sheet row, rows) tuples, rows in MATCH_COLUMNS order.
+
+        Raises:
+            ValueError: If a range no longer holds its point.
+        """
+        for (first_row, rows), found in zip(updates, self._points_at(updates)):
+            if not found:
+                raise ValueError(_moved_point_message(rows, first_row))
+        last_column = rowcol_to_a1(1, len(MATCH_COLUMNS))[:-1]
+        get_spreadsheet(self.credentials, self.sheet_name).values_batch_update({
+            'valueInputOption': 'RAW',
+            'data': [
+                {
+                    'range': absolute_range_name(
+                        self.matches_tab_name, f"A{first_row}:{last_column}{first_row + len(rows) - 1}"
+                    ),
+                    'values': rows,
+                }
+                for first_row, rows in updates
+            ],
+        })
+
+    def get_recent_points(self, match_id, count):
+        raise ValueError(JOURNALED_POINTS_MESSAGE)
+
+    def delete_point(self, match_id, point_number):
+        raise ValueError(JOURNALED_POINTS_MESSAGE)
+
+    def update_points(self, points):
+        raise ValueError(JOURNALED_POINTS_MESSAGE)
+
+    def get_match_rows(self):
+        if self.match_format == "normalized":
+            # Rebuild the wide layout so readers work with either format
+            return denormalize_match_rows(NormalizedMatches(*(
+                self._worksheet(worksheet_name).get_all_values()[1:]
+                for worksheet_name in self.normalized_tab_names
+            )))
+        self._match_reader.refresh()
+        return self._match_reader.rows()
+
+    def iter_match_rows(self, chunk_rows=MATCH_CHUNK_ROWS):
+        if self.match_format == "normalized" or self._match_reader.loaded:
+            # Already in memory, or only readable as whole tables
+            yield from super().iter_match_rows(chunk_rows)
+            return
+        for header, rows in read_chunks(self._worksheet(self.matches_tab_name), len(MATCH_COLUMNS), chunk_rows):
+            if rows:
+                yield match_rows_from_sheet(header, rows)
+
+    def _grid_rows(self, worksheet_names):
+        """
+        Get the current grid size of worksheets in one request.
+
+        Worksheet handles are shared for the life of the process, so the row counts they
+        were opened with are out of date once rows have been appended.
+
+        Args:
+            worksheet_names (list): The worksheet names.
+
+        Returns:
+            list: Number of grid rows of each worksheet, including empty ones.
+        """
+        metadata = get_spreadsheet(self.credentials, self.sheet_name).fetch_sheet_metadata(
+            params={'fields': 'sheets.properties(sheetId,gridProperties.rowCount)'}
+        )
+        rows_by_id = {
+            sheet['properties']['sheetId']: sheet['properties']['gridProperties']['rowCount']
+            for sheet in metadata['sheets']
+        }
+        return [rows_by_id[self._worksheet(worksheet_name).id] for worksheet_name in worksheet_names]
+
+    def get_last_point(self, match_id, full_search=False):
+        if self.match_format == "normalized":
+            return self._get_last_normalized_point(match_id, full_search)
+
+        if self._match_reader.loaded:
+            # The tab is already in memory, so only newly appended rows are fetched and
+            # every row can be searched
+            self._match_reader.refresh()
+            rows = self._match_reader.rows()
+        elif full_search:
+            # Only the columns that say where a match stood, not the whole tab
+            progress_rows, = self._columns.read([(self.matches_tab_name, PROGRESS_COLUMNS)])
+            rows = [
+                [dict(zip(PROGRESS_COLUMNS, values)).get(column, '') for column in MATCH_COLUMNS]
+                for values in progress_rows
+            ]
+        else:
+            grid_rows, = self._grid_rows([self.matches_tab_name])
+            header, rows = read_tail(
+                self._worksheet(self.matches_tab_name), len(MATCH_COLUMNS), RESUME_TAIL_ROWS, grid_rows
+            )
+            rows = match_rows_from_sheet(header, rows)
+            if len(rows) >= RESUME_TAIL_ROWS and all(row_match_id(row) != match_id for row in rows):
+                return NOT_IN_TAIL
+        for row in reversed(rows):
+            if row_match_id(row) == match_id:
+                return match_progress(row)
+        return None
+
+    def find_last_match(self, tournament_name, date, opponent):
+        if self.match_format == "normalized":
+            tabs = self.normalized_tab_names
+            index_rows, = self._grid_rows([tabs.matches])
+            _, matches = read_tail(
+                self._worksheet(tabs.matches), len(MATCH_INDEX_COLUMNS), RESUME_TAIL_ROWS // 7, index_rows
+            )
+            match = next((row for row in reversed(matches) if tuple(row[1:4]) == (tournament_name, date, opponent)), None)
+            if match is None:
+                return None
+            last_point = self._get_last_normalized_point(match[0], False)
+            if last_point == NOT_IN_TAIL:
+                last_point = self._get_last_normalized_point(match[0], True)
+            return last_point
+
+        if self._match_reader.loaded:
+            self._match_reader.refresh()
+            rows = self._match_reader.rows()
+        else:
+            grid_rows, = self._grid_rows([self.matches_tab_name])
+            header, rows = read_tail(
+                self._worksheet(self.matches_tab_name), len(MATCH_COLUMNS), RESUME_TAIL_ROWS, grid_rows
+            )
+            rows = match_rows_from_sheet(header, rows)
+        return _last_match_point(rows, tournament_name, date, opponent)
+
+    def _get_last_normalized_point(self, match_id, full_search):
+        """
+        Find the last point of a match in the normalized points and match index tabs.
+
+        Only the tails of the tabs are read unless full_search is set. A match whose
+        index row has dropped out of the tail is then looked up by id.
+
+        Args:
+            match_id (str): The match id.
+            full_search (bool): Search every point, not only the last ones.
+
+        Returns:
+            dict: See match_progress, NOT_IN_TAIL or None, as for get_last_point.
+        """
+        tabs = self.normalized_tab_names
+        # A point row is one row per point, so fewer rows cover the same points
+        tail_rows = RESUME_TAIL_ROWS // 7
+        if full_search:
+            points, matches = (
+                [list(row) for row in rows]
+                for rows in self._columns.read([(tabs.points, POINT_COLUMNS), (tabs.matches, MATCH_INDEX_COLUMNS)])
+            )
+        else:
+            index_rows, point_rows = self._grid_rows([tabs.matches, tabs.points])
+            _, points = read_tail(self._worksheet(tabs.points), len(POINT_COLUMNS), tail_rows, point_rows)
+            _, matches = read_tail(self._worksheet(tabs.matches), len(MATCH_INDEX_COLUMNS), tail_rows, index_rows)
+        point = next((row for row in reversed(points) if row[1] == match_id), None)
+        if point is None:
+            return NOT_IN_TAIL if not full_search and len(points) >= tail_rows else None
+        match = next((row for row in reversed(matches) if row[0] == match_id), None)
+        if match is None and not full_search:
+            # The match started before the last matches in the index
+            matches, = self._columns.read([(tabs.matches, MATCH_INDEX_COLUMNS)])
+            match = next((list(row) for row in reversed(matches) if row[0] == match_id), None)
+        if match is None:
+            return None
+        _, tournament_name, date, opponent = match[:4]
+        _, _, point_number, point_scored, score_for, score_against = (point + [''] * len(POINT_COLUMNS))[:6]
+        return match_progress([
+            tournament_name, date, opponent, point_number, '', '', '', point_scored, score_for, score_against, '',
+            match_id
+        ])
+
+
+def _last_match_point(rows, tournament_name, date, opponent):
+    """
+    Find the last point of the latest match against an opponent on a date among match rows.
+
+    Args:
+        rows (list): Match rows in MATCH_COLUMNS order, oldest first.
+        tournament_name (str): The name of the tournament.
+        date (str): The match date.
+        opponent (str): The name of the opponent.
+
+    Returns:
+        dict: See match_progress for the last such row, or None if there is none.
+    """
+    for row in reversed(rows):
+        if (str(row[0]), str(row[1]), str(row[2])) == (tournament_name, date, opponent):
+            return match_progress(row)
+    return None
+
+
+def _moved_point_message(rows, first_row):
+    """
+    Build the error for a point whose rows are no longer where they were appended.
+
+    Args:
+        rows (list): The rows of the point, in MATCH_COLUMNS order.
+        first_row (int): The sheet row the point was expected to start at.
+
+    Returns:
+        str: The error message.
+    """
+    point_number = match_progress(rows[0])['point_number']
+    return (
+        f"Point {point_number} is no longer at row {first_row} of the matches tab, which was changed "
+        f"by hand or on another server, so it was left as it is; change it in the sheet instead"
+    )
+
+
+class SQLiteBackend(StorageBackend):
+    """
+    Storage in a local, indexed SQLite database.
+    """
+
+    is_local = True
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._conn:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS tournaments (
+                    tournament_name TEXT PRIMARY KEY
+                );
+                CREATE TABLE IF NOT EXISTS roster (
+                    player_name TEXT PRIMARY KEY
+                );
+                CREATE TABLE IF NOT EXISTS tournament_rosters (
+                    tournament_name TEXT NOT NULL,
+                    player_name TEXT NOT NULL,
+                    line TEXT,
+                    position TEXT,
+                    PRIMARY KEY (tournament_name, player_name)
+                );
+                CREATE TABLE IF NOT EXISTS matches (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    tournament_name TEXT,
+                    date TEXT,
+                    opponent TEXT,
+                    point_number INTEGER,
+                    player_name TEXT,
+                    line TEXT,
+                    position TEXT,
+                    point_scored TEXT,
+                    score_for INTEGER,
+                    score_against INTEGER,
+                    score TEXT,
+                    match_id TEXT
+                );
+                CREATE INDEX IF NOT EXISTS matches_by_player ON matches (player_name);
+            """)
+            self._add_match_ids()
+            self._conn.execute("DROP INDEX IF EXISTS matches_by_point")
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS matches_by_match_point ON matches (match_id, point_number)"
+            )
+
+    def _add_match_ids(self):
+        """
+        Add the match_id column to a database created before match ids were stored, and fill it in.
+        """
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(matches)")]
+        if 'match_id' not in columns:
+            self._conn.execute("ALTER TABLE matches ADD COLUMN match_id TEXT")
+        rows = self._conn.execute(
+            "SELECT id, tournament_name, date, opponent FROM matches WHERE match_id IS NULL"
+        ).fetchall()
+        self._conn.executemany(
+            "UPDATE matches SET match_id = ? WHERE id = ?",
+            [(make_match_id(tournament_name, date, opponent), row_id) for row_id, tournament_name, date, opponent in rows]
+        )
+
+    def _query(self, sql, params=()):
+        """
+        Run a read query.
+
+        Args:
+            sql (str): The SQL statement.
+            params (tuple): The statement parameters.
+
+        Returns:
+            list: The result rows.
+        """
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def get_tournaments(self):
+        return [name for (name,) in self._query("SELECT tournament_name FROM tournaments ORDER BY rowid")]
+
+    def get_roster(self):
+        return [Player(name, '', '') for (name,) in self._query("SELECT player_name FROM roster ORDER BY rowid")]
+
+    def get_tournament_roster(self, tournament_name):
+        rows = self._query(
+            "SELECT player_name, line, position FROM tournament_rosters WHERE tournament_name = ? ORDER BY rowid",
+            (tournament_name,)
+        )
+        return [Player(*row) for row in rows]
+
+    def add_tournament(self, tournament_name, roster_rows):
+        with self._lock, self._conn:
+            try:
+                self._conn.execute("INSERT INTO tournaments (tournament_name) VALUES (?)", (tournament_name,))
+            except sqlite3.IntegrityError:
+                return False
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO tournament_rosters (tournament_name, player_name, line, position) "
+                "VALUES (?, ?, ?, ?)",
+                roster_rows
+            )
+        return True
+
+    def append_tournament_roster_rows(self, roster_rows):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO tournament_rosters (tournament_name, player_name, line, position) "
+                "VALUES (?, ?, ?, ?)",
+                roster_rows
+            )
+
+    def add_players(self, player_names):
+        """
+        Add players to the club roster, ignoring names that are already on it.
+
+        Args:
+            player_names (list): List of player names.
+        """
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO roster (player_name) VALUES (?)",
+                [(name,) for name in player_names]
+            )
+
+    def append_match_rows(self, rows):
+        # Points already stored are skipped, so a retried save is not recorded twice
+        points = {}
+        for row in rows:
+            match_id = row_match_id(row)
+            points.setdefault((match_id, row[3]), []).append(list(row[:11]) + [match_id])
+        with self._lock, self._conn:
+            for point_key, point_rows in points.items():
+                exists = self._conn.execute(
+                    "SELECT 1 FROM matches WHERE match_id = ? AND point_number = ? LIMIT 1", point_key
+                ).fetchone()
+                if exists:
+                    continue
+                self._conn.executemany(
+                    f"INSERT INTO matches ({', '.join(MATCH_COLUMNS)}) "
+                    f"VALUES ({', '.join('?' * len(MATCH_COLUMNS))})",
+                    point_rows
+                )
+
+    def get_match_rows(self):
+        return [list(row) for row in self._query(f"SELECT {', '.join(MATCH_COLUMNS)} FROM matches ORDER BY id")]
+
+    def get_recent_points(self, match_id, count):
+        rows = self._query(
+            f"SELECT {', '.join(MATCH_COLUMNS)} FROM matches "
+            "WHERE match_id = ? AND point_number IN ("
+            "    SELECT DISTINCT point_number FROM matches WHERE match_id = ? ORDER BY point_number DESC LIMIT ?"
+            ") ORDER BY point_number, id",
+            (match_id, match_id, count)
+        )
+        points = {}
+        for row in rows:
+            points.setdefault(row[3], []).append(list(row))
+        return list(points.items())
+
+    def delete_point(self, match_id, point_number):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM matches WHERE match_id = ? AND point_number = ?", (match_id, point_number)
+            )
+
+    def update_points(self, points):
+        # The players of a point do not change, so the rows keep their place in the history
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE matches SET point_scored = ?, score_for = ?, score_against = ?, score = ? "
+                "WHERE match_id = ? AND point_number = ?",
+                [tuple(point_rows[0][7:11]) + (row_match_id(point_rows[0]), point_rows[0][3]) for point_rows in points]
+            )
+
+    def iter_match_rows(self, chunk_rows=MATCH_CHUNK_ROWS):
+        last_id = 0
+        while True:
+            chunk = self._query(
+                f"SELECT id, {', '.join(MATCH_COLUMNS)} FROM matches WHERE id > ? ORDER BY id LIMIT ?",
+                (last_id, chunk_rows)
+            )
+            if not chunk:
+                return
+            last_id = chunk[-1][0]
+            yield [list(row[1:]) for row in chunk]
+
+    def get_last_point(self, match_id, full_search=False):
+        # Indexed by match, so every row is always searched
+        rows = self._query(
+            f"SELECT {', '.join(MATCH_COLUMNS)} FROM matches WHERE match_id = ? "
+            "ORDER BY point_number DESC, id DESC LIMIT 1",
+            (match_id,)
+        )
+        return match_progress(list(rows[0])) if rows else None
+
+    def find_last_match(self, tournament_name, date, opponent):
+        rows = self._query(
+            f"SELECT {', '.join(MATCH_COLUMNS)} FROM matches WHERE tournament_name = ? AND date = ? AND opponent = ? "
+            "ORDER BY id DESC LIMIT 1",
+            (tournament_name, date, opponent)
+        )
+        return self.get_last_point(row_match_id(list(rows[0]))) if rows else None
+
+    def import_from(self, source):
+        """
+        Copy every tournament, roster and match row from another backend.
+
+        Used to seed a new SQLite database from the Google Sheets document.
+
+        Args:
+            source (StorageBackend): The backend to copy from.
+        """
+        self.add_players([player.name for player in source.get_roster() if player.name])
+        for tournament_name in source.get_tournaments():
+            roster_rows = [
+                [tournament_name, player.name, player.line, player.position]
+                for player in source.get_tournament_roster(tournament_name)
+            ]
+            self.add_tournament(tournament_name, roster_rows)
+        self.append_match_rows(source.get_match_rows())
+
+
+_backend_lock = threading.Lock()
+_backends = {}
+
+
+def _sheets_backend():
+    """
+    Build a Google Sheets backend from st.secrets.
+
+    Returns:
+        SheetsBackend: A new Sheets backend.
+    """
+    return SheetsBackend(
+        st.secrets["gcp_service_account"],
+        st.secrets["SHEET_NAME"],
+        st.secrets["TOURNAMENT_TAB_NAME"],
+        st.secrets["ROSTER_TAB_NAME"],
+        st.secrets["TOURNAMENT_ROSTER_TAB_NAME"],
+        st.secrets["MATCHES_TAB_NAME"],
+        match_format=st.secrets.get("MATCH_STORAGE_FORMAT", "wide"),
+        normalized_tab_names=NormalizedMatches(
+            st.secrets.get("MATCH_INDEX_TAB_NAME", "match_index"),
+            st.secrets.get("POINTS_TAB_NAME", "points"),
+            st.secrets.get("POINT_PLAYERS_TAB_NAME", "point_players"),
+            st.secrets.get("PLAYERS_TAB_NAME", "players"),
+        ),
+    )
+
+
+def get_backend():
+    """
+    Get the primary storage backend selected by STORAGE_BACKEND in st.secrets.
+
+    "sheets" (the default) stores everything in Google Sheets, "sqlite" stores it in the
+    local database at SQLITE_PATH.
+
+    Returns:
+        StorageBackend: The process-wide primary backend.
+    """
+    with _backend_lock:
+        if 'primary' not in _backends:
+            kind = st.secrets.get("STORAGE_BACKEND", "sheets")
+            if kind == "sheets":
+                _backends['primary'] = _sheets_backend()
+            elif kind == "sqlite":
+                _backends['primary'] = SQLiteBackend(st.secrets.get("SQLITE_PATH", DEFAULT_SQLITE_PATH))
+            else:
+                raise ValueError(f"Unknown STORAGE_BACKEND: {kind}")
+        return _backends['primary']
+
+
+def get_sheets_sync_backend():
+    """
+    Get the Google Sheets backend that recorded points are synced to in the background.
+
+    This is the primary backend when it is Google Sheets, or an export target when the
+    primary backend is local and SHEETS_EXPORT is enabled in st.secrets.
+
+    Returns:
+        SheetsBackend: The Sheets backend, or None if points are not synced to Sheets.
+    """
+    primary = get_backend()
+    if isinstance(primary, SheetsBackend):
+        return primary
+    if not st.secrets.get("SHEETS_EXPORT", False):
+        return None
+    with _backend_lock:
+        if 'export' not in _backends:
+            _backends['export'] = _sheets_backend()
+        return _backends['export']
+
+
+if __name__ == "__main__":
+    # Seed the local SQLite database from Google Sheets:
+    #   python -m modules.storage
+    target = SQLiteBackend(st.secrets.get("SQLITE_PATH", DEFAULT_SQLITE_PATH))
+    target.import_from(_sheets_backend())
+    print(f"Imported Google Sheets data into {target.path}")
@@ -0,0 +1,66 @@
+"""
+Shared setup for the tests.
+
+The app modules read st.secrets when they are imported, and Streamlit looks for
+.streamlit/secrets.toml in the working directory, so the tests run from a temporary
+directory with fake secrets. Google Sheets is replaced by benchmarks.fake_sheets.
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(REPO_ROOT, "app.py")
+
+SECRETS = """\
+APP_USERNAME = "coach"
+APP_PASSWORD = "coach"
+SHEET_NAME = "test"
+TOURNAMENT_TAB_NAME = "tournaments"
+ROSTER_TAB_NAME = "roster"
+TOURNAMENT_ROSTER_TAB_NAME = "tournament_rosters"
+MATCHES_TAB_NAME = "matches"
+STORAGE_BACKEND = "sheets"
+JOURNAL_PATH = "match_journal.sqlite3"
+PREWARM = false
+# The fake spreadsheet has no quota; the tests should not wait for one
+SHEETS_READS_PER_MINUTE = 100000
+SHEETS_WRITES_PER_MINUTE = 100000
+
+[gcp_service_account]
+type = "service_account"
+client_email = "test@example.iam.gserviceaccount.com"
+private_key_id = "test"
+"""
+
+# Must happen before streamlit is imported, which fixes where it looks for secrets
+_work_dir = tempfile.mkdtemp(prefix="bwu_clipboard_tests_")
+os.makedirs(os.path.join(_work_dir, ".streamlit"))
+with open(os.path.join(_work_dir, ".streamlit", "secrets.toml"), "w") as f:
+    f.write(SECRETS)
+os.chdir(_work_dir)
+sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.fake_sheets import FakeSpreadsheet, install, make_club_tabs  # noqa: E402
+from modules.request_scheduler import scheduler  # noqa: E402
+
+
+@pytest.fixture
+def fast_retries(monkeypatch):
+    """
+    Retry failed requests straight away instead of backing off for seconds.
+    """
+    monkeypatch.setattr(scheduler, 'base_delay', 0.0)
+    monkeypatch.setattr(scheduler, 'max_delay', 0.0)
+
+
+@pytest.fixture
+def spreadsheet(fast_retries):
+    """
+    A fake Google Sheets document with a 14 player club and one tournament, used by the app.
+    """
+    fake = FakeSpreadsheet(make_club_tabs(14))
+    install(fake)
+    return fake
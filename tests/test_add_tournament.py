@@ -0,0 +1,28 @@
+from streamlit.testing.v1 import AppTest
+
+from conftest import APP_PATH
+
+SUBMIT_KEY = "FormSubmitter:add_tournament_form-Add Tournament"
+
+
+def _submit(at, tournament_name):
+    at.text_input[0].set_value(tournament_name)
+    at.checkbox(key="select_0").check()
+    at.button(key=SUBMIT_KEY).click()
+    at.run()
+
+
+def test_submitting_a_name_again_reports_that_it_exists(spreadsheet):
+    at = AppTest.from_file(APP_PATH, default_timeout=30)
+    at.session_state["logged_in"] = True
+    at.session_state["current_page"] = "Add Tournament"
+    at.run()
+
+    _submit(at, "Summer")
+    assert [success.value for success in at.success] == ["Successfully added tournament 'Summer' with 1 players"]
+
+    _submit(at, "Summer")
+
+    assert not at.success
+    assert [warning.value for warning in at.warning] == ["Tournament 'Summer' already exists"]
+    assert spreadsheet.rows("tournaments")[1:] == [["Spring"], ["Summer"]]
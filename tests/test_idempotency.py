@@ -0,0 +1,28 @@
+import pytest
+
+from modules.idempotency import IdempotencyRegistry
+
+
+def test_repeated_key_returns_the_first_result():
+    registry = IdempotencyRegistry()
+    calls = []
+
+    assert registry.run("k", lambda: calls.append(1) or "first") == "first"
+    assert registry.run("k", lambda: calls.append(2) or "second") == "first"
+    assert calls == [1]
+
+
+def test_failed_submission_can_be_retried_and_leaves_no_lock():
+    registry = IdempotencyRegistry()
+
+    def fail():
+        raise RuntimeError("write failed")
+
+    for _ in range(3):
+        with pytest.raises(RuntimeError):
+            registry.run("k", fail)
+
+    assert registry._key_locks == {}
+    assert not registry.seen("k")
+    assert registry.run("k", lambda: "done") == "done"
+    assert registry._key_locks == {}
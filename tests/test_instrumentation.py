@@ -0,0 +1,78 @@
+import json
+import logging
+import time
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+from conftest import APP_PATH
+from modules import instrumentation
+from modules.match_journal import match_journal
+
+
+@pytest.fixture
+def rerun_log(monkeypatch, caplog):
+    monkeypatch.setattr(instrumentation, 'log_reruns', True)
+    caplog.set_level(logging.INFO, logger=instrumentation.logger.name)
+
+    def reruns():
+        return [
+            json.loads(record.getMessage()) for record in caplog.records
+            if record.name == instrumentation.logger.name and '"event": "rerun"' in record.getMessage()
+        ]
+
+    return reruns
+
+
+def _calls(rerun):
+    return sorted(call['call'] for call in rerun['calls'] if call['source'] == 'backend')
+
+
+def _script():
+    from modules.instrumentation import rerun_scope, track_backend_call, tracked_fragment
+
+    @tracked_fragment
+    def panel():
+        with track_backend_call('in_panel'):
+            pass
+
+    # On its own, as when the fragment reruns by itself
+    panel()
+    # Drawn during a full script run
+    with rerun_scope():
+        panel()
+        with track_backend_call('in_page'):
+            pass
+
+
+def test_fragment_gets_its_own_scope_only_outside_a_script_run(rerun_log):
+    AppTest.from_function(_script, default_timeout=30).run()
+
+    reruns = rerun_log()
+    assert [(rerun['fragment'], _calls(rerun)) for rerun in reruns] == [
+        ('panel', ['in_panel']),
+        (None, ['in_page', 'in_panel']),
+    ]
+
+
+def test_run_ended_by_st_rerun_is_logged(spreadsheet, rerun_log):
+    at = AppTest.from_file(APP_PATH, default_timeout=30)
+    at.session_state["logged_in"] = True
+    at.run()
+    at.text_input[0].set_value("Logged Rivals")
+    at.run()
+    at.multiselect(key="line_O_players").set_value(["Player 1", "Player 3", "Player 5", "Player 7"])
+    at.multiselect(key="line_D_players").set_value(["Player 2", "Player 4", "Player 6"])
+    at.run()
+    next(button for button in at.button if button.label == "SAVE POINT").click()
+    at.run()
+    deadline = time.time() + 10
+    while match_journal.pending_count() and time.time() < deadline:
+        time.sleep(0.02)
+    logged = len(rerun_log())
+
+    # Undoing a point deletes its sheet rows, then ends the run with st.rerun()
+    at.button(key="undo_point").click()
+    at.run()
+
+    assert any('delete_match_rows' in _calls(rerun) for rerun in rerun_log()[logged:])
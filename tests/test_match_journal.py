@@ -0,0 +1,105 @@
+import pytest
+from gspread.exceptions import APIError
+
+from modules.match_journal import MatchJournal
+from modules.request_scheduler import SheetsUnavailableError, scheduler
+from modules.storage import get_backend
+
+
+def _point(match_id, point_number):
+    return [
+        ["Spring", "2026-05-01", "Rivals", point_number, player, "O", "Handler", "Yes",
+         point_number, 0, f"{point_number}-0", match_id]
+        for player in ("Player 1", "Player 2")
+    ]
+
+
+@pytest.fixture
+def journal(tmp_path):
+    return MatchJournal(str(tmp_path / "journal.sqlite3"))
+
+
+@pytest.fixture
+def no_retries(monkeypatch):
+    # Let the failure reach the journal instead of being retried by the scheduler
+    monkeypatch.setattr(scheduler, 'max_retries', 0)
+
+
+def _flush(journal, backend):
+    with pytest.raises((APIError, SheetsUnavailableError)):
+        journal.flush(backend.append_match_rows, backend.find_match_points)
+
+
+def test_points_written_before_a_failed_response_are_not_sent_again(spreadsheet, journal, no_retries):
+    backend = get_backend()
+    journal.append(_point("m", 1), "m", 1)
+    journal.append(_point("m", 2), "m", 2)
+    spreadsheet.fail_next('write', applied=True)
+
+    _flush(journal, backend)
+    assert journal.flush(backend.append_match_rows, backend.find_match_points) == 2
+
+    rows = spreadsheet.rows("matches")[1:]
+    assert [(row[11], row[3]) for row in rows] == [("m", 1), ("m", 1), ("m", 2), ("m", 2)]
+    assert journal.pending_count() == 0
+    assert spreadsheet.calls[("append_rows", "matches")] == 1
+    # The row ranges found are kept for undo, as if the write had succeeded
+    assert journal._located_points("m", [2])[2][3] == 4
+
+
+def test_points_lost_by_a_failed_write_are_sent_again(spreadsheet, journal, no_retries):
+    backend = get_backend()
+    journal.append(_point("m", 1), "m", 1)
+    spreadsheet.fail_next('write', applied=False)
+
+    _flush(journal, backend)
+    assert journal.flush(backend.append_match_rows, backend.find_match_points) == 1
+
+    rows = spreadsheet.rows("matches")[1:]
+    assert [(row[11], row[3]) for row in rows] == [("m", 1), ("m", 1)]
+    assert journal._located_points("m", [1])[1][3] == 2
+
+
+def test_only_the_missing_points_are_sent_again(spreadsheet, journal, no_retries):
+    backend = get_backend()
+    journal.append(_point("m", 1), "m", 1)
+    spreadsheet.fail_next('write', applied=True)
+    _flush(journal, backend)
+    journal.append(_point("m", 2), "m", 2)
+
+    assert journal.flush(backend.append_match_rows, backend.find_match_points) == 2
+
+    rows = spreadsheet.rows("matches")[1:]
+    assert [(row[11], row[3]) for row in rows] == [("m", 1), ("m", 1), ("m", 2), ("m", 2)]
+
+
+def _interleaved_with_a_row_deleted_by_hand(spreadsheet, journal, backend):
+    for point_number in (1, 2):
+        journal.append(_point("a", point_number), "a", point_number)
+        journal.append(_point("b", point_number), "b", point_number)
+    journal.flush(backend.append_match_rows, backend.find_match_points)
+    # A row above the journaled points deleted in Sheets, which moves them all up
+    del spreadsheet._tabs["matches"].rows[1]
+    return [(row[11], row[3]) for row in spreadsheet.rows("matches")[1:]]
+
+
+def test_undo_refuses_rows_moved_since_they_were_synced(spreadsheet, journal):
+    backend = get_backend()
+    before = _interleaved_with_a_row_deleted_by_hand(spreadsheet, journal, backend)
+
+    with pytest.raises(ValueError, match="Point 2"):
+        journal.remove_point("b", 2, backend.delete_match_rows)
+
+    assert [(row[11], row[3]) for row in spreadsheet.rows("matches")[1:]] == before
+    assert [point_number for point_number, _ in journal.recent_points("b", 5)] == [1, 2]
+
+
+def test_correction_refuses_rows_moved_since_they_were_synced(spreadsheet, journal):
+    backend = get_backend()
+    _interleaved_with_a_row_deleted_by_hand(spreadsheet, journal, backend)
+    before = spreadsheet.rows("matches")
+
+    with pytest.raises(ValueError, match="Point 2"):
+        journal.replace_points("b", [(2, _point("b", 2))], backend.update_match_rows)
+
+    assert spreadsheet.rows("matches") == before
@@ -0,0 +1,61 @@
+from benchmarks.fake_sheets import FakeSpreadsheet, make_club_tabs
+from modules.match_format import MATCH_COLUMNS
+from modules.match_reader import IncrementalMatchReader
+
+
+def _row(point_number, player_name="Player 1", scored="Yes"):
+    return ["Spring", "2026-05-01", "Rivals", point_number, player_name, "O", "Handler", scored, 1, 0, "1-0"]
+
+
+def _reader(spreadsheet):
+    worksheet = spreadsheet._tabs["matches"]
+    return worksheet, IncrementalMatchReader(lambda: worksheet)
+
+
+def test_only_appended_rows_are_fetched(fast_retries):
+    spreadsheet = FakeSpreadsheet(make_club_tabs(4))
+    worksheet, reader = _reader(spreadsheet)
+    worksheet.rows.extend([_row(1), _row(2)])
+    reader.refresh()
+
+    worksheet.rows.append(_row(3))
+    assert reader.refresh() == 1
+
+    assert reader.full_reloads == 1
+    assert [row[3] for row in reader.rows()] == [1, 2, 3]
+
+
+def test_edit_above_the_cursor_reloads_the_tab(fast_retries):
+    spreadsheet = FakeSpreadsheet(make_club_tabs(4))
+    worksheet, reader = _reader(spreadsheet)
+    worksheet.rows.extend([_row(1), _row(2)])
+    reader.refresh()
+
+    worksheet.rows[2] = _row(2, scored="No")
+    reader.refresh()
+
+    assert reader.full_reloads == 2
+    assert [row[7] for row in reader.rows()] == ["Yes", "No"]
+
+
+def test_deleted_rows_reload_the_tab(fast_retries):
+    spreadsheet = FakeSpreadsheet(make_club_tabs(4))
+    worksheet, reader = _reader(spreadsheet)
+    worksheet.rows.extend([_row(1), _row(2), _row(3)])
+    reader.refresh()
+
+    del worksheet.rows[1]
+    reader.refresh()
+
+    assert reader.full_reloads == 2
+    assert [row[3] for row in reader.rows()] == [2, 3]
+
+
+def test_columns_are_mapped_by_header(fast_retries):
+    spreadsheet = FakeSpreadsheet(make_club_tabs(4))
+    worksheet, reader = _reader(spreadsheet)
+    worksheet.rows[0] = list(reversed(MATCH_COLUMNS))
+    worksheet.rows.append(list(reversed(_row(1) + [''] * (len(MATCH_COLUMNS) - len(_row(1))))))
+    reader.refresh()
+
+    assert reader.rows()[0][:4] == ["Spring", "2026-05-01", "Rivals", 1]
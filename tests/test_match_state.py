@@ -0,0 +1,100 @@
+from modules.match_state import CONFLICT, DUPLICATE, RECORDED, MatchRegistry
+
+
+def _registry():
+    registry = MatchRegistry()
+    registry.ensure("m1", "Spring", "2026-05-01", "Rivals")
+    return registry
+
+
+def test_record_point_moves_score_and_point_number():
+    registry = _registry()
+
+    status, shared = registry.record_point("m1", 1, "k1", True)
+
+    assert status == RECORDED
+    assert (shared["score_for"], shared["score_against"], shared["point_number"]) == (1, 0, 2)
+
+
+def test_repeated_submission_is_a_duplicate():
+    registry = _registry()
+    registry.record_point("m1", 1, "k1", True)
+
+    status, shared = registry.record_point("m1", 1, "k1", True)
+
+    assert status == DUPLICATE
+    assert (shared["score_for"], shared["point_number"]) == (1, 2)
+
+
+def test_point_claimed_by_another_device_conflicts():
+    registry = _registry()
+    registry.record_point("m1", 1, "k1", True)
+
+    status, shared = registry.record_point("m1", 1, "k2", False)
+
+    assert status == CONFLICT
+    assert (shared["score_for"], shared["score_against"]) == (1, 0)
+
+
+def test_unrecord_takes_back_only_the_last_point_with_its_key():
+    registry = _registry()
+    registry.record_point("m1", 1, "k1", True)
+    registry.record_point("m1", 2, "k2", False)
+
+    assert not registry.unrecord_point("m1", 1, "k1")
+    assert not registry.unrecord_point("m1", 2, "other")
+    assert registry.unrecord_point("m1", 2, "k2")
+    assert registry.get("m1")["point_number"] == 2
+
+
+def test_change_outcome_moves_later_scores():
+    registry = _registry()
+    registry.record_point("m1", 1, "k1", True)
+    registry.record_point("m1", 2, "k2", True)
+
+    shared = registry.change_outcome("m1", 1, True, False)
+
+    assert (shared["score_for"], shared["score_against"]) == (1, 1)
+    assert registry.get_point("m1", 1).scored is False
+    assert (registry.get_point("m1", 2).score_for, registry.get_point("m1", 2).score_against) == (1, 1)
+
+
+def test_active_matches_is_shared_until_a_change():
+    registry = _registry()
+
+    first = registry.active_matches()
+    assert registry.active_matches() is first
+
+    registry.record_point("m1", 1, "k1", True)
+    assert registry.active_matches() is not first
+
+
+def test_end_match_keeps_a_played_match_when_asked_to_drop_only_unplayed_ones():
+    registry = _registry()
+    registry.ensure("m2", "Spring", "2026-05-01", "Riv")
+    registry.record_point("m1", 1, "k1", True)
+
+    assert not registry.end_match("m1", if_unplayed=True)
+    assert registry.end_match("m2", if_unplayed=True)
+    assert registry.end_match("m1")
+    assert registry.active_matches() == ()
+
+
+def test_idle_matches_are_dropped():
+    registry = MatchRegistry(idle_seconds=60)
+    registry.ensure("old", "Spring", "2026-05-01", "Rivals")
+    registry._matches["old"].updated_at -= 61
+
+    registry.ensure("new", "Spring", "2026-05-01", "Others")
+
+    assert registry.get("old") is None
+    assert [match["match_id"] for match in registry.active_matches()] == ["new"]
+
+
+def test_find_returns_the_latest_match_against_an_opponent():
+    registry = _registry()
+    registry.ensure("m2", "Spring", "2026-05-01", "Rivals")
+    registry.record_point("m2", 1, "k1", True)
+
+    assert registry.find("Spring", "2026-05-01", "Rivals")["match_id"] == "m2"
+    assert registry.find("Spring", "2026-05-02", "Rivals") is None
@@ -0,0 +1,84 @@
+import threading
+
+from modules.playing_time import PlayingTimeTracker
+
+
+def _point(point_number, players, scored, match_id="m1"):
+    return [
+        ["Spring", "2026-05-01", "Rivals", point_number, name, "O", "Handler",
+         "Yes" if scored else "No", 0, 0, "0-0", match_id]
+        for name in players
+    ]
+
+
+def _load_blocked_until(release, rows):
+    started = threading.Event()
+
+    def load_rows():
+        started.set()
+        release.wait(5)
+        return rows
+
+    return started, load_rows
+
+
+def _wait_until_loaded(tracker):
+    for _ in range(500):
+        if tracker.loaded:
+            return
+        threading.Event().wait(0.01)
+
+
+def test_counters_can_be_read_and_updated_while_the_history_loads():
+    tracker = PlayingTimeTracker()
+    release = threading.Event()
+    started, load_rows = _load_blocked_until(release, _point(1, ["Sam"], True, match_id="old"))
+    tracker.load_in_background(load_rows)
+    assert started.wait(5)
+
+    tracker.add_rows(_point(1, ["Sam", "Alex"], True))
+
+    assert tracker.summary("m1", "Spring")["Alex"][0] == 1
+    assert not tracker.loaded
+    release.set()
+    _wait_until_loaded(tracker)
+    assert tracker.summary("m1", "Spring")["Sam"][4] == 2
+
+
+def test_history_does_not_count_a_point_twice():
+    tracker = PlayingTimeTracker()
+    tracker.add_rows(_point(1, ["Sam"], True))
+
+    tracker.ensure_loaded(lambda: _point(1, ["Sam"], True) + _point(2, ["Sam"], False))
+
+    assert tracker.summary("m1", "Spring")["Sam"][:3] == (2, 1, 1)
+
+
+def test_point_undone_while_the_history_loads_stays_undone():
+    tracker = PlayingTimeTracker()
+    release = threading.Event()
+    started, load_rows = _load_blocked_until(release, _point(1, ["Sam"], True) + _point(2, ["Sam"], True))
+    thread = threading.Thread(target=tracker.ensure_loaded, args=(load_rows,))
+    thread.start()
+    assert started.wait(5)
+
+    tracker.remove_point("m1", 2)
+    tracker.set_result("m1", 1, False)
+    release.set()
+    thread.join(5)
+
+    assert tracker.summary("m1", "Spring")["Sam"][0] == 1
+    assert tracker.next_point_is_o("m1") is True
+
+
+def test_failed_load_is_kept_for_the_page():
+    tracker = PlayingTimeTracker()
+
+    def load_rows():
+        raise ConnectionError("offline")
+
+    tracker.load_in_background(load_rows)
+    _wait_until_loaded(tracker)
+
+    assert isinstance(tracker.load_error, ConnectionError)
+    assert tracker.summary("m1", "Spring") == {}
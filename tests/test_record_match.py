@@ -0,0 +1,155 @@
+import time
+from datetime import datetime
+
+from streamlit.testing.v1 import AppTest
+
+from conftest import APP_PATH
+from modules.match_journal import match_journal
+from modules.match_state import match_registry
+
+
+def _open_record_match(opponent):
+    at = AppTest.from_file(APP_PATH, default_timeout=30)
+    at.session_state["logged_in"] = True
+    at.run()
+    at.text_input[0].set_value(opponent)
+    at.run()
+    return at
+
+
+def _click(at, label):
+    next(button for button in at.button if button.label == label).click()
+    at.run()
+
+
+def _save_point(at, scored="Yes"):
+    # Player 1, 3, 5, ... are on the O line and Player 2, 4, 6, ... on the D line
+    at.multiselect(key="line_O_players").set_value(["Player 1", "Player 3", "Player 5", "Player 7"])
+    at.multiselect(key="line_D_players").set_value(["Player 2", "Player 4", "Player 6"])
+    at.run()
+    at.radio[0].set_value(scored)
+    _click(at, "SAVE POINT")
+    assert not at.exception
+
+
+def _synced_rows(spreadsheet):
+    deadline = time.time() + 10
+    while match_journal.pending_count() and time.time() < deadline:
+        time.sleep(0.02)
+    return spreadsheet.rows("matches")[1:]
+
+
+def test_start_new_match_starts_a_fresh_match(spreadsheet):
+    at = _open_record_match("Rematch Rivals")
+    _save_point(at, "Yes")
+    _save_point(at, "No")
+    first_match = at.session_state["match_info"]["match_id"]
+    assert match_registry.get(first_match)["point_number"] == 3
+
+    _click(at, "Start New Match")
+
+    match_info = at.session_state["match_info"]
+    assert match_info["match_id"] not in (None, first_match)
+    assert (match_info["score_for"], match_info["score_against"], match_info["point_number"]) == (0, 0, 1)
+    assert any('<div class="match-score">0 - 0</div>' in markdown.value for markdown in at.markdown)
+    assert at.query_params["match"] == [match_info["match_id"]]
+    # The finished match leaves the live scoreboard
+    assert match_registry.get(first_match) is None
+
+    _save_point(at, "Yes")
+
+    assert not at.error
+    assert at.session_state["match_info"]["point_number"] == 2
+    rows = _synced_rows(spreadsheet)
+    points = sorted({(row[11], row[3], row[7]) for row in rows if row[2] == "Rematch Rivals"})
+    assert points == sorted([
+        (first_match, 1, "Yes"), (first_match, 2, "No"), (match_info["match_id"], 1, "Yes")
+    ])
+
+
+def test_match_id_column_is_added_to_an_older_matches_tab(spreadsheet):
+    spreadsheet._tabs["matches"].rows[0] = spreadsheet._tabs["matches"].rows[0][:11]
+    at = _open_record_match("Header Rivals")
+
+    _save_point(at)
+
+    rows = _synced_rows(spreadsheet)
+    assert spreadsheet.rows("matches")[0][11] == "match_id"
+    assert {row[11] for row in rows} == {at.session_state["match_info"]["match_id"]}
+
+
+def test_match_out_of_the_tail_resumes_with_a_warning(spreadsheet):
+    matches = spreadsheet._tabs["matches"].rows
+    for point_number, scored, score_for, score_against in ((1, "Yes", 1, 0), (2, "No", 1, 1), (3, "Yes", 2, 1)):
+        matches.append(["Spring", "2026-05-01", "Paused Rivals", point_number, "Player 1", "O", "Handler",
+                        scored, score_for, score_against, "", "paused-match"])
+    for row in range(250):
+        matches.append(["Spring", "2026-05-01", "Others", row + 1, "Player 1", "O", "Handler",
+                        "Yes", row + 1, 0, "", "other-match"])
+
+    at = AppTest.from_file(APP_PATH, default_timeout=30)
+    at.session_state["logged_in"] = True
+    at.query_params["match"] = "paused-match"
+    at.run()
+
+    assert any("not among the latest points" in warning.value for warning in at.warning)
+    match_info = at.session_state["match_info"]
+    assert (match_info["opponent"], match_info["point_number"]) == ("Paused Rivals", 4)
+    assert (match_info["score_for"], match_info["score_against"]) == (2, 1)
+
+
+def test_match_dropped_from_the_registry_keeps_recording(spreadsheet):
+    at = _open_record_match("Idle Rivals")
+    _save_point(at, "Yes")
+    match_id = at.session_state["match_info"]["match_id"]
+
+    match_registry.end_match(match_id)
+    _save_point(at, "No")
+
+    assert not at.error
+    assert match_registry.get(match_id)["point_number"] == 3
+    rows = _synced_rows(spreadsheet)
+    assert sorted({(row[3], row[9]) for row in rows if row[11] == match_id}) == [(1, 0), (2, 1)]
+
+
+def test_players_picked_for_another_tournament_are_dropped(spreadsheet):
+    spreadsheet._tabs["tournaments"].rows.append(["Autumn"])
+    spreadsheet._tabs["tournament_rosters"].rows.extend(
+        ["Autumn", f"Player {number}", "O", "Cutter"] for number in (9, 11, 13)
+    )
+    at = _open_record_match("Rivals")
+    at.multiselect(key="line_O_players").set_value(["Player 1", "Player 9"])
+    at.run()
+
+    at.selectbox[0].set_value("Autumn")
+    at.run()
+
+    assert not at.exception
+    assert at.multiselect(key="line_O_players").value == ["Player 9"]
+
+
+def test_match_is_resumed_by_opponent_after_a_restart(spreadsheet):
+    at = _open_record_match("Restart Rivals")
+    _save_point(at, "Yes")
+    _save_point(at, "Yes")
+    match_id = at.session_state["match_info"]["match_id"]
+
+    # A restart forgets every match in progress
+    match_registry._matches.clear()
+    at = _open_record_match("Restart Rivals")
+
+    match_info = at.session_state["match_info"]
+    assert (match_info["match_id"], match_info["point_number"], match_info["score_for"]) == (match_id, 3, 2)
+
+
+def test_match_only_in_the_sheet_is_resumed_by_opponent(spreadsheet):
+    today = datetime.now().strftime("%Y-%m-%d")
+    spreadsheet._tabs["matches"].rows.extend(
+        ["Spring", today, "Sheet Rivals", 1, f"Player {number}", "O", "Handler", "No", 0, 1, "0-1", "stored"]
+        for number in range(1, 8)
+    )
+
+    at = _open_record_match("Sheet Rivals")
+
+    match_info = at.session_state["match_info"]
+    assert (match_info["match_id"], match_info["point_number"], match_info["score_against"]) == ("stored", 2, 1)
@@ -0,0 +1,71 @@
+import pytest
+from gspread.exceptions import APIError
+
+from modules.storage import get_backend
+
+
+def _point(match_id, point_number):
+    return [
+        ["Spring", "2026-05-01", "Rivals", point_number, player, "O", "Handler", "Yes",
+         point_number, 0, f"{point_number}-0", match_id]
+        for player in ("Player 1", "Player 2")
+    ]
+
+
+def _points(spreadsheet):
+    return [(row[11], row[3]) for row in spreadsheet.rows("matches")[1:]]
+
+
+def test_append_failing_with_a_server_error_is_not_retried(spreadsheet):
+    spreadsheet.fail_next('write', code=503, applied=True)
+
+    with pytest.raises(APIError):
+        get_backend().append_match_rows(_point("m", 1))
+
+    assert _points(spreadsheet) == [("m", 1), ("m", 1)]
+
+
+def test_append_refused_for_quota_is_retried(spreadsheet):
+    spreadsheet.fail_next('write', code=429)
+
+    get_backend().append_match_rows(_point("m", 1))
+
+    assert _points(spreadsheet) == [("m", 1), ("m", 1)]
+    assert spreadsheet.calls[("append_rows", "matches")] == 2
+
+
+def test_overwriting_values_is_retried_after_a_server_error(spreadsheet):
+    backend = get_backend()
+    backend.append_match_rows(_point("m", 1))
+    spreadsheet.fail_next('write', code=503, applied=True)
+
+    backend.update_match_rows([(2, [row[:7] + ["No", 0, 1, "0-1"] + row[11:] for row in _point("m", 1)])])
+
+    assert [row[7] for row in spreadsheet.rows("matches")[1:]] == ["No", "No"]
+
+
+def test_reads_are_retried_after_a_server_error(spreadsheet):
+    spreadsheet.fail_next('read', code=503)
+
+    assert get_backend().get_tournaments() == ["Spring"]
+
+
+def test_failed_delete_that_was_applied_is_not_repeated(spreadsheet):
+    backend = get_backend()
+    backend.append_match_rows(_point("m", 1) + _point("m", 2))
+    spreadsheet.fail_next('write', code=503, applied=True)
+
+    backend.delete_match_rows(2, 3, _point("m", 1))
+
+    assert _points(spreadsheet) == [("m", 2), ("m", 2)]
+
+
+def test_failed_delete_that_was_not_applied_is_reported(spreadsheet):
+    backend = get_backend()
+    backend.append_match_rows(_point("m", 1) + _point("m", 2))
+    spreadsheet.fail_next('write', code=503)
+
+    with pytest.raises(APIError):
+        backend.delete_match_rows(2, 3, _point("m", 1))
+
+    assert _points(spreadsheet) == [("m", 1), ("m", 1), ("m", 2), ("m", 2)]
@@ -0,0 +1,60 @@
+import pytest
+
+from modules.roster_import import plan_import, read_import_csv
+from modules.roster_index import Player, build_roster_index
+from modules.storage import Tables
+
+ROSTER = build_roster_index([
+    Player("Sam", "O", "Handler"),
+    Player("Alex", "D", "Cutter"),
+    Player("Kim", "", ""),
+])
+
+
+def _plan(csv_text, rosters=None):
+    tables = Tables(["Spring"], None, rosters or {"Spring": []})
+    return plan_import(read_import_csv(csv_text.encode("utf-8")), ROSTER, tables)
+
+
+def test_header_is_matched_ignoring_case_and_spaces():
+    records = read_import_csv(b"Tournament Name,PLAYER_NAME\nSpring,Sam\n")
+
+    assert records == [(2, {"tournament_name": "Spring", "player_name": "Sam"})]
+
+
+def test_missing_required_column_is_refused():
+    with pytest.raises(ValueError, match="player_name"):
+        read_import_csv(b"tournament_name\nSpring\n")
+
+
+def test_blank_line_and_position_come_from_the_club_roster():
+    plan = _plan("tournament_name,player_name,line,position\nSummer,Sam,,\nSummer,Alex,O,Hybrid\n")
+
+    assert plan.errors == []
+    assert plan.new_tournaments == ["Summer"]
+    assert plan.rows == [["Summer", "Sam", "O", "Handler"], ["Summer", "Alex", "O", "Hybrid"]]
+
+
+def test_players_already_on_a_roster_and_repeated_rows_are_skipped():
+    plan = _plan(
+        "tournament_name,player_name\nSpring,Sam\nSpring,Alex\nSpring,Alex\n",
+        {"Spring": [Player("Sam", "O", "Handler")]},
+    )
+
+    assert plan.rows == [["Spring", "Alex", "D", "Cutter"]]
+    assert plan.skipped == 2
+    assert plan.new_tournaments == []
+
+
+def test_invalid_rows_are_reported_with_their_line_numbers():
+    plan = _plan(
+        "tournament_name,player_name,line,position\n"
+        "Spring,Nobody,O,Handler\n"
+        "Spring,Kim,,\n"
+        "Spring,Sam,X,Handler\n"
+        "Spring,Alex,D,Cutter\n"
+        "Spring,Alex,O,Cutter\n"
+    )
+
+    assert [error.split(":")[0] for error in plan.errors] == ["Row 2", "Row 3", "Row 4", "Row 6"]
+    assert plan.rows == [["Spring", "Alex", "D", "Cutter"]]
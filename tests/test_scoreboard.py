@@ -0,0 +1,14 @@
+from modules.match_state import match_registry
+from modules.scoreboard import get_live_matches
+
+
+def test_only_matches_with_a_recorded_point_are_live():
+    match_registry.ensure("scoreboard-unplayed", "Spring", "2026-05-01", "Riv")
+    match_registry.ensure("scoreboard-played", "Spring", "2026-05-01", "Rivals")
+    match_registry.record_point("scoreboard-played", 1, "k1", True)
+
+    live = [match["match_id"] for match in get_live_matches()]
+
+    assert "scoreboard-played" in live
+    assert "scoreboard-unplayed" not in live
+    assert [match["match_id"] for match in get_live_matches("scoreboard-unplayed")] == []
@@ -0,0 +1,177 @@
+import pytest
+from gspread.exceptions import APIError
+
+from modules.match_format import (
+    MATCH_INDEX_COLUMNS, PLAYER_COLUMNS, POINT_COLUMNS, POINT_PLAYER_COLUMNS, NormalizedMatches
+)
+from modules.request_scheduler import scheduler
+from modules.storage import (
+    NOT_IN_TAIL, RESUME_TAIL_ROWS, SheetsBackend, SQLiteBackend, StorageBackend, get_backend
+)
+
+NORMALIZED_TABS = NormalizedMatches("match_index", "points", "point_players", "players")
+
+
+def _point(match_id, point_number, score_for, score_against, players=("Player 1", "Player 2")):
+    scored = "Yes" if score_for > score_against else "No"
+    return [
+        ["Spring", "2026-05-01", "Rivals", point_number, player, "O", "Handler", scored,
+         score_for, score_against, f"{score_for}-{score_against}", match_id]
+        for player in players
+    ]
+
+
+def test_backend_missing_a_method_cannot_be_created():
+    class PartialBackend(StorageBackend):
+        def get_tournaments(self):
+            return []
+
+    with pytest.raises(TypeError, match="get_recent_points"):
+        PartialBackend()
+
+
+@pytest.fixture
+def backend(tmp_path):
+    return SQLiteBackend(str(tmp_path / "clipboard.sqlite3"))
+
+
+def test_recent_points_are_found_by_match_id(backend):
+    backend.append_match_rows(_point("a", 1, 1, 0) + _point("b", 1, 0, 1) + _point("a", 2, 2, 0))
+
+    recent = backend.get_recent_points("a", 5)
+
+    assert [point_number for point_number, _ in recent] == [1, 2]
+    assert all(row[11] == "a" for _, rows in recent for row in rows)
+    assert [point_number for point_number, _ in backend.get_recent_points("a", 1)] == [2]
+
+
+def test_delete_point_leaves_the_other_match_alone(backend):
+    backend.append_match_rows(_point("a", 1, 1, 0) + _point("b", 1, 0, 1) + _point("a", 2, 2, 0))
+
+    backend.delete_point("a", 2)
+
+    assert [point_number for point_number, _ in backend.get_recent_points("a", 5)] == [1]
+    assert [point_number for point_number, _ in backend.get_recent_points("b", 5)] == [1]
+
+
+def test_update_points_changes_the_outcome_of_every_player_row(backend):
+    backend.append_match_rows(_point("a", 1, 1, 0) + _point("a", 2, 2, 0))
+
+    backend.update_points([_point("a", 1, 0, 1), _point("a", 2, 1, 1)])
+
+    recent = dict(backend.get_recent_points("a", 5))
+    assert [row[7:11] for row in recent[1]] == [["No", 0, 1, "0-1"]] * 2
+    assert [row[7:11] for row in recent[2]] == [["No", 1, 1, "1-1"]] * 2
+
+
+def test_latest_match_is_found_by_opponent(backend):
+    backend.append_match_rows(_point("a", 1, 1, 0) + _point("a", 2, 2, 0) + _point("b", 1, 0, 1))
+
+    last_point = backend.find_last_match("Spring", "2026-05-01", "Rivals")
+
+    assert (last_point["match_id"], last_point["point_number"]) == ("b", 1)
+    assert backend.find_last_match("Spring", "2026-05-01", "Others") is None
+
+
+def test_sheets_points_are_not_searched_for_outside_the_journal(spreadsheet):
+    backend = get_backend()
+    backend.append_match_rows(_point("a", 1, 1, 0))
+    spreadsheet.reset_counts()
+
+    for call in (
+        lambda: backend.get_recent_points("a", 5),
+        lambda: backend.delete_point("a", 1),
+        lambda: backend.update_points([_point("a", 1, 0, 1)]),
+    ):
+        with pytest.raises(ValueError, match="match journal"):
+            call()
+
+    assert not spreadsheet.calls
+
+
+def _bury(spreadsheet, match_id, points=3):
+    # A paused match followed by more rows of other matches than a resume searches
+    matches = spreadsheet._tabs["matches"].rows
+    for point_number in range(1, points + 1):
+        matches.extend(_point(match_id, point_number, point_number, 0))
+    for point_number in range(1, RESUME_TAIL_ROWS // 2 + 2):
+        matches.extend(_point("other", point_number, point_number, 0))
+
+
+def test_match_out_of_the_tail_is_reported_and_found_by_a_full_search(spreadsheet):
+    _bury(spreadsheet, "paused")
+    backend = get_backend()
+
+    assert backend.get_last_point("paused") == NOT_IN_TAIL
+    spreadsheet.reset_counts()
+    last_point = backend.get_last_point("paused", full_search=True)
+
+    assert (last_point["point_number"], last_point["score_for"], last_point["score_against"]) == (3, 3, 0)
+    # Only the columns saying where a match stood are read, not the whole tab
+    assert set(spreadsheet.calls) <= {("values_batch_get", None)}
+
+
+def test_match_without_points_in_a_short_tab_is_not_found(spreadsheet):
+    spreadsheet._tabs["matches"].rows.extend(_point("other", 1, 1, 0))
+
+    assert get_backend().get_last_point("unplayed") is None
+
+
+@pytest.fixture
+def normalized_backend(spreadsheet):
+    for worksheet_name, columns in zip(NORMALIZED_TABS, NormalizedMatches(
+        MATCH_INDEX_COLUMNS, POINT_COLUMNS, POINT_PLAYER_COLUMNS, PLAYER_COLUMNS
+    )):
+        spreadsheet.add_worksheet(worksheet_name, rows=1, cols=len(columns)).rows.append(list(columns))
+    return SheetsBackend(
+        {}, "test", "tournaments", "roster", "tournament_rosters", "matches",
+        match_format="normalized", normalized_tab_names=NORMALIZED_TABS
+    )
+
+
+def test_normalized_point_is_written_to_every_tab_in_one_request(spreadsheet, normalized_backend):
+    spreadsheet.reset_counts()
+
+    normalized_backend.append_match_rows(_point("a", 1, 1, 0))
+
+    assert spreadsheet.calls[("batch_update", None)] == 1
+    assert [len(spreadsheet.rows(worksheet_name)) - 1 for worksheet_name in NORMALIZED_TABS] == [1, 1, 2, 2]
+    assert normalized_backend.get_match_rows() == _point("a", 1, 1, 0)
+
+
+def test_failed_normalized_write_leaves_no_partial_point(spreadsheet, normalized_backend):
+    normalized_backend.append_match_rows(_point("a", 1, 1, 0))
+    spreadsheet.fail_next('write', code=503)
+
+    with pytest.raises(APIError):
+        normalized_backend.append_match_rows(_point("a", 2, 1, 1, players=("Player 3",)))
+
+    assert [len(spreadsheet.rows(worksheet_name)) - 1 for worksheet_name in NORMALIZED_TABS] == [1, 1, 2, 2]
+    # The new player was not remembered as written, so the retry adds it
+    normalized_backend.append_match_rows(_point("a", 2, 1, 1, players=("Player 3",)))
+    assert len(spreadsheet.rows(NORMALIZED_TABS.players)) - 1 == 3
+
+
+def test_tournament_name_is_released_when_a_failed_add_cannot_be_checked(spreadsheet, monkeypatch):
+    backend = get_backend()
+    # Open the worksheets first, so the injected read failure hits the check
+    backend.add_tournament("Autumn", [])
+    monkeypatch.setattr(scheduler, 'max_retries', 0)
+    spreadsheet.fail_next('write', code=503)
+    spreadsheet.fail_next('read', code=503)
+
+    with pytest.raises(APIError):
+        backend.add_tournament("Summer", [["Summer", "Player 1", "O", "Handler"]])
+
+    assert backend.add_tournament("Summer", [["Summer", "Player 1", "O", "Handler"]])
+    assert spreadsheet.rows("tournaments")[1:] == [["Spring"], ["Autumn"], ["Summer"]]
+
+
+def test_tournament_added_before_a_lost_response_counts_as_added(spreadsheet, monkeypatch):
+    backend = get_backend()
+    monkeypatch.setattr(scheduler, 'max_retries', 0)
+    spreadsheet.fail_next('write', code=503, applied=True)
+
+    assert backend.add_tournament("Summer", [["Summer", "Player 1", "O", "Handler"]])
+    assert not backend.add_tournament("Summer", [["Summer", "Player 1", "O", "Handler"]])
+    assert spreadsheet.rows("tournaments")[1:] == [["Spring"], ["Summer"]]